@@ -0,0 +1,30 @@
+# admin.py
+import hmac
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+
+# Admin endpoints (/api/_admin/*, POST /api/profiles/bulk) need the
+# ADMIN_TOKEN from the config sent back as X-Admin-Token. Without a token
+# configured they are closed, except on the debug server (python app.py).
+HEADER = "X-Admin-Token"
+
+
+def authorized():
+    token = current_app.config.get("ADMIN_TOKEN")
+    if not token:
+        return current_app.debug
+    return hmac.compare_digest(request.headers.get(HEADER, "").encode(), token.encode())
+
+
+def admin_only(view):
+    """
+    403 unless the request is authorized() for admin endpoints.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not authorized():
+            return jsonify({"error": "Forbidden"}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -1,89 +1,765 @@
-from datetime import datetime, timedelta
+import csv
+import io
+import json
+import os
+from datetime import datetime, date, time
+from threading import Lock
 from decimal import Decimal, InvalidOperation
 from uuid import uuid4, UUID
-from threading import Lock
-from sqlalchemy import text
-from flask import request, jsonify
+import click
+from sqlalchemy import exc, inspect, text, update
+from flask import Response, request, jsonify, g, stream_with_context
 
-from config import app, db
+from config import BASE_DIR, app, db
 from models import (
     FoodBank,
     DonationPosting,
     Meetup,
+    MeetupArchive,
     MeetupTimeChangeRequest,
     Leaderboard,
     Profile,
     Donor,
+    FoodBankSlotSettings,
+    IdempotencyKey,
 )
 from trie import Trie
 from bloom_filter import BloomFilter
+import archive
+import coalesce
+import event_bus
+import expiry
+import facet_index
+import geo_index
+import idempotency
+import metrics
+import read_queries
+import recommendations
+import response_cache
+import row_encoders
+import search_backend
+import seeding
+import slot_index
+import slow_query
+import streams
+import tasks
+import warmup
+from admin import admin_only
+from routing import read_replica
+
+
+# --- Request timing, SQL counts and GET /api/_metrics ---
+
+metrics.init_app(app, db)
+
+# --- Slow-query log (enabled with SLOW_QUERY_LOG=1, see config.py) ---
+
+slow_query.init_app(app, db)
+
+# --- Response cache for dashboard GETs (RESPONSE_CACHE, see response_cache.py) ---
+
+cache = response_cache.init_app(app, metrics.registry)
+
+# --- Idempotency-Key replay for create endpoints (see idempotency.py) ---
+
+idempotency_keys = idempotency.init_app(app, metrics.registry)
+
+
+def _norm_id(value):
+    try:
+        return str(UUID(value))
+    except (ValueError, TypeError, AttributeError):
+        return value
+
+
+def _postings_tags(args):
+    food_bank_id = args.get("food_bank_id")
+    tags = [f"postings:fb:{_norm_id(food_bank_id)}"] if food_bank_id else ["postings:all"]
+    if read_queries.faceted_arg(args, plain=("food_bank_id",)):
+        # Bank attributes can move these; also dropped once the facet index catches up
+        tags.append("postings:facets")
+    return tags
+
+
+def _meetups_tags(args):
+    """
+    One tag per filter given; a meetup only appears in a filtered list if
+    it matches every filter, so invalidating its own scopes is enough.
+    """
+    tags = [
+        f"meetups:{scope}:{_norm_id(args[name])}"
+        for name, scope in (("donor_id", "donor"), ("food_bank_id", "fb"), ("posting_id", "posting"))
+        if args.get(name)
+    ]
+    return tags or ["meetups:all"]
 
 
-# --- Global Trie setup for searching donation postings ---
+def _invalidate_postings(food_bank_id, counts_changed=False):
+    """
+    Call after committing a change to a posting of this food bank.
+    counts_changed: active posting count moved (list_food_banks items_needed).
+    """
+    tags = [f"postings:fb:{food_bank_id}", "postings:all"]
+    if counts_changed:
+        tags.append("food_banks")
+    cache.invalidate(*tags)
+
+
+def _invalidate_meetup(donor_id, food_bank_id, posting_id, leaderboard=False):
+    """
+    Call after committing a change to a meetup with these ids.
+    """
+    tags = [
+        f"meetups:donor:{donor_id}",
+        f"meetups:fb:{food_bank_id}",
+        f"meetups:posting:{posting_id}",
+        "meetups:all",
+    ]
+    if leaderboard:
+        tags.append("leaderboard")
+    cache.invalidate(*tags)
+
+
+# --- Search index for donation postings (SEARCH_BACKEND, see search_backend.py) ---
 
 search_trie = Trie()
-trie_lock = Lock()
+trie_lock = metrics.TimedLock("trie_lock")
 
 # --- Global Bloom filter for (donor_id, posting_id) ---
 
 meetup_bloom = BloomFilter(size=8192, hash_count=3)
-meetup_bloom_lock = Lock()
+meetup_bloom_lock = metrics.TimedLock("meetup_bloom_lock")
+
+# --- Index build progress (see /api/_ready) ---
+
+search_status = warmup.IndexStatus("search_index")
+meetup_bloom_status = warmup.IndexStatus("meetup_bloom")
+
+
+search_index = search_backend.create_backend(
+    app.config["SEARCH_BACKEND"], db, search_status, trie=search_trie, lock=trie_lock,
+)
+
+# --- Food bank locations for the nearby endpoints (see geo_index.py) ---
+
+postal_centroids = geo_index.PostalCentroids()
+postal_centroids.load(BASE_DIR / "data" / "postal_centroids.csv")
+if app.config["POSTAL_CENTROIDS_FILE"]:
+    postal_centroids.load(app.config["POSTAL_CENTROIDS_FILE"])
+
+bank_geo = geo_index.GeoGrid()
+bank_geo_lock = metrics.TimedLock("bank_geo_lock")
+bank_geo_status = warmup.IndexStatus("food_bank_geo")
+
+# --- Donor recommendations (see recommendations.py) ---
+
+posting_ranker = recommendations.PostingRanker()
+ranker_lock = metrics.TimedLock("ranker_lock")
+ranker_status = warmup.IndexStatus("recommendations")
+expiry_status = warmup.IndexStatus("posting_expiry")
+
+# --- Booked pickup slots per food bank and day (see slot_index.py) ---
+
+booked_slots = slot_index.SlotIndex()
+slot_settings = {}  # food_bank_id -> (slot_minutes, capacity), banks with their own settings
+slots_lock = metrics.TimedLock("slots_lock")
+slots_status = warmup.IndexStatus("pickup_slots")
+
+# --- Facet bitmaps for filtering postings (see facet_index.py) ---
+
+bank_attributes = {}  # bank name key -> (city, tags, refrigerated) from BANK_ATTRIBUTES_FILE
+if app.config["BANK_ATTRIBUTES_FILE"]:
+    bank_attributes = facet_index.load_bank_attributes(app.config["BANK_ATTRIBUTES_FILE"])
+
+posting_facets = facet_index.FacetIndex()
+facets_lock = metrics.TimedLock("facets_lock")
+facets_status = warmup.IndexStatus("posting_facets")
+
+
+# --- Prefix result cache + single-flight for autocomplete/search ---
+
+prefix_cache = coalesce.PrefixCache(
+    maxsize=app.config["PREFIX_CACHE_SIZE"], ttl=app.config["PREFIX_CACHE_TTL"],
+)
+search_flight = coalesce.SingleFlight()
+async_search_flight = coalesce.AsyncSingleFlight()  # used by asgi.py
+coalesce.register_metrics(metrics.registry, prefix_cache, search_flight, async_search_flight)
+
+
+# --- Post-commit events, applied by every worker (EVENT_BUS, see event_bus.py) ---
+
+bus = event_bus.init_app(app, db, metrics.registry)
+
+# Index maintenance run off the request path (TASK_QUEUE_*, see tasks.py)
+background = tasks.init_app(app, metrics.registry)
+
+
+def _posting_event(posting):
+    return {
+        "posting_id": str(posting.id),
+        "food_bank_id": str(posting.food_bank_id),
+        "food_name": posting.food_name,
+        "qty_needed": float(posting.qty_needed) if posting.qty_needed is not None else None,
+        "urgency": posting.urgency,
+        "to_date": posting.to_date.isoformat(),
+        "to_time": posting.to_time.isoformat(),
+    }
+
+
+def _meetup_event(meetup):
+    return {
+        "meetup_id": str(meetup.id),
+        "donor_id": str(meetup.donor_id),
+        "food_bank_id": str(meetup.food_bank_id),
+        "posting_id": str(meetup.posting_id),
+        "scheduled_date": meetup.scheduled_date.isoformat(),
+        "scheduled_time": meetup.scheduled_time.isoformat(),
+    }
 
 
 def _index_posting_in_trie(posting):
     """
-    Index one DonationPosting into the Trie.
-    We use food_name so that search can match on it.
+    Index one DonationPosting into the search backend (the Trie by default)
+    on every worker. We use food_name so that search can match on it.
     """
-    text_pieces = []
+    bus.emit("posting_created", **_posting_event(posting))
 
-    if posting.food_name:
-        text_pieces.append(posting.food_name)
 
-    combined = " ".join(text_pieces)
-    if not combined:
-        return
+def _unindex_posting(posting):
+    """
+    Remove a deleted posting from the search backend and cached results.
+    """
+    bus.emit("posting_deleted", **_posting_event(posting))
+
 
-    words = combined.split()
-    for w in words:
-        search_trie.insert(w, item_id=str(posting.id))
+# Handlers keep what the next request relies on (response cache tags,
+# the duplicate-booking filter, slot counts) in the request; the rest of
+# the index maintenance is queued per entity and applied in batches.
 
+@bus.handler("posting_created")
+def _apply_posting_created(event, remote):
+    _invalidate_postings(event["food_bank_id"], counts_changed=True)
+    background.submit("posting_indexes", event["posting_id"], (event, remote))
 
-def _build_trie_from_db():
+
+@bus.handler("posting_deleted")
+def _apply_posting_deleted(event, remote):
+    _invalidate_postings(event["food_bank_id"], counts_changed=True)
+    background.submit("posting_indexes", event["posting_id"], (event, remote))
+
+
+@bus.handler("posting_updated")
+def _apply_posting_updated(event, remote):
+    _invalidate_postings(event["food_bank_id"])
+    background.submit("posting_indexes", event["posting_id"], (event, remote))
+
+
+@background.task("posting_indexes")
+def _update_posting_indexes(items):
     """
-    Rebuild the Trie from all existing DonationPosting rows.
-    This will be called once at startup (in __main__).
+    Apply a run of posting events, in order, to the search index, the
+    recommendation ranker, the facet index and the expiry schedule; each
+    is locked once per run.
     """
-    postings = DonationPosting.query.all()
-    search_trie.clear()
-    
-    for posting in postings:
-        _index_posting_in_trie(posting)
-    
-    indexed_words = search_trie.words()
-    print(f"Trie Index Built Successfully")
-    print(f"Total postings indexed: {len(postings)}")
-    print(f"Total unique words indexed: {len(indexed_words)}")
-    print(f"\nIndexed words: {sorted(indexed_words)}")
+    texts = set()
+    for event, remote in items:
+        if event["type"] == "posting_updated":
+            continue
+        texts.add(event["food_name"])
+        # The database backend's tables are shared; only the Trie is per worker
+        if not remote or search_index.name == "trie":
+            if event["type"] == "posting_created":
+                search_index.index_posting(event["posting_id"], event["food_name"])
+            else:
+                search_index.remove_posting(event["posting_id"], event["food_name"])
+
+    with ranker_lock:
+        for event, _ in items:
+            if event["type"] == "posting_deleted":
+                posting_ranker.remove(event["posting_id"])
+            else:
+                _rank_posting(event)
+
+    with facets_lock:
+        for event, _ in items:
+            if event["type"] == "posting_deleted":
+                posting_facets.remove(event["posting_id"])
+            else:
+                posting_facets.upsert(event["posting_id"], event["food_name"], event["urgency"],
+                                      event["food_bank_id"])
+
+    for event, _ in items:
+        if event["type"] == "posting_created":
+            posting_expiry.schedule(event["posting_id"], expiry.posting_expires_at(
+                date.fromisoformat(event["to_date"]), time.fromisoformat(event["to_time"])))
+        elif event["type"] == "posting_deleted":
+            posting_expiry.cancel(event["posting_id"])
+
+    # After the index changes, so a search in between can't re-cache stale results
+    for food_name in texts:
+        prefix_cache.invalidate_text(food_name)
+    cache.invalidate("postings:facets")
+
+
+def _rank_posting(event):
+    # Caller holds ranker_lock
+    posting_ranker.upsert(
+        event["posting_id"], event["food_bank_id"], event["food_name"], event["urgency"],
+        date.fromisoformat(event["to_date"]), event["qty_needed"],
+    )
+
+
+@bus.handler("meetup_changed")
+def _apply_meetup_changed(event, remote):
+    if event["change"] == "created":
+        with meetup_bloom_lock:
+            meetup_bloom.add(f"{event['donor_id']}:{event['posting_id']}")
+    with slots_lock:
+        if event["change"] == "completed":
+            booked_slots.remove(event["meetup_id"])
+        else:
+            booked_slots.add(event["meetup_id"], event["food_bank_id"],
+                             date.fromisoformat(event["scheduled_date"]),
+                             slot_index.minute_of_day(time.fromisoformat(event["scheduled_time"])))
+    _invalidate_meetup(event["donor_id"], event["food_bank_id"], event["posting_id"],
+                       leaderboard=event["change"] == "completed")
+
+
+@bus.handler("meetups_archived")
+def _apply_meetups_archived(event, remote):
+    # Rare (a scheduled job) and touches many scopes at once
+    cache.clear()
+
+
+@bus.handler("slot_settings_changed")
+def _apply_slot_settings_changed(event, remote):
+    with slots_lock:
+        slot_settings[event["food_bank_id"]] = (event["slot_minutes"], event["capacity"])
+
+
+@bus.handler("food_bank_created")
+def _apply_food_bank_created(event, remote):
+    cache.invalidate("food_banks")
+    background.submit("bank_locations", event["food_bank_id"], event)
+    background.submit("bank_facets", event["food_bank_id"], event)
+
+
+@background.task("bank_locations")
+def _locate_food_banks(events):
+    points = [(event["food_bank_id"], postal_centroids.lookup(event.get("postal_code"))) for event in events]
+    with bank_geo_lock:
+        for food_bank_id, point in points:
+            if point is not None:
+                bank_geo.insert(food_bank_id, point[0], point[1])
+
+
+def _bank_facets(name, city):
+    """
+    (city, tags, refrigerated) of a food bank: its own city, and tags and
+    refrigeration from BANK_ATTRIBUTES_FILE when its name is listed there.
+    """
+    listed_city, tags, refrigerated = bank_attributes.get(facet_index.name_key(name), (None, (), None))
+    return city or listed_city, tags, refrigerated
+
+
+@background.task("bank_facets")
+def _set_bank_facets(events):
+    with facets_lock:
+        for event in events:
+            posting_facets.set_bank(event["food_bank_id"], *_bank_facets(event.get("name"), event.get("city")))
+    cache.invalidate("postings:facets")
+
+
+# --- Posting expiry (see expiry.py) ---
+
+def _expire_postings(posting_ids):
+    """
+    Deactivate postings whose window has closed, in one UPDATE. Only the
+    rows this worker flipped are announced: another worker may have
+    expired some of them already.
+    """
+    stmt = (
+        update(DonationPosting)
+        .where(DonationPosting.id.in_([UUID(posting_id) for posting_id in posting_ids]))
+        .where(DonationPosting.is_active.is_(True))
+        .where(DonationPosting.to_date <= date.today())
+        .values(is_active=False, updated_at=datetime.utcnow())
+        .returning(DonationPosting.id, DonationPosting.food_bank_id, DonationPosting.food_name,
+                   DonationPosting.qty_needed, DonationPosting.urgency,
+                   DonationPosting.to_date, DonationPosting.to_time)
+        .execution_options(synchronize_session=False)
+    )
+    rows = db.session.execute(stmt).all()
+    db.session.commit()
+    for row in rows:
+        bus.emit("posting_deleted", **_posting_event(row))
+    return len(rows)
+
+
+posting_expiry = expiry.ExpiryScheduler(
+    _expire_postings,
+    interval=app.config["POSTING_EXPIRY_INTERVAL"],
+    batch_size=app.config["POSTING_EXPIRY_BATCH"],
+)
+expiry.register_metrics(metrics.registry, posting_expiry)
+
+
+# --- Server-Sent Events for dashboards (GET /api/stream, see streams.py) ---
+
+streams.init_app(app, bus, metrics.registry)
+
+
+def _time_change_event(time_change_request, meetup, change):
+    return {
+        "change": change,
+        "request_id": str(time_change_request.id),
+        "meetup_id": str(time_change_request.meetup_id),
+        "donor_id": str(meetup.donor_id),
+        "food_bank_id": str(meetup.food_bank_id),
+        "new_date": time_change_request.new_date.isoformat(),
+        "new_time": time_change_request.new_time.isoformat(),
+    }
+
+
+@bus.on_gap
+@background.on_overflow
+def _resync_after_gap():
+    """
+    Events may have been missed (lost LISTEN connection) or dropped (task
+    queue full): drop cached results and rebuild the indexes. The DB
+    fallbacks cover the rebuild and the worker stays ready meanwhile;
+    gaps during a rebuild fold into one more run after it.
+    """
+    prefix_cache.clear()
+    cache.clear()
+    index_resync.request()
+
+
+def _prefix_lookup(kind, prefix, limit):
+    """
+    search_index.suggest / search_ids through the prefix cache. Degraded
+    (index still building) results are not cached.
+    """
+    lookup = search_index.suggest if kind == "suggest" else search_index.search_ids
+    if not search_index.ready:
+        return lookup(prefix, limit)
+    key = (kind, search_backend.clean_prefix(prefix).strip(), limit, bool(g.get("_use_replica")))
+    return prefix_cache.get_or_compute(key, lambda: lookup(prefix, limit))
 
 
-def _build_meetup_bloom_from_db():
+def _build_search_index_from_db():
     """
-    Rebuild the Bloom filter from all existing Meetup rows.
-    We store keys like "donor_uuid:posting_uuid".
+    Rebuild (Trie) or resync (database backend) the search index from
+    all active DonationPosting rows.
     """
+    search_index.rebuild()
+
+
+def _build_meetup_bloom_from_db(batch_size=5000):
+    """
+    Rebuild the Bloom filter from all existing Meetup rows, archived
+    ones included. We store keys like "donor_uuid:posting_uuid".
+    """
+    total = (db.session.query(db.func.count(Meetup.id)).scalar()
+             + db.session.query(db.func.count(MeetupArchive.id)).scalar())
+    meetup_bloom_status.start(total)
+
     with meetup_bloom_lock:
         meetup_bloom.clear()
 
-        rows = db.session.query(Meetup.donor_id, Meetup.posting_id).all()
+    rows = db.session.execute(
+        read_queries.meetup_pairs_query().execution_options(yield_per=batch_size)
+    )
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _add_meetup_pairs(batch)
+            count += len(batch)
+            batch = []
+    _add_meetup_pairs(batch)
+    count += len(batch)
+    meetup_bloom_status.finish()
+
+    print(f"Bloom filter built from {count} meetup rows")
 
+
+def _add_meetup_pairs(rows):
+    with meetup_bloom_lock:
         for donor_id, posting_id in rows:
             if donor_id is None or posting_id is None:
                 continue
             key = f"{donor_id}:{posting_id}"
             meetup_bloom.add(key)
+    meetup_bloom_status.advance(len(rows))
 
-    print(f"Bloom filter built from {len(rows)} meetup rows")
+
+def _fill_bank_geo(grid, rows):
+    """
+    Place each (food bank id, postal code) at its postal code centroid;
+    returns how many were located.
+    """
+    located = 0
+    grid.clear()
+    for bank_id, postal_code in rows:
+        point = postal_centroids.lookup(postal_code)
+        if point is not None:
+            grid.insert(str(bank_id), point[0], point[1])
+            located += 1
+    return located
+
+
+def _build_bank_geo_from_db():
+    rows = db.session.query(FoodBank.id, FoodBank.postal_code).all()
+    bank_geo_status.start(len(rows))
+    with bank_geo_lock:
+        located = _fill_bank_geo(bank_geo, rows)
+    bank_geo_status.advance(len(rows))
+    bank_geo_status.finish()
+
+    print(f"Food bank locations indexed: {located} of {len(rows)} "
+          f"({len(rows) - located} with unknown postal codes)")
+
+
+def _rankable_posting_rows():
+    """
+    Every active posting that still needs something, as ranker fields.
+    """
+    return (
+        db.session.query(
+            DonationPosting.id, DonationPosting.food_bank_id, DonationPosting.food_name,
+            DonationPosting.urgency, DonationPosting.to_date, DonationPosting.qty_needed,
+        )
+        .filter(DonationPosting.is_active.is_(True))
+        .filter(DonationPosting.to_date >= date.today())
+        .filter(DonationPosting.qty_needed > 0)
+        .all()
+    )
+
+
+def _fill_ranker(ranker, rows):
+    ranker.load(
+        (str(posting_id), str(food_bank_id), food_name, urgency, to_date, qty_needed)
+        for posting_id, food_bank_id, food_name, urgency, to_date, qty_needed in rows
+    )
+
+
+def _build_ranker_from_db():
+    rows = _rankable_posting_rows()
+    ranker_status.start(len(rows))
+    with ranker_lock:
+        _fill_ranker(posting_ranker, rows)
+    ranker_status.advance(len(rows))
+    ranker_status.finish()
+    print(f"Recommendation ranker built from {len(rows)} active postings")
+
+
+def _facet_rows():
+    """
+    (banks, postings) for FacetIndex.load: every food bank with its
+    attributes and every active posting, as the listing returns them.
+    """
+    banks = [(bank_id, *_bank_facets(name, city))
+             for bank_id, name, city in db.session.query(FoodBank.id, FoodBank.name, FoodBank.city)]
+    postings = (
+        db.session.query(DonationPosting.id, DonationPosting.food_name, DonationPosting.urgency,
+                         DonationPosting.food_bank_id)
+        .filter(DonationPosting.is_active.is_(True))
+        .all()
+    )
+    return banks, postings
+
+
+def _build_facets_from_db():
+    banks, postings = _facet_rows()
+    facets_status.start(len(postings))
+    with facets_lock:
+        posting_facets.load(banks, postings)
+    facets_status.advance(len(postings))
+    facets_status.finish()
+    cache.invalidate("postings:facets")
+    print(f"Posting facets built from {len(postings)} active postings at {len(banks)} food banks")
+
+
+def _build_expiry_schedule_from_db():
+    rows = (
+        db.session.query(DonationPosting.id, DonationPosting.to_date, DonationPosting.to_time)
+        .filter(DonationPosting.is_active.is_(True))
+        .all()
+    )
+    expiry_status.start(len(rows))
+    posting_expiry.load(
+        (str(posting_id), expiry.posting_expires_at(to_date, to_time))
+        for posting_id, to_date, to_time in rows
+    )
+    expiry_status.advance(len(rows))
+    expiry_status.finish()
+    print(f"Expiry scheduled for {len(rows)} active postings")
+
+
+def create_tables():
+    """
+    Create the tables added after the original schema, if missing:
+    food_bank_slot_settings, idempotency_keys and the archive tables (see
+    archive.py). Runs on the primary at startup (create_app) and from
+    flask --app app create-tables, never inside a request.
+    """
+    for table in (FoodBankSlotSettings.__table__, IdempotencyKey.__table__, *archive.TABLES):
+        try:
+            table.create(db.engine, checkfirst=True)
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)  # indexes added after the table was created
+        except exc.DBAPIError:
+            # Another worker starting at the same time got there first
+            if not inspect(db.engine).has_table(table.name):
+                raise
+
+
+@app.cli.command("create-tables")
+def create_tables_command():
+    """
+    Create the tables added after the original schema, if missing.
+    """
+    create_tables()
+    click.echo("Tables are up to date")
+
+
+def _build_slot_index_from_db():
+    """
+    Settings of every bank that has its own, and every open meetup from
+    today on.
+    """
+    settings = db.session.query(
+        FoodBankSlotSettings.food_bank_id, FoodBankSlotSettings.slot_minutes, FoodBankSlotSettings.capacity,
+    ).all()
+    rows = (
+        db.session.query(Meetup.id, Meetup.food_bank_id, Meetup.scheduled_date, Meetup.scheduled_time)
+        .filter(Meetup.completed.is_(False))
+        .filter(Meetup.scheduled_date >= date.today())
+        .all()
+    )
+    slots_status.start(len(rows))
+    with slots_lock:
+        slot_settings.clear()
+        slot_settings.update((str(bank_id), (minutes, capacity)) for bank_id, minutes, capacity in settings)
+        booked_slots.clear()
+        for meetup_id, food_bank_id, scheduled_date, scheduled_time in rows:
+            booked_slots.add(str(meetup_id), str(food_bank_id), scheduled_date,
+                             slot_index.minute_of_day(scheduled_time))
+    slots_status.advance(len(rows))
+    slots_status.finish()
+    print(f"Pickup slots indexed: {len(rows)} open meetups, {len(settings)} banks with their own settings")
+
+
+def _warm_indexes():
+    """
+    Build every in-memory index (needs an app context).
+    A failure leaves that index in the "failed" state; requests keep
+    using the DB fallbacks and /api/_ready reports it as degraded.
+    """
+    for status, build in ((search_status, _build_search_index_from_db),
+                          (meetup_bloom_status, _build_meetup_bloom_from_db),
+                          (bank_geo_status, _build_bank_geo_from_db),
+                          (ranker_status, _build_ranker_from_db),
+                          (expiry_status, _build_expiry_schedule_from_db),
+                          (slots_status, _build_slot_index_from_db),
+                          (facets_status, _build_facets_from_db)):
+        try:
+            build()
+        except Exception as e:
+            status.fail(e)
+            print(f"WARNING: Could not build {status.name} from DB:", repr(e))
+            import traceback
+            traceback.print_exc()
+        finally:
+            db.session.remove()
+
+
+index_resync = warmup.Rebuilder(app, [_warm_indexes])
+
+_warmup_pid = None
+_warmup_guard = Lock()
+
+
+def start_index_warmup():
+    """
+    Start the background index build once per process (each forked
+    WSGI worker gets its own copy of the indexes).
+    """
+    global _warmup_pid
+    with _warmup_guard:
+        if _warmup_pid == os.getpid():
+            return False
+        if _warmup_pid is None and hasattr(os, "register_at_fork"):
+            # gunicorn --preload imports the app in the master; rebuild in each worker
+            os.register_at_fork(after_in_child=_restart_warmup_after_fork)
+        _warmup_pid = os.getpid()
+    warmup.run_in_background(app, [_warm_indexes])
+    if app.config["POSTING_EXPIRY"]:
+        posting_expiry.start(app)
+    return True
+
+
+def _restart_warmup_after_fork():
+    global _warmup_guard
+    _warmup_guard = Lock()
+    with app.app_context():
+        # Pooled connections belong to the parent process
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if _bus_started:
+        bus.restart_after_fork()
+    start_index_warmup()
+
+
+_bus_started = False
+
+
+def start_event_bus():
+    """
+    Start listening for other workers' events (once per process).
+    """
+    global _bus_started
+    if not _bus_started:
+        _bus_started = True
+        bus.start()
+
+
+def create_app(warm_indexes=True):
+    """
+    App factory for WSGI servers (see wsgi.py): creates missing tables
+    (create_tables), returns the Flask app and kicks off the index warm-up
+    in the background. Until it finishes, search falls back to the
+    database and /api/_ready returns 503.
+    """
+    with app.app_context():
+        create_tables()
+    start_event_bus()
+    if warm_indexes:
+        start_index_warmup()
+    return app
+
+
+@app.get("/api/_ready")
+def readiness():
+    """
+    Readiness probe for the load balancer: 503 (with build progress)
+    until every in-memory index has finished its first build, 200 after
+    that. Indexes being rebuilt after an event gap, or whose build
+    failed, are listed under "degraded": requests use the DB fallbacks
+    for them meanwhile.
+    """
+    statuses = (search_status, meetup_bloom_status, bank_geo_status, ranker_status, expiry_status,
+                slots_status, facets_status)
+    indexes = {s.name: s.to_json() for s in statuses}
+    ready = all(s.serving for s in statuses)
+    return jsonify({
+        "ready": ready,
+        "degraded": [s.name for s in statuses if not s.ready],
+        "search_backend": search_index.name,
+        "indexes": indexes,
+    }), 200 if ready else 503
 
 
 # --- User Profile Creation API ---
@@ -195,6 +871,10 @@ def create_profile():
             return jsonify({"error": "Invalid role. Must be 'Donor' or 'Food Bank'"}), 400
         
         db.session.commit()
+
+        if role == "Food Bank":
+            bus.emit("food_bank_created", food_bank_id=str(user_uuid), postal_code=postal_code,
+                     name=name, city=city)
         
         return jsonify({
             "message": "Profile created successfully",
@@ -209,58 +889,258 @@ def create_profile():
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 
+def _seed_users(lines, fmt, defaults, batch_size):
+    """
+    Bulk-create users from a roster (see seeding.py), then announce the
+    new food banks like create_profile does.
+    """
+    report = seeding.import_users(
+        db.session, seeding.PARSERS[fmt](lines), batch_size=batch_size, defaults=defaults,
+    )
+    for food_bank_id, postal_code, name, city in report.new_food_banks:
+        bus.emit("food_bank_created", food_bank_id=food_bank_id, postal_code=postal_code,
+                 name=name, city=city)
+    return report
+
+
+@app.post("/api/profiles/bulk")
+@admin_only
+def bulk_create_profiles():
+    """
+    Create many profiles (with their donor / food bank rows) from a roster
+    in the request body, read as a stream.
+    Query params: format = "csv" | "ndjson" | "roster" (default: from the
+    Content-Type, else roster), batch_size (default SEED_BATCH),
+    default.<field>=value for fields the roster leaves out.
+    Per-row errors are reported; valid rows are still created.
+    """
+    fmt = (request.args.get("format") or seeding.format_for(content_type=request.content_type)).lower()
+    if fmt not in seeding.FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(seeding.FORMATS)}"}), 400
+    try:
+        batch_size = int(request.args.get("batch_size", app.config["SEED_BATCH"]))
+    except (ValueError, TypeError):
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    if not 1 <= batch_size <= 5000:
+        return jsonify({"error": "batch_size must be between 1 and 5000"}), 400
+    defaults = {k[len("default."):]: v for k, v in request.args.items() if k.startswith("default.")}
+
+    lines = io.TextIOWrapper(request.stream, encoding="utf-8-sig", newline="")
+    report = _seed_users(lines, fmt, defaults, batch_size)
+    return jsonify(report.to_json()), 200
+
+
+@app.cli.command("seed-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(seeding.FORMATS), default=None,
+              help="Roster format (default: from the file extension, else roster).")
+@click.option("--batch-size", type=int, default=None, help="Rows per INSERT batch (default SEED_BATCH).")
+@click.option("--default", "defaults", multiple=True, metavar="FIELD=VALUE",
+              help="Value for a field the roster leaves out, e.g. --default city=Chicago.")
+def seed_users_command(path, fmt, batch_size, defaults):
+    """
+    Bulk-create users from a roster file, e.g.
+    flask --app app seed-users "CS351 Users File for Seeding.txt" --default city=Chicago ...
+    """
+    values = {}
+    for item in defaults:
+        field, sep, value = item.partition("=")
+        if not sep:
+            raise click.BadParameter(f"{item!r} is not FIELD=VALUE", param_hint="--default")
+        values[field.strip()] = value.strip()
+
+    with open(path, encoding="utf-8-sig", newline="") as lines:
+        report = _seed_users(lines, fmt or seeding.format_for(filename=path), values,
+                             batch_size or app.config["SEED_BATCH"])
+    out = report.to_json()
+    click.echo(f"{out['rows']} rows: created {out['created']['profiles']} profiles, "
+               f"{out['created']['donors']} donors, {out['created']['food_banks']} food banks; "
+               f"{out['skipped']} already existed, {out['error_count']} errors")
+    for error in out["errors"]:
+        click.echo(f"  line {error['line']}: {error['error']}" + (f" ({error['user_id']})" if error["user_id"] else ""))
+
+
 # --- Food banks API ---
 
 @app.get("/api/food_banks")
+@read_replica
+@cache.cached(lambda args: ["food_banks"])
 def list_food_banks():
     """
     List all food banks with their item counts.
     Only counts active (non-deleted) postings.
+    Optional: fields (comma-separated subset of the food bank keys)
     """
-    banks = FoodBank.query.order_by(FoodBank.name).all()
-    
-    # Get posting counts for each food bank (only active postings)
-    bank_data = []
-    for bank in banks:
-        # Count only active (non-deleted) donation postings for this food bank
-        posting_count = DonationPosting.query.filter(
-            DonationPosting.food_bank_id == bank.id,
-            DonationPosting.is_active == True  # Only count active postings
-        ).count()
-        
-        bank_json = bank.to_json()
-        bank_json['items_needed'] = posting_count
-        bank_data.append(bank_json)
-    
-    return jsonify({"food_banks": bank_data})
+    encoder, error = row_encoders.FOOD_BANKS.for_fields(request.args.get("fields"))
+    if error:
+        return jsonify({"error": error}), 400
+
+    rows = db.session.execute(read_queries.food_banks_query(encoder)).all()
+    return jsonify({"food_banks": encoder.encode_all(rows)})
+
+
+# --- Nearby food banks and postings ---
+
+NEARBY_DEFAULT_RADIUS_KM = 10.0
+NEARBY_MAX_RADIUS_KM = 200.0
+NEARBY_BANK_BATCH = 20   # banks whose postings are fetched per query, nearest first
+NEARBY_MAX_BANKS = 200
+
+
+def _nearby_params():
+    """
+    (origin, radius_km, limit, error response) from the postal_code,
+    radius (km) and limit query params.
+    """
+    postal_code = request.args.get("postal_code")
+    if not postal_code:
+        return None, None, None, (jsonify({"error": "postal_code is required"}), 400)
+    try:
+        radius = float(request.args.get("radius", NEARBY_DEFAULT_RADIUS_KM))
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return None, None, None, (jsonify({"error": "radius and limit must be numbers"}), 400)
+    if not 0 < radius <= NEARBY_MAX_RADIUS_KM or not 1 <= limit <= 100:
+        return None, None, None, (jsonify({
+            "error": f"radius must be between 0 and {NEARBY_MAX_RADIUS_KM:g} km and limit between 1 and 100"
+        }), 400)
+
+    point = postal_centroids.lookup(postal_code)
+    if point is None:
+        return None, None, None, (jsonify({"error": "Unknown postal_code"}), 404)
+    origin = {
+        "postal_code": geo_index.normalize_postal_code(postal_code),
+        "lat": point[0],
+        "lon": point[1],
+        "precision": point[2],
+    }
+    return origin, radius, limit, None
+
+
+def _banks_within(origin, radius_km, limit):
+    """
+    ([(distance_km, food_bank_id)] nearest first, degraded). Until the
+    grid is built every bank is measured from the database.
+    """
+    if bank_geo_status.ready:
+        with bank_geo_lock:
+            return bank_geo.within(origin["lat"], origin["lon"], radius_km, limit), False
+
+    found = []
+    for bank_id, postal_code in db.session.query(FoodBank.id, FoodBank.postal_code):
+        point = postal_centroids.lookup(postal_code)
+        if point is None:
+            continue
+        distance = geo_index.haversine_km(origin["lat"], origin["lon"], point[0], point[1])
+        if distance <= radius_km:
+            found.append((distance, str(bank_id)))
+    found.sort()
+    return found[:limit], True
+
+
+@app.get("/api/food_banks/nearby")
+@read_replica
+def nearby_food_banks():
+    """
+    Food banks within radius km of a postal code, nearest first.
+    Query params: postal_code (required), radius (km, default 10),
+    limit (default 20), fields
+    Distances are between postal code centroids.
+    """
+    origin, radius, limit, error = _nearby_params()
+    if error:
+        return error
+    encoder, message = row_encoders.FOOD_BANKS.for_fields(request.args.get("fields"))
+    if message:
+        return jsonify({"error": message}), 400
+
+    found, degraded = _banks_within(origin, radius, limit)
+    by_id = {}
+    if found:
+        stmt = read_queries.food_banks_by_ids_query(encoder, [UUID(key) for _, key in found])
+        by_id = {str(row[0]): encoder.encode(row[1:]) for row in db.session.execute(stmt)}
+
+    banks = []
+    for distance, key in found:
+        bank = by_id.get(key)
+        if bank is not None:
+            bank["distance_km"] = round(distance, 2)
+            banks.append(bank)
+
+    payload = {"origin": origin, "radius_km": radius, "food_banks": banks}
+    if degraded:
+        payload["degraded"] = True
+    return jsonify(payload)
 
 
 # --- Donation postings API ---
 
+@app.get("/api/donation_postings/nearby")
+@read_replica
+def nearby_donation_postings():
+    """
+    Active postings at the food banks within radius km of a postal code:
+    nearest bank first, then soonest to_date.
+    Query params: postal_code (required), radius (km, default 10),
+    limit (default 20), fields
+    """
+    origin, radius, limit, error = _nearby_params()
+    if error:
+        return error
+    encoder, message = row_encoders.POSTINGS.for_fields(request.args.get("fields"))
+    if message:
+        return jsonify({"error": message}), 400
+
+    found, degraded = _banks_within(origin, radius, NEARBY_MAX_BANKS)
+    postings = []
+    for start in range(0, len(found), NEARBY_BANK_BATCH):
+        distances = {UUID(key): distance for distance, key in found[start:start + NEARBY_BANK_BATCH]}
+        rows = db.session.execute(read_queries.postings_at_banks_query(encoder, list(distances))).all()
+        rows.sort(key=lambda row: (distances[row[0]], row[1]))
+        for row in rows[:limit - len(postings)]:
+            posting = encoder.encode(row[2:])
+            posting["distance_km"] = round(distances[row[0]], 2)
+            postings.append(posting)
+        if len(postings) >= limit:
+            break
+
+    payload = {"origin": origin, "radius_km": radius, "postings": postings}
+    if degraded:
+        payload["degraded"] = True
+    return jsonify(payload)
+
+
 @app.get("/api/donation_postings")
+@read_replica
+@cache.cached(_postings_tags)
 def get_donation_postings():
-    food_bank_id = request.args.get("food_bank_id")
-
-    if food_bank_id:
-        try:
-            fb_uuid = UUID(food_bank_id)
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid food_bank_id format"}), 400
-
-        # Only return active postings
-        postings = DonationPosting.query.filter_by(
-            food_bank_id=fb_uuid,
-            is_active=True  # Filter out soft-deleted postings
-        ).all()
-        
-        return jsonify({"postings": [p.to_json() for p in postings]}), 200
+    """
+    Active donation postings.
+    Optional: food_bank_id, fields (comma-separated subset of the posting keys)
+    Faceted (see _faceted_postings_payload): q, urgency, city, tag,
+    refrigerated, facets, limit, offset
+    """
+    fb_uuid, error = read_queries.uuid_arg(request.args, "food_bank_id")
+    if error:
+        return jsonify({"error": error}), 400
+    encoder, error = row_encoders.POSTINGS.for_fields(request.args.get("fields"))
+    if error:
+        return jsonify({"error": error}), 400
+
+    if read_queries.faceted_arg(request.args, plain=("food_bank_id",)):
+        filters, counted, limit, offset, error = read_queries.facet_args(request.args)
+        if error:
+            return jsonify({"error": error}), 400
+        prefix = (request.args.get("q") or "").strip()
+        return jsonify(_faceted_postings_payload(encoder, filters, counted, prefix, limit, offset)), 200
 
     # Only return active postings
-    postings = DonationPosting.query.filter_by(is_active=True).all()
-    return jsonify({"postings": [p.to_json() for p in postings]}), 200
+    rows = db.session.execute(read_queries.donation_postings_query(encoder, fb_uuid)).all()
+    return jsonify({"postings": encoder.encode_all(rows)}), 200
 
 
 @app.get("/api/donation_postings/<posting_id>")
+@read_replica
 def get_single_donation_posting(posting_id):
     """
     Get a single donation posting by ID.
@@ -293,15 +1173,20 @@ def soft_delete_posting(posting_id):
     if not posting:
         return jsonify({"error": "Posting not found"}), 404
 
+    was_active = posting.is_active
     posting.is_active = False
     posting.updated_at = datetime.utcnow()
     
     db.session.commit()
+
+    if was_active:
+        _unindex_posting(posting)
     
     return jsonify({"message": "Posting deleted successfully"}), 200
 
 
 @app.post("/api/donation_postings")
+@idempotency_keys.idempotent
 def create_donation_posting():
     """
     Create a new donation posting for a food bank.
@@ -336,6 +1221,17 @@ def create_donation_posting():
     if not from_date or not to_date or not from_time or not to_time:
         return jsonify({"error": "either from_date, to_date, from_time, to_time is missing"}), 400
 
+    # Parse here so the same values work on SQLite (which only takes date/time objects)
+    try:
+        from_date = date.fromisoformat(str(from_date))
+        to_date = date.fromisoformat(str(to_date))
+        from_time = time.fromisoformat(str(from_time))
+        to_time = time.fromisoformat(str(to_time))
+    except (ValueError, TypeError) as e:
+        return jsonify(
+            {"error": f"Invalid date/time format. Use YYYY-MM-DD for dates and HH:MM for times. Error: {str(e)}"}
+        ), 400
+
     posting = DonationPosting(
         id=uuid4(),
         food_bank_id=food_bank_id,
@@ -356,7 +1252,7 @@ def create_donation_posting():
     return jsonify(posting.to_json()), 201
 
 
-# --- Trie-based autocomplete endpoint ---
+# --- Prefix autocomplete endpoint ---
 
 @app.get("/api/items/autocomplete")
 def autocomplete_items():
@@ -369,30 +1265,63 @@ def autocomplete_items():
     if not prefix:
         return jsonify({"items": []})
 
-    with trie_lock:
-        words = search_trie.words_with_prefix(prefix, limit=10)
+    def compute():
+        degraded = not search_index.ready
+        words = _prefix_lookup("suggest", prefix, 10)
+        if degraded:
+            return {"items": words, "degraded": True}
+        return {"items": words}
 
-    return jsonify({"items": words})
+    # Identical concurrent requests (debounced typing) share one lookup
+    key = ("autocomplete", search_backend.clean_prefix(prefix).strip())
+    return jsonify(search_flight.do(key, compute))
 
 
-# --- Trie-based search for postings ---
+# --- Prefix search for postings ---
 
 @app.get("/api/search/postings")
+@read_replica
 def search_postings():
     """
-    Search donation postings by text prefix using the Trie.
+    Search donation postings by text prefix using the search backend.
     Looks at words from food_name.
     Example: /api/search/postings?q=rice
+    Optional: fields (comma-separated subset of the posting keys)
+    With any of urgency, food_bank_id, city, tag, refrigerated or facets
+    the facet index answers instead (see _faceted_postings_payload), with
+    limit (default 20, max 100) and offset.
+    Example: /api/search/postings?q=ri&urgency=high&city=Chicago&refrigerated=1
     """
+    encoder, error = row_encoders.POSTINGS.for_fields(request.args.get("fields"))
+    if error:
+        return jsonify({"error": error}), 400
+
     prefix = (request.args.get("q") or "").strip()
+    if read_queries.faceted_arg(request.args, plain=("q",)):
+        filters, counted, limit, offset, error = read_queries.facet_args(
+            request.args, default_limit=20, max_limit=100)
+        if error:
+            return jsonify({"error": error}), 400
+        key = ("search_facets", search_backend.clean_prefix(prefix).strip(), facet_index.filters_key(filters),
+               counted, limit, offset, encoder.keys, bool(g.get("_use_replica")))
+        return jsonify(search_flight.do(
+            key, lambda: _faceted_postings_payload(encoder, filters, counted, prefix, limit, offset)))
+
     if not prefix:
         return jsonify({"postings": []})
 
-    with trie_lock:
-        id_list = search_trie.prefix_ids(prefix, limit=20)
+    key = ("search", search_backend.clean_prefix(prefix).strip(), encoder.keys, bool(g.get("_use_replica")))
+    return jsonify(search_flight.do(key, lambda: _search_postings_payload(prefix, encoder)))
+
+
+def _search_postings_payload(prefix, encoder):
+    """
+    Look up posting ids for prefix and hydrate them, in search order.
+    """
+    id_list = _prefix_lookup("search", prefix, 20)
 
     if not id_list:
-        return jsonify({"postings": []})
+        return {"postings": []}
 
     uuid_ids = []
     for s in id_list:
@@ -402,65 +1331,139 @@ def search_postings():
             continue
 
     if not uuid_ids:
-        return jsonify({"postings": []})
+        return {"postings": []}
 
-    postings = (
-        DonationPosting
-        .query
-        .filter(DonationPosting.id.in_(uuid_ids))
-        .all()
-    )
+    rows = db.session.execute(read_queries.postings_by_ids_query(encoder, uuid_ids)).all()
 
-    posting_by_id = {str(p.id): p for p in postings}
-    ordered = [posting_by_id[_id] for _id in id_list if _id in posting_by_id]
+    return {"postings": read_queries.ordered_postings_json(encoder, rows, id_list)}
 
-    return jsonify({"postings": [p.to_json() for p in ordered]})
+
+def _facet_search(filters, prefix, limit, offset, counted=()):
+    """
+    (posting ids, total, facet counts or None, degraded) from the facet
+    index, counting after facets_lock is released; until the index is
+    built, straight from the database and without counts.
+    """
+    if facets_status.ready:
+        with facets_lock:
+            ids, total, pending = posting_facets.search(filters, prefix, limit, offset, counted)
+        return ids, total, pending and pending.counts(), False
+
+    food_bank_ids = None
+    if filters.keys() - {"urgency"}:
+        food_bank_ids = [
+            bank_id for bank_id, name, city in db.session.query(FoodBank.id, FoodBank.name, FoodBank.city)
+            if facet_index.bank_matches(filters, bank_id, *_bank_facets(name, city))
+        ]
+    ids_stmt, total_stmt = read_queries.faceted_posting_ids_queries(filters, food_bank_ids, prefix, limit, offset)
+    ids = [str(posting_id) for posting_id in db.session.execute(ids_stmt).scalars()]
+    return ids, db.session.execute(total_stmt).scalar_one(), None, True
+
+
+def _faceted_postings_payload(encoder, filters, counted, prefix, limit, offset):
+    """
+    Active postings matching every facet filter (values of one facet are
+    ORed) and, with a prefix, a food_name word starting with each of its
+    words; in index order. "total" counts every match, and with ?facets=
+    "facets" counts, per value of each counted facet, the matches of all
+    the other filters.
+    """
+    ids, total, counts, degraded = _facet_search(filters, prefix, limit, offset, counted)
+    rows = []
+    for stmt in read_queries.postings_by_ids_queries(encoder, ids):
+        rows.extend(db.session.execute(stmt).all())
+    payload = {"postings": read_queries.ordered_postings_json(encoder, rows, ids), "total": total}
+    if counted:
+        payload["facets"] = counts
+    if degraded:
+        payload["degraded"] = True
+    return payload
 
 
 # --- Meetups API ---
 
 @app.get("/api/meetups")
+@read_replica
+@cache.cached(_meetups_tags)
 def list_meetups():
     """
     List meetups (scheduled donations).
     Optional filters: donor_id, food_bank_id, posting_id, completed (true/false)
+    Optional: history=true to include archived meetups (see archive.py)
+    Optional: fields (comma-separated subset of the meetup keys)
     """
-    donor_id = request.args.get("donor_id")
-    food_bank_id = request.args.get("food_bank_id")
-    posting_id = request.args.get("posting_id")
-    completed = request.args.get("completed")
+    encoder, error = row_encoders.MEETUPS.for_fields(request.args.get("fields"))
+    if error:
+        return jsonify({"error": error}), 400
+    stmt, error = read_queries.meetups_query(encoder, request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    rows = db.session.execute(stmt).all()
+    return jsonify({"meetups": encoder.encode_all(rows)})
 
-    query = Meetup.query
-    if donor_id:
-        try:
-            donor_uuid = UUID(donor_id)
-            query = query.filter_by(donor_id=donor_uuid)
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid donor_id format"}), 400
-            
-    if food_bank_id:
-        try:
-            fb_uuid = UUID(food_bank_id)
-            query = query.filter_by(food_bank_id=fb_uuid)
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid food_bank_id format"}), 400
 
-    if posting_id:
+EXPORT_BATCH_SIZE = 1000
+
+
+@app.get("/api/food_banks/<food_bank_id>/meetups/export")
+@read_replica
+def export_food_bank_meetups(food_bank_id):
+    """
+    Stream a food bank's full meetup history for reporting, archived
+    meetups included (history=false for the hot table only).
+    Query param: format = "csv" (default) | "ndjson"
+    Rows come from a server-side cursor EXPORT_BATCH_SIZE at a time, so
+    memory stays flat however long the history is.
+    """
+    try:
+        fb_uuid = UUID(food_bank_id)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid food_bank_id format"}), 400
+
+    fmt = (request.args.get("format") or "csv").lower()
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+
+    if db.session.get(FoodBank, fb_uuid) is None:
+        return jsonify({"error": "Food bank not found"}), 404
+
+    history = (request.args.get("history") or "true").lower() not in ("false", "0", "no")
+
+    encoder = row_encoders.MEETUP_EXPORT
+    stmt = read_queries.meetup_export_query(encoder, fb_uuid, history).execution_options(
+        yield_per=EXPORT_BATCH_SIZE)
+
+    def generate_csv(result):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(encoder.keys)
+        for batch in result.partitions():
+            writer.writerows(encoder.encode(row).values() for row in batch)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+    def generate_ndjson(result):
+        for batch in result.partitions():
+            yield "".join(json.dumps(encoder.encode(row), separators=(",", ":")) + "\n" for row in batch)
+
+    def generate():
+        result = db.session.execute(stmt)
         try:
-            posting_uuid = UUID(posting_id)
-            query = query.filter_by(posting_id=posting_uuid)
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid posting_id format"}), 400
-            
-    if completed is not None:
-        is_completed = completed.lower() in ('true', '1', 'yes')
-        query = query.filter_by(completed=is_completed)
+            yield from (generate_csv(result) if fmt == "csv" else generate_ndjson(result))
+        finally:
+            result.close()
 
-    meetups = query.order_by(Meetup.scheduled_date.desc(), Meetup.scheduled_time.desc()).all()
-    return jsonify({"meetups": [m.to_json() for m in meetups]})
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="meetups-{fb_uuid}.{fmt}"',
+    })
 
 
 @app.get("/api/donors/<donor_id>")
+@read_replica
 def get_donor(donor_id):
     """
     Get a specific donor's details.
@@ -477,7 +1480,333 @@ def get_donor(donor_id):
     return jsonify(donor.to_json())
 
 
+RECOMMENDATION_NEAR_KM = 25.0  # banks closer than this are ranked by exact distance
+
+
+def _rank_for_donor(ranker, grid, origin, items, limit):
+    """
+    ranker.top() for a donor at origin (postal centroid or None), with
+    food bank locations from grid.
+    """
+    if origin is None:
+        return ranker.top(limit, {}, items, lambda food_bank_id: None, None)
+    lat, lon = origin[0], origin[1]
+    with bank_geo_lock:
+        near = {key: km for km, key in grid.within(lat, lon, RECOMMENDATION_NEAR_KM)}
+
+        def far_distance(food_bank_id):
+            point = grid.points.get(food_bank_id)
+            return geo_index.haversine_km(lat, lon, point[0], point[1]) if point else None
+
+        return ranker.top(limit, near, items, far_distance, RECOMMENDATION_NEAR_KM)
+
+
+@app.get("/api/donors/<donor_id>/recommendations")
+@read_replica
+def donor_recommendations(donor_id):
+    """
+    Active postings ranked for a donor by urgency, days until to_date,
+    quantity still needed, distance from the donor's postal code and food
+    the donor has donated before (weights in recommendations.py).
+    Query params: limit (default 10, max 50), fields
+    """
+    try:
+        donor_uuid = UUID(donor_id)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid donor_id format"}), 400
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    if not 1 <= limit <= 50:
+        return jsonify({"error": "limit must be between 1 and 50"}), 400
+    encoder, message = row_encoders.POSTINGS.for_fields(request.args.get("fields"))
+    if message:
+        return jsonify({"error": message}), 400
+
+    donor = db.session.query(Donor.postal_code).filter(Donor.id == donor_uuid).first()
+    if donor is None:
+        return jsonify({"error": "Donor not found"}), 404
+    items = {
+        recommendations.item_key(name)
+        for (name,) in db.session.execute(read_queries.donated_items_query(donor_uuid))
+    }
+    origin = postal_centroids.lookup(donor.postal_code)
+
+    # Either structure still building: fill a private one for this request
+    grid = bank_geo
+    if origin is not None and not bank_geo_status.ready:
+        grid = geo_index.GeoGrid()
+        _fill_bank_geo(grid, db.session.query(FoodBank.id, FoodBank.postal_code).all())
+    if ranker_status.ready:
+        with ranker_lock:
+            ranked = _rank_for_donor(posting_ranker, grid, origin, items, limit)
+    else:
+        ranker = recommendations.PostingRanker()
+        _fill_ranker(ranker, _rankable_posting_rows())
+        ranked = _rank_for_donor(ranker, grid, origin, items, limit)
+    degraded = grid is not bank_geo or not ranker_status.ready
+
+    by_id = {}
+    if ranked:
+        stmt = read_queries.postings_by_ids_query(encoder, [UUID(posting_id) for _, posting_id, _, _ in ranked])
+        by_id = {str(row[0]): encoder.encode(row[1:]) for row in db.session.execute(stmt)}
+
+    postings = []
+    for score, posting_id, km, given_before in ranked:
+        posting = by_id.get(posting_id)
+        if posting is None:
+            continue
+        posting["score"] = round(score, 3)
+        posting["distance_km"] = round(km, 2) if km is not None else None
+        posting["donated_before"] = given_before
+        postings.append(posting)
+
+    payload = {"donor_id": str(donor_uuid), "recommendations": postings}
+    if degraded:
+        payload["degraded"] = True
+    return jsonify(payload)
+
+
+# --- Pickup slots ---
+
+def _slot_settings_for(food_bank_id):
+    """
+    (slot_minutes, capacity) for a food bank; capacity 0 means no limit.
+    """
+    key = str(food_bank_id)
+    if slots_status.ready:
+        with slots_lock:
+            found = slot_settings.get(key)
+    else:
+        row = db.session.get(FoodBankSlotSettings, UUID(key))
+        found = (row.slot_minutes, row.capacity) if row else None
+    return found or (app.config["SLOT_MINUTES"], app.config["SLOT_CAPACITY"])
+
+
+def _day_bookings_from_db(food_bank_id, day, exclude=None):
+    """
+    Minutes of the open meetups of one bank and day (index still building).
+    """
+    query = (
+        db.session.query(Meetup.scheduled_time)
+        .filter(Meetup.food_bank_id == UUID(str(food_bank_id)))
+        .filter(Meetup.scheduled_date == day)
+        .filter(Meetup.completed.is_(False))
+    )
+    if exclude is not None:
+        query = query.filter(Meetup.id != UUID(str(exclude)))
+    return [slot_index.minute_of_day(t) for (t,) in query]
+
+
+def _pickup_window_error(posting, day, at):
+    if not posting.from_date <= day <= posting.to_date:
+        return (f"scheduled_date must be between {posting.from_date.isoformat()} "
+                f"and {posting.to_date.isoformat()} for this posting")
+    if not posting.from_time <= at <= posting.to_time:
+        return (f"scheduled_time must be between {posting.from_time.strftime('%H:%M')} "
+                f"and {posting.to_time.strftime('%H:%M')} for this posting")
+    return None
+
+
+def _slot_bounds(food_bank_id, at):
+    """
+    (start, end, capacity) of the food bank's slot holding `at`, in
+    minutes of the day.
+    """
+    slot_minutes, capacity = _slot_settings_for(food_bank_id)
+    minute = slot_index.minute_of_day(at)
+    start = minute - minute % slot_minutes
+    return start, start + slot_minutes, capacity
+
+
+def _slot_full(day, start, end, booked, capacity):
+    return jsonify({
+        "error": f"The {slot_index.format_minute(start)}-{slot_index.format_minute(end)} pickup slot "
+                 f"on {day.isoformat()} is full ({booked} of {capacity} booked)",
+        "slot": {"start": slot_index.format_minute(start), "end": slot_index.format_minute(end),
+                 "booked": booked, "capacity": capacity},
+    }), 409
+
+
+def _reserve_pickup_slot(meetup_id, food_bank_id, day, at):
+    """
+    (previous booking, error response). Takes a place for meetup_id in
+    the slot holding `at`, or returns a 409 if the slot is full. The place
+    is taken in the index right away so two requests on this worker can't
+    both get the last one; pass previous to _release_pickup_slot if the
+    write then fails. Other workers are covered by _confirm_pickup_slot.
+    """
+    start, end, capacity = _slot_bounds(food_bank_id, at)
+    minute = slot_index.minute_of_day(at)
+
+    if not slots_status.ready:
+        if capacity:
+            booked = sum(1 for m in _day_bookings_from_db(food_bank_id, day, exclude=meetup_id)
+                         if start <= m < end)
+            if booked >= capacity:
+                return None, _slot_full(day, start, end, booked, capacity)
+        return None, None
+
+    with slots_lock:
+        if capacity:
+            booked = booked_slots.count(str(food_bank_id), day, start, end, exclude=str(meetup_id))
+            if booked >= capacity:
+                return None, _slot_full(day, start, end, booked, capacity)
+        previous = booked_slots.remove(str(meetup_id))
+        booked_slots.add(str(meetup_id), str(food_bank_id), day, minute)
+    return previous, None
+
+
+def _confirm_pickup_slot(food_bank_id, day, at):
+    """
+    Re-count the slot holding `at` in the write transaction, with the
+    meetup's new time flushed, and return a 409 if it went over
+    capacity: two workers can each see a free place in their own index.
+    The food bank row is locked first (FOR NO KEY UPDATE on Postgres,
+    which doesn't block the meetup's foreign key check), so the count
+    sees every booking committed before ours; SQLite serializes writers.
+    """
+    start, end, capacity = _slot_bounds(food_bank_id, at)
+    if not capacity:
+        return None
+    db.session.flush()
+    (db.session.query(FoodBank.id)
+     .filter(FoodBank.id == UUID(str(food_bank_id)))
+     .with_for_update(key_share=True)
+     .one())
+    query = (
+        db.session.query(db.func.count(Meetup.id))
+        .filter(Meetup.food_bank_id == UUID(str(food_bank_id)))
+        .filter(Meetup.scheduled_date == day)
+        .filter(Meetup.completed.is_(False))
+        .filter(Meetup.scheduled_time >= time(start // 60, start % 60))
+    )
+    if end < 24 * 60:
+        query = query.filter(Meetup.scheduled_time < time(end // 60, end % 60))
+    booked = query.scalar()
+    if booked > capacity:
+        return _slot_full(day, start, end, booked - 1, capacity)
+    return None
+
+
+def _release_pickup_slot(meetup_id, previous):
+    with slots_lock:
+        if previous is None:
+            booked_slots.remove(str(meetup_id))
+        else:
+            booked_slots.add(str(meetup_id), *previous)
+
+
+@app.get("/api/food_banks/<food_bank_id>/slots")
+@read_replica
+def food_bank_slots(food_bank_id):
+    """
+    A food bank's pickup slots for one day, with bookings and places left.
+    Query params: date (YYYY-MM-DD, required), posting_id (only that
+    posting's pickup window; default: every active posting's window that day)
+    """
+    try:
+        fb_uuid = UUID(food_bank_id)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid food_bank_id format"}), 400
+    try:
+        day = date.fromisoformat(request.args.get("date") or "")
+    except ValueError:
+        return jsonify({"error": "date is required (YYYY-MM-DD)"}), 400
+    posting_uuid, error = read_queries.uuid_arg(request.args, "posting_id")
+    if error:
+        return jsonify({"error": error}), 400
+
+    if db.session.query(FoodBank.id).filter(FoodBank.id == fb_uuid).first() is None:
+        return jsonify({"error": "Food bank not found"}), 404
+
+    windows = (
+        db.session.query(db.func.min(DonationPosting.from_time), db.func.max(DonationPosting.to_time))
+        .filter(DonationPosting.food_bank_id == fb_uuid)
+        .filter(DonationPosting.from_date <= day, DonationPosting.to_date >= day)
+    )
+    if posting_uuid is not None:
+        windows = windows.filter(DonationPosting.id == posting_uuid)
+    else:
+        windows = windows.filter(DonationPosting.is_active.is_(True))
+    opens, closes = windows.one()
+
+    slot_minutes, capacity = _slot_settings_for(fb_uuid)
+    degraded = not slots_status.ready
+    if degraded:
+        counts = {}
+        for minute in _day_bookings_from_db(fb_uuid, day):
+            start = minute - minute % slot_minutes
+            counts[start] = counts.get(start, 0) + 1
+    else:
+        with slots_lock:
+            counts = booked_slots.slot_counts(str(fb_uuid), day, slot_minutes)
+
+    slots = []
+    if opens is not None and closes is not None:
+        first = slot_index.minute_of_day(opens)
+        last = slot_index.minute_of_day(closes)
+        for start in range(first - first % slot_minutes, last + 1, slot_minutes):
+            booked = counts.get(start, 0)
+            slots.append({
+                "start": slot_index.format_minute(start),
+                "end": slot_index.format_minute(min(start + slot_minutes, 24 * 60)),
+                "booked": booked,
+                "available": max(capacity - booked, 0) if capacity else None,
+            })
+
+    payload = {
+        "food_bank_id": str(fb_uuid),
+        "date": day.isoformat(),
+        "slot_minutes": slot_minutes,
+        "capacity": capacity or None,
+        "slots": slots,
+    }
+    if degraded:
+        payload["degraded"] = True
+    return jsonify(payload)
+
+
+@app.put("/api/food_banks/<food_bank_id>/slots/settings")
+def update_slot_settings(food_bank_id):
+    """
+    Set a food bank's pickup slot length and how many meetups one slot
+    takes. Body: slot_minutes (5-240), capacity (0 = no limit)
+    """
+    try:
+        fb_uuid = UUID(food_bank_id)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid food_bank_id format"}), 400
+
+    data = request.get_json(silent=True) or {}
+    try:
+        slot_minutes = int(data.get("slot_minutes", app.config["SLOT_MINUTES"]))
+        capacity = int(data.get("capacity", 0))
+    except (ValueError, TypeError):
+        return jsonify({"error": "slot_minutes and capacity must be integers"}), 400
+    if not 5 <= slot_minutes <= 240 or capacity < 0:
+        return jsonify({"error": "slot_minutes must be between 5 and 240 and capacity 0 or more"}), 400
+
+    if not FoodBank.query.filter_by(id=fb_uuid).first():
+        return jsonify({"error": "Food bank not found"}), 404
+
+    settings = db.session.get(FoodBankSlotSettings, fb_uuid)
+    if settings is None:
+        settings = FoodBankSlotSettings(food_bank_id=fb_uuid)
+        db.session.add(settings)
+    settings.slot_minutes = slot_minutes
+    settings.capacity = capacity
+    settings.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    bus.emit("slot_settings_changed", food_bank_id=str(fb_uuid),
+             slot_minutes=slot_minutes, capacity=capacity)
+    return jsonify(settings.to_json())
+
+
 @app.post("/api/meetups")
+@idempotency_keys.idempotent
 def create_meetup():
     """
     Create a new meetup.
@@ -507,17 +1836,27 @@ def create_meetup():
     pair_key = f"{donor_uuid}:{posting_uuid}"
 
     with meetup_bloom_lock:
-        if pair_key in meetup_bloom:
-            # Bloom filter says "probably yes" → confirm with real DB query
-            existing = (
-                Meetup.query
+        maybe_booked = pair_key in meetup_bloom
+
+    # Bloom filter says "probably yes" → confirm with real DB query.
+    # While the filter is still warming up a "no" can't be trusted either.
+    if maybe_booked or not meetup_bloom_status.ready:
+        existing = (
+            Meetup.query
+            .filter_by(donor_id=donor_uuid, posting_id=posting_uuid)
+            .first()
+        )
+        if not existing:
+            # A completed meetup may have been archived since (see archive.py)
+                    existing = (
+                db.session.query(MeetupArchive.id)
                 .filter_by(donor_id=donor_uuid, posting_id=posting_uuid)
                 .first()
             )
-            if existing:
-                return jsonify({
-                    "error": "You already have a donation scheduled for this posting."
-                }), 400
+        if existing:
+            return jsonify({
+                "error": "You already have a donation scheduled for this posting."
+            }), 400
     # ---------------------------------------------------------------------------
 
     # Validate scheduled_date and scheduled_time
@@ -579,6 +1918,15 @@ def create_meetup():
             "error": f"Donation quantity ({qty} lbs) exceeds quantity needed ({posting.qty_needed} lbs)"
         }), 400
 
+    window_error = _pickup_window_error(posting, scheduled_date, scheduled_time)
+    if window_error:
+        return jsonify({"error": window_error}), 400
+
+    meetup_id = uuid4()
+    previous_slot, slot_error = _reserve_pickup_slot(meetup_id, fb_uuid, scheduled_date, scheduled_time)
+    if slot_error:
+        return slot_error
+
     # Deduct the quantity from the posting
     posting.qty_needed -= qty
     posting.updated_at = datetime.utcnow()
@@ -586,7 +1934,7 @@ def create_meetup():
     now = datetime.utcnow()
 
     meetup = Meetup(
-        id=uuid4(),
+        id=meetup_id,
         posting_id=posting_uuid,
         donor_id=donor_uuid,
         food_bank_id=fb_uuid,
@@ -601,12 +1949,21 @@ def create_meetup():
     )
 
     db.session.add(meetup)
-    db.session.commit()
-
-    # After successfully creating the meetup, add the pair to the Bloom filter
-    pair_key = f"{donor_uuid}:{posting_uuid}"
-    with meetup_bloom_lock:
-        meetup_bloom.add(pair_key)
+    try:
+        slot_error = _confirm_pickup_slot(fb_uuid, scheduled_date, scheduled_time)
+        if slot_error:
+            db.session.rollback()
+            _release_pickup_slot(meetup_id, previous_slot)
+            return slot_error
+        db.session.commit()
+    except Exception:
+        _release_pickup_slot(meetup_id, previous_slot)
+        raise
+
+    # After successfully creating the meetup, add the pair to every
+    # worker's Bloom filter; qty_needed of the posting changed too
+    bus.emit("meetup_changed", change="created", **_meetup_event(meetup))
+    bus.emit("posting_updated", **_posting_event(posting))
     
     return jsonify(meetup.to_json()), 201
 
@@ -656,6 +2013,11 @@ def mark_meetup_completed(meetup_id):
     meetup.updated_at = now
     
     db.session.commit()
+
+    bus.emit("meetup_changed", change="completed", completion_status=meetup.completion_status,
+             **_meetup_event(meetup))
+    if not completed and posting:
+        bus.emit("posting_updated", **_posting_event(posting))
     
     return jsonify(meetup.to_json())
 
@@ -707,6 +2069,8 @@ def create_time_change_request():
     meetup = Meetup.query.filter_by(id=meetup_uuid).first()
     if not meetup:
         return jsonify({"error": "Meetup not found"}), 404
+    if meetup.completed:
+        return jsonify({"error": "Meetup is already completed"}), 400
 
     # Validate food_bank_id
     try:
@@ -754,34 +2118,36 @@ def create_time_change_request():
     db.session.add(time_change_request)
     db.session.commit()
 
+    bus.emit("time_change_request", **_time_change_event(time_change_request, meetup, "created"))
+
     return jsonify(time_change_request.to_json()), 201
 
 
 @app.get("/api/meetup_time_change_requests")
+@read_replica
 def list_time_change_requests():
     """
     List meetup time change requests.
     Optional filters: meetup_id, status ('pending', 'approved', 'rejected')
+    Optional: fields (comma-separated subset of the request keys),
+    history=true to include archived (answered) requests
     """
-    meetup_id = request.args.get("meetup_id")
-    status = request.args.get("status")
-
-    query = MeetupTimeChangeRequest.query
-
-    if meetup_id:
-        try:
-            meetup_uuid = UUID(meetup_id)
-            query = query.filter_by(meetup_id=meetup_uuid)
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid meetup_id format"}), 400
+    meetup_uuid, error = read_queries.uuid_arg(request.args, "meetup_id")
+    if error:
+        return jsonify({"error": error}), 400
 
+    status = request.args.get("status")
     if status:
         if status not in ['pending', 'approved', 'rejected']:
             return jsonify({"error": "status must be 'pending', 'approved', or 'rejected'"}), 400
-        query = query.filter_by(status=status)
 
-    requests = query.order_by(MeetupTimeChangeRequest.created_at.desc()).all()
-    return jsonify({"requests": [r.to_json() for r in requests]})
+    encoder, error = row_encoders.TIME_CHANGE_REQUESTS.for_fields(request.args.get("fields"))
+    if error:
+        return jsonify({"error": error}), 400
+
+    history = read_queries.history_arg(request.args)
+    stmt = read_queries.time_change_requests_query(encoder, meetup_uuid, status, history)
+    return jsonify({"requests": encoder.encode_all(db.session.execute(stmt).all())})
 
 
 @app.put("/api/meetup_time_change_requests/<request_id>")
@@ -810,9 +2176,24 @@ def respond_to_time_change_request(request_id):
 
     now = datetime.utcnow()
 
+    meetup = Meetup.query.filter_by(id=time_change_request.meetup_id).first()
+    previous_slot = None
+    if action == 'approve' and meetup and meetup.completed:
+        # The pickup already happened; moving it would take a slot again
+        return jsonify({"error": "Meetup is already completed"}), 400
+    if action == 'approve' and meetup:
+        posting = DonationPosting.query.filter_by(id=meetup.posting_id).first()
+        window_error = posting and _pickup_window_error(
+            posting, time_change_request.new_date, time_change_request.new_time)
+        if window_error:
+            return jsonify({"error": window_error}), 400
+        previous_slot, slot_error = _reserve_pickup_slot(
+            meetup.id, meetup.food_bank_id, time_change_request.new_date, time_change_request.new_time)
+        if slot_error:
+            return slot_error
+
     if action == 'approve':
         # Update the meetup with the new time
-        meetup = Meetup.query.filter_by(id=time_change_request.meetup_id).first()
         if meetup:
             meetup.scheduled_date = time_change_request.new_date
             meetup.scheduled_time = time_change_request.new_time
@@ -825,7 +2206,25 @@ def respond_to_time_change_request(request_id):
     time_change_request.responded_at = now
     time_change_request.updated_at = now
 
-    db.session.commit()
+    try:
+        if action == 'approve' and meetup:
+            slot_error = _confirm_pickup_slot(
+                meetup.food_bank_id, time_change_request.new_date, time_change_request.new_time)
+            if slot_error:
+                db.session.rollback()
+                _release_pickup_slot(meetup.id, previous_slot)
+                return slot_error
+        db.session.commit()
+    except Exception:
+        if action == 'approve' and meetup:
+            _release_pickup_slot(meetup.id, previous_slot)
+        raise
+
+    if meetup is not None:
+        bus.emit("time_change_request", **_time_change_event(
+            time_change_request, meetup, time_change_request.status))
+    if meetup is not None and action == 'approve':
+        bus.emit("meetup_changed", change="rescheduled", **_meetup_event(meetup))
 
     return jsonify(time_change_request.to_json())
 
@@ -833,6 +2232,8 @@ def respond_to_time_change_request(request_id):
 # --- Leaderboard (by total donated weight) ---
 
 @app.get("/api/leaderboard")
+@read_replica
+@cache.cached(lambda args: ["leaderboard"])
 def leaderboard():
     """
     Build a leaderboard of donors based on TOTAL WEIGHT donated
@@ -843,53 +2244,15 @@ def leaderboard():
     """
     timeframe = (request.args.get("timeframe") or "alltime").lower()
 
-    now = datetime.now()
-    cutoff = None
-
-    if timeframe == "week":
-        cutoff = now - timedelta(days=7)
-    elif timeframe == "month":
-        cutoff = now - timedelta(days=30)
- 
-    query = db.session.query(
-        Meetup.donor_id,
-        db.func.count(Meetup.id).label("total_meetups"),
-        db.func.coalesce(db.func.sum(Meetup.quantity), 0).label("total_weight"),
-    ).filter(Meetup.completed.is_(True))
-
-    if cutoff is not None:
-        query = query.filter(Meetup.completed_at >= cutoff)
-
-    rows = (
-        query
-        .group_by(Meetup.donor_id)
-        .order_by(db.func.coalesce(db.func.sum(Meetup.quantity), 0).desc())
-        .limit(50)
-        .all()
-    )
+    cutoff = read_queries.leaderboard_cutoff(timeframe)
+    rows = db.session.execute(read_queries.leaderboard_query(cutoff)).all()
 
     donor_ids = [row.donor_id for row in rows]
-    donors = Donor.query.filter(Donor.id.in_(donor_ids)).all()
-    donor_by_id = {d.id: d for d in donors}
-
-    profiles = Profile.query.filter(Profile.id.in_(donor_ids)).all()
-    profile_by_id = {p.id: p for p in profiles}
+    donors_stmt, profiles_stmt = read_queries.leaderboard_people_queries(donor_ids)
+    donors = db.session.execute(donors_stmt).scalars().all()
+    profiles = db.session.execute(profiles_stmt).scalars().all()
 
-    out = []
-    rank = 1
-    for row in rows:
-        donor = donor_by_id.get(row.donor_id)
-        profile = profile_by_id.get(row.donor_id)
-        out.append({
-            "rank": rank,
-            "donor_id": str(row.donor_id),
-            "first_name": donor.first_name if donor else None,
-            "last_name": donor.last_name if donor else None,
-            "email": profile.email if profile else None,
-            "total_meetups": int(row.total_meetups or 0),
-            "total_weight": float(row.total_weight or 0),
-        })
-        rank += 1
+    out = read_queries.leaderboard_json(rows, donors, profiles)
 
     return jsonify({
         "timeframe": timeframe,
@@ -897,22 +2260,39 @@ def leaderboard():
     })
 
 
+# --- Archive closed meetups (see archive.py) ---
+
+@app.cli.command("archive")
+@click.option("--older-than-days", type=int, default=None,
+              help="Archive rows closed more than this many days ago (default ARCHIVE_AFTER_DAYS).")
+@click.option("--batch-size", type=int, default=None, help="Rows per transaction (default ARCHIVE_BATCH).")
+def archive_command(older_than_days, batch_size):
+    """
+    Move completed meetups and answered time change requests to the
+    archive tables, e.g. nightly from cron: flask --app app archive
+    """
+    create_tables()
+    try:
+        moved = archive.run(
+            db.session,
+            older_than_days or app.config["ARCHIVE_AFTER_DAYS"],
+            batch_size or app.config["ARCHIVE_BATCH"],
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    if moved["meetups"] or moved["time_change_requests"]:
+        bus.emit("meetups_archived", **moved)
+    click.echo(f"Archived {moved['meetups']} meetups and {moved['time_change_requests']} "
+               f"time change requests closed before {moved['cutoff']}")
+
+
 if __name__ == "__main__":
+    # Local dev server: build the indexes up front (WSGI servers use create_app)
     with app.app_context():
-        # Build Trie at startup
-        try:
-            _build_trie_from_db()
-        except Exception as e:
-            print("WARNING: Could not build Trie from DB at startup:", repr(e))
-            import traceback
-            traceback.print_exc()
-
-        # Build Meetup Bloom filter at startup
-        try:
-            _build_meetup_bloom_from_db()
-        except Exception as e:
-            print("WARNING: Could not build Meetup Bloom filter at startup:", repr(e))
-            import traceback
-            traceback.print_exc()
+        create_tables()
+        _warm_indexes()
+    if app.config["POSTING_EXPIRY"]:
+        posting_expiry.start(app)
 
+    start_event_bus()
     app.run(debug=True, port=5000)
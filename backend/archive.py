@@ -0,0 +1,124 @@
+# archive.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, insert, literal, select
+
+from models import (
+    ArchivedDonorTotal,
+    Meetup,
+    MeetupArchive,
+    MeetupTimeChangeRequest,
+    MeetupTimeChangeRequestArchive,
+)
+
+
+# Moves closed rows out of the hot tables in batches: answered time change
+# requests first, then completed meetups that no longer have any time
+# change request left in the hot table (the foreign key would block the
+# delete otherwise). Each batch is one transaction: copy with
+# INSERT ... SELECT, delete, and for meetups fold the batch into the
+# per-donor totals the all-time leaderboard adds to the hot rows.
+
+# The week and month leaderboards only read the hot table
+MIN_AGE_DAYS = 31
+
+# hot table -> archive table, for read_queries.on_archive()
+ARCHIVES = {
+    Meetup.__table__: MeetupArchive.__table__,
+    MeetupTimeChangeRequest.__table__: MeetupTimeChangeRequestArchive.__table__,
+}
+
+TABLES = (MeetupArchive.__table__, MeetupTimeChangeRequestArchive.__table__, ArchivedDonorTotal.__table__)
+
+
+def _move(session, hot, archived, ids, now):
+    names = [column.name for column in hot.__table__.columns]
+    source = hot.__table__
+    session.execute(
+        insert(archived).from_select(
+            names + ["archived_at"],
+            select(*[source.c[name] for name in names],
+                   literal(now, archived.archived_at.type)).where(source.c.id.in_(ids)),
+        )
+    )
+    session.execute(delete(hot).where(hot.id.in_(ids)).execution_options(synchronize_session=False))
+
+
+def _add_donor_totals(session, ids):
+    rows = session.execute(
+        select(Meetup.donor_id, func.count(Meetup.id), func.coalesce(func.sum(Meetup.quantity), 0))
+        .where(Meetup.id.in_(ids))
+        .group_by(Meetup.donor_id)
+    ).all()
+    existing = {
+        total.donor_id: total
+        for total in session.scalars(
+            select(ArchivedDonorTotal).where(ArchivedDonorTotal.donor_id.in_([row[0] for row in rows])))
+    }
+    for donor_id, meetups, weight in rows:
+        total = existing.get(donor_id)
+        if total is None:
+            session.add(ArchivedDonorTotal(donor_id=donor_id, total_meetups=meetups, total_weight=weight))
+        else:
+            total.total_meetups += meetups
+            total.total_weight += weight
+
+
+def archive_time_change_requests(session, cutoff, batch_size=1000, now=None):
+    now = now or datetime.utcnow()
+    moved = 0
+    while True:
+        ids = session.scalars(
+            select(MeetupTimeChangeRequest.id)
+            .where(MeetupTimeChangeRequest.status.in_(("approved", "rejected")))
+            .where(MeetupTimeChangeRequest.responded_at < cutoff)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        _move(session, MeetupTimeChangeRequest, MeetupTimeChangeRequestArchive, ids, now)
+        session.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+    return moved
+
+
+def archive_meetups(session, cutoff, batch_size=1000, now=None):
+    now = now or datetime.utcnow()
+    moved = 0
+    while True:
+        ids = session.scalars(
+            select(Meetup.id)
+            .where(Meetup.completed.is_(True))
+            .where(Meetup.completed_at < cutoff)
+            .where(~exists().where(MeetupTimeChangeRequest.meetup_id == Meetup.id))
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        _add_donor_totals(session, ids)
+        _move(session, Meetup, MeetupArchive, ids, now)
+        session.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+    return moved
+
+
+def run(session, older_than_days, batch_size=1000, now=None):
+    """
+    Archive everything closed more than older_than_days ago; returns
+    what was moved.
+    """
+    if older_than_days < MIN_AGE_DAYS:
+        raise ValueError(f"older_than_days must be at least {MIN_AGE_DAYS} (the month leaderboard reads hot rows only)")
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+    try:
+        requests = archive_time_change_requests(session, cutoff, batch_size, now)
+        meetups = archive_meetups(session, cutoff, batch_size, now)
+    except Exception:
+        session.rollback()
+        raise
+    return {"cutoff": cutoff.isoformat(), "meetups": meetups, "time_change_requests": requests}
@@ -0,0 +1,462 @@
+# asgi.py
+# Entry point for ASGI servers (optional; needs uvicorn and an async
+# driver: aiosqlite for SQLite, asyncpg for Postgres), e.g.
+#   uvicorn asgi:application --workers 4 --port 5000
+# The hot read endpoints below run as coroutines on an async SQLAlchemy
+# engine, so thousands of open connections don't each hold a thread;
+# every other route is passed through to the Flask app on a thread pool.
+import asyncio
+import time
+from urllib.parse import parse_qsl
+from uuid import UUID
+
+from flask import g
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import MultiDict
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    from uvicorn.middleware.wsgi import WSGIMiddleware
+
+import app as app_module
+import facet_index
+import read_queries
+import row_encoders
+import search_backend
+import streams
+from config import _set_sqlite_pragmas, app as flask_app, db
+from metrics import RequestStats, instrument_engine, registry
+from routing import REPLICA_BIND, RYW_HEADER, consistent_read
+
+
+def async_url(url):
+    """
+    The async driver URL for a sync SQLAlchemy URL.
+    """
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
+
+
+def _create_engine(url):
+    options = flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    engine = create_async_engine(
+        url,
+        pool_pre_ping=options.get("pool_pre_ping", True),
+        pool_recycle=options.get("pool_recycle", 300),
+        pool_size=options.get("pool_size", 10),
+        max_overflow=options.get("max_overflow", 5),
+    )
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+class AsyncReads:
+    """
+    Async engines (primary and optional replica) and the sessions the
+    native handlers run their SELECTs on.
+    """
+
+    def __init__(self):
+        config = flask_app.config
+        self.primary = _create_engine(config["ASYNC_DATABASE_URL"] or async_url(config["SQLALCHEMY_DATABASE_URI"]))
+        self.replica = None
+        replica_bind = config.get("SQLALCHEMY_BINDS", {}).get(REPLICA_BIND)
+        if replica_bind:
+            self.replica = _create_engine(config["ASYNC_DATABASE_REPLICA_URL"] or async_url(replica_bind["url"]))
+        self.sessions = async_sessionmaker(self.primary, expire_on_commit=False)
+        self.replica_sessions = (async_sessionmaker(self.replica, expire_on_commit=False)
+                                 if self.replica is not None else None)
+
+    def session(self, replica):
+        if replica and self.replica_sessions is not None:
+            return self.replica_sessions()
+        return self.sessions()
+
+    async def dispose(self):
+        await self.primary.dispose()
+        if self.replica is not None:
+            await self.replica.dispose()
+
+
+class Request:
+    __slots__ = ("args", "replica", "stats", "reads")
+
+    def __init__(self, scope, reads):
+        query = scope.get("query_string", b"").decode("latin-1")
+        self.args = MultiDict(parse_qsl(query, keep_blank_values=True))
+        self.reads = reads
+        self.stats = RequestStats()
+        self.replica = reads.replica is not None and not self._consistent_read(scope)
+
+    @staticmethod
+    def _consistent_read(scope):
+        for name, value in scope.get("headers", ()):
+            if name == RYW_HEADER.lower().encode():
+                return consistent_read(value.decode("latin-1"))
+        return False
+
+    async def scalars(self, session, stmt):
+        start = time.perf_counter()
+        result = (await session.execute(stmt)).scalars().all()
+        self.stats.sql_count += 1
+        self.stats.db_seconds += time.perf_counter() - start
+        return result
+
+    async def rows(self, session, stmt):
+        start = time.perf_counter()
+        result = (await session.execute(stmt)).all()
+        self.stats.sql_count += 1
+        self.stats.db_seconds += time.perf_counter() - start
+        return result
+
+
+# --- Native handlers: (status, payload) like the Flask views they mirror ---
+
+async def list_food_banks(req):
+    encoder, error = row_encoders.FOOD_BANKS.for_fields(req.args.get("fields"))
+    if error:
+        return 400, {"error": error}
+    async with req.reads.session(req.replica) as session:
+        rows = await req.rows(session, read_queries.food_banks_query(encoder))
+    return 200, {"food_banks": encoder.encode_all(rows)}
+
+
+async def get_donation_postings(req):
+    fb_uuid, error = read_queries.uuid_arg(req.args, "food_bank_id")
+    if error:
+        return 400, {"error": error}
+    encoder, error = row_encoders.POSTINGS.for_fields(req.args.get("fields"))
+    if error:
+        return 400, {"error": error}
+    if read_queries.faceted_arg(req.args, plain=("food_bank_id",)):
+        filters, counted, limit, offset, error = read_queries.facet_args(req.args)
+        if error:
+            return 400, {"error": error}
+        prefix = (req.args.get("q") or "").strip()
+        return 200, await _faceted_postings(req, encoder, filters, counted, prefix, limit, offset)
+    async with req.reads.session(req.replica) as session:
+        rows = await req.rows(session, read_queries.donation_postings_query(encoder, fb_uuid))
+    return 200, {"postings": encoder.encode_all(rows)}
+
+
+async def list_meetups(req):
+    encoder, error = row_encoders.MEETUPS.for_fields(req.args.get("fields"))
+    if error:
+        return 400, {"error": error}
+    stmt, error = read_queries.meetups_query(encoder, req.args)
+    if error:
+        return 400, {"error": error}
+    async with req.reads.session(req.replica) as session:
+        rows = await req.rows(session, stmt)
+    return 200, {"meetups": encoder.encode_all(rows)}
+
+
+async def leaderboard(req):
+    timeframe = (req.args.get("timeframe") or "alltime").lower()
+    cutoff = read_queries.leaderboard_cutoff(timeframe)
+    async with req.reads.session(req.replica) as session:
+        rows = await req.rows(session, read_queries.leaderboard_query(cutoff))
+        donors_stmt, profiles_stmt = read_queries.leaderboard_people_queries([row.donor_id for row in rows])
+        donors = await req.scalars(session, donors_stmt)
+        profiles = await req.scalars(session, profiles_stmt)
+    return 200, {"timeframe": timeframe, "leaderboard": read_queries.leaderboard_json(rows, donors, profiles)}
+
+
+def _lookup_in_thread(kind, prefix, limit, replica):
+    with flask_app.app_context():
+        g._use_replica = replica
+        try:
+            return app_module._prefix_lookup(kind, prefix, limit)
+        finally:
+            db.session.remove()
+
+
+async def _prefix_lookup(kind, prefix, limit, replica):
+    """
+    app._prefix_lookup without blocking the loop: a ready Trie answers
+    in memory; the database backend and the degraded fallback run on a
+    worker thread.
+    """
+    index = app_module.search_index
+    if isinstance(index, search_backend.TrieSearchBackend) and index.ready:
+        lookup = index.suggest if kind == "suggest" else index.search_ids
+        key = (kind, search_backend.clean_prefix(prefix).strip(), limit, replica)
+        return app_module.prefix_cache.get_or_compute(key, lambda: lookup(prefix, limit))
+    return await asyncio.to_thread(_lookup_in_thread, kind, prefix, limit, replica)
+
+
+async def autocomplete_items(req):
+    prefix = (req.args.get("q") or "").strip()
+    if not prefix:
+        return 200, {"items": []}
+
+    async def compute():
+        degraded = not app_module.search_index.ready
+        words = await _prefix_lookup("suggest", prefix, 10, False)
+        return {"items": words, "degraded": True} if degraded else {"items": words}
+
+    key = ("autocomplete", search_backend.clean_prefix(prefix).strip())
+    return 200, await app_module.async_search_flight.do(key, compute)
+
+
+def _facet_search_in_thread(filters, prefix, limit, offset, counted):
+    with flask_app.app_context():
+        try:
+            return app_module._facet_search(filters, prefix, limit, offset, counted)
+        finally:
+            db.session.remove()
+
+
+async def _faceted_postings(req, encoder, filters, counted, prefix, limit, offset):
+    """
+    app._faceted_postings_payload. The bitmap work (or, before the index
+    is built, the database fallback) runs on a worker thread: a wide
+    filter or the counts take long enough to stall the event loop.
+    """
+    ids, total, counts, degraded = await asyncio.to_thread(
+        _facet_search_in_thread, filters, prefix, limit, offset, counted)
+    rows = []
+    if ids:
+        async with req.reads.session(req.replica) as session:
+            for stmt in read_queries.postings_by_ids_queries(encoder, ids):
+                rows.extend(await req.rows(session, stmt))
+    payload = {"postings": read_queries.ordered_postings_json(encoder, rows, ids), "total": total}
+    if counted:
+        payload["facets"] = counts
+    if degraded:
+        payload["degraded"] = True
+    return payload
+
+
+async def search_postings(req):
+    encoder, error = row_encoders.POSTINGS.for_fields(req.args.get("fields"))
+    if error:
+        return 400, {"error": error}
+    prefix = (req.args.get("q") or "").strip()
+    if read_queries.faceted_arg(req.args, plain=("q",)):
+        filters, counted, limit, offset, error = read_queries.facet_args(req.args, default_limit=20, max_limit=100)
+        if error:
+            return 400, {"error": error}
+        key = ("search_facets", search_backend.clean_prefix(prefix).strip(), facet_index.filters_key(filters),
+               counted, limit, offset, encoder.keys, req.replica)
+        return 200, await app_module.async_search_flight.do(
+            key, lambda: _faceted_postings(req, encoder, filters, counted, prefix, limit, offset))
+    if not prefix:
+        return 200, {"postings": []}
+
+    async def compute():
+        id_list = await _prefix_lookup("search", prefix, 20, req.replica)
+        uuid_ids = []
+        for s in id_list or ():
+            try:
+                uuid_ids.append(UUID(s))
+            except ValueError:
+                continue
+        if not uuid_ids:
+            return {"postings": []}
+        async with req.reads.session(req.replica) as session:
+            rows = await req.rows(session, read_queries.postings_by_ids_query(encoder, uuid_ids))
+        return {"postings": read_queries.ordered_postings_json(encoder, rows, id_list)}
+
+    key = ("search", search_backend.clean_prefix(prefix).strip(), encoder.keys, req.replica)
+    return 200, await app_module.async_search_flight.do(key, compute)
+
+
+def _tags(*tags):
+    return lambda args: list(tags)
+
+
+# path -> (Flask endpoint name, handler, response cache tags or None)
+ROUTES = {
+    "/api/food_banks": ("list_food_banks", list_food_banks, _tags("food_banks")),
+    "/api/donation_postings": ("get_donation_postings", get_donation_postings, app_module._postings_tags),
+    "/api/meetups": ("list_meetups", list_meetups, app_module._meetups_tags),
+    "/api/leaderboard": ("leaderboard", leaderboard, _tags("leaderboard")),
+    "/api/items/autocomplete": ("autocomplete_items", autocomplete_items, None),
+    "/api/search/postings": ("search_postings", search_postings, None),
+}
+
+
+# --- GET /api/stream on the event loop ---
+
+STREAM_PATH = "/api/stream"
+
+
+async def _send_json(send, status, payload):
+    body = f"{flask_app.json.dumps(payload, separators=(',', ':'))}\n".encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"access-control-allow-origin", b"*"),
+        (b"content-type", flask_app.json.mimetype.encode()),
+        (b"content-length", str(len(body)).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _disconnected(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream(scope, receive, send):
+    """
+    The Flask /api/stream (streams.py) without a thread per connection:
+    the subscriber's waker sets an asyncio.Event from the publishing
+    thread, and the connection waits on it between heartbeats.
+    """
+    start = time.perf_counter()
+    hub = flask_app.extensions["stream_hub"]
+    args = MultiDict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+    topics, error = streams.stream_topics(args)
+    if error:
+        registry.observe_request("GET", STREAM_PATH, 400, time.perf_counter() - start, 0, 0.0)
+        return await _send_json(send, 400, {"error": error})
+    last_event_id = args.get("last_event_id")
+    for name, value in scope.get("headers", ()):
+        if name == b"last-event-id":
+            last_event_id = value.decode("latin-1")
+    sub, replay = hub.subscribe(topics, last_event_id)
+    if sub is None:
+        registry.observe_request("GET", STREAM_PATH, 503, time.perf_counter() - start, 0, 0.0)
+        return await _send_json(send, 503, {"error": "Too many open streams, retry later"})
+    registry.observe_request("GET", STREAM_PATH, 200, time.perf_counter() - start, 0, 0.0)
+
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(ready.set)
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    sub.waker = wake
+    gone = asyncio.ensure_future(_disconnected(receive))
+    heartbeat = flask_app.config["STREAM_HEARTBEAT_SECONDS"]
+    try:
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"access-control-allow-origin", b"*"),
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ]})
+        await send({"type": "http.response.body", "body": streams.opening(hub, replay).encode(), "more_body": True})
+        while not gone.done():
+            woken = asyncio.ensure_future(ready.wait())
+            await asyncio.wait((woken, gone), timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED)
+            woken.cancel()
+            if gone.done():
+                break
+            ready.clear()
+            items = sub.take()
+            if sub.dropped:
+                chunk = streams.format_event(hub.event_id(hub.seq), "resync", {})
+                await send({"type": "http.response.body", "body": chunk.encode()})
+                return
+            chunk = streams.render(hub, items) if items else streams.KEEP_ALIVE
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+    finally:
+        gone.cancel()
+        sub.waker = None
+        hub.unsubscribe(sub)
+
+
+# --- ASGI app ---
+
+class Application:
+    """
+    Serves ROUTES and /api/stream natively and everything else (writes,
+    admin, ...) through the Flask app, sharing its indexes, caches and
+    event bus.
+    """
+
+    def __init__(self):
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config["ASGI_WSGI_THREADS"])
+        self.reads = None
+
+    def startup(self):
+        if self.reads is None:
+            app_module.create_app()
+            # Streams here cost no thread, so the hub can hold many more
+            flask_app.extensions["stream_hub"].max_clients = flask_app.config["ASGI_STREAM_MAX_CLIENTS"]
+            self.reads = AsyncReads()
+
+    async def shutdown(self):
+        if self.reads is not None:
+            await self.reads.dispose()
+            self.reads = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        get = scope["type"] == "http" and scope["method"] == "GET"
+        if get and scope.get("path") == STREAM_PATH:
+            self.startup()
+            return await stream(scope, receive, send)
+        route = ROUTES.get(scope.get("path")) if get else None
+        if route is None:
+            return await self.wsgi(scope, receive, send)
+        self.startup()  # servers run without lifespan events too
+        await self._serve(route, scope, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": repr(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _serve(self, route, scope, send):
+        endpoint, handler, tags = route
+        req = Request(scope, self.reads)
+        cache = app_module.cache
+        headers = [(b"access-control-allow-origin", b"*")]
+
+        key = body = None
+        if tags is not None and cache.enabled:
+            key = cache.key_for(endpoint, req.args, req.replica)
+            hit = cache.lookup(endpoint, key)
+            if hit is not None:
+                body, mimetype = hit
+                status = 200
+                headers += [(b"content-type", mimetype.encode()), (b"x-cache", b"HIT")]
+
+        if body is None:
+            version = cache.begin() if key is not None else None
+            status, payload = await handler(req)
+            # Same bytes as jsonify() (sorted keys, compact separators)
+            body = f"{flask_app.json.dumps(payload, separators=(',', ':'))}\n".encode()
+            if key is not None:
+                if status == 200:
+                    cache.store(key, (body, flask_app.json.mimetype), tags(req.args), version)
+                headers.append((b"x-cache", b"MISS"))
+            headers.append((b"content-type", flask_app.json.mimetype.encode()))
+
+        stats = req.stats
+        total = time.perf_counter() - stats.start
+        registry.observe_request("GET", scope["path"], status, total, stats.sql_count, stats.db_seconds)
+        headers += [
+            (b"content-length", str(len(body)).encode()),
+            (b"server-timing", (f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.sql_count} queries", '
+                                f"total;dur={total * 1000:.2f}").encode()),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+application = Application()
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the Restockd backend.
+
+Run everything from the backend/ directory so the flat imports
+(config, models, trie, ...) resolve, e.g.
+
+    python -m benchmarks.datagen --scale small --reset
+"""
@@ -0,0 +1,313 @@
+"""
+Read-heavy load at high connection counts: threaded WSGI vs. asgi.py.
+
+    python -m benchmarks.asgi_read --concurrency 64,256,1000 --duration 15
+    python -m benchmarks.asgi_read --save-baseline
+    python -m benchmarks.asgi_read --fail-on-regression
+
+Starts benchmarks.serve once per server (--server wsgi, then asgi) with
+the response cache off, opens N keep-alive connections from asyncio
+clients and has each one loop over the dashboard reads (food banks,
+postings, meetups, leaderboard, posting search). Reports throughput and
+p50/p95/p99 per server, concurrency level and endpoint. Needs uvicorn
+and aiosqlite (or asyncpg) installed.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import time as timer
+from collections import defaultdict
+from urllib.parse import quote
+
+from benchmarks.common import (
+    DEFAULT_BENCH_DB,
+    RESULTS_DIR,
+    compare_metrics,
+    load_report,
+    print_comparison,
+    run_metadata,
+    summarize,
+    use_database,
+    write_report,
+)
+from benchmarks.http_load import sample_fixtures, start_server, stop_server
+
+
+DEFAULT_OUT = RESULTS_DIR / "asgi_read.json"
+DEFAULT_BASELINE = RESULTS_DIR / "asgi_read.baseline.json"
+
+ENDPOINT_WEIGHTS = {
+    "GET /api/food_banks": 10,
+    "GET /api/donation_postings?food_bank_id": 25,
+    "GET /api/meetups?donor_id": 20,
+    "GET /api/meetups?food_bank_id": 15,
+    "GET /api/leaderboard": 10,
+    "GET /api/search/postings": 20,
+}
+
+
+def _path_for(label, fixtures, rng):
+    if label == "GET /api/food_banks":
+        return "/api/food_banks"
+    if label == "GET /api/donation_postings?food_bank_id":
+        return f"/api/donation_postings?food_bank_id={rng.choice(fixtures['bank_ids'])}"
+    if label == "GET /api/meetups?donor_id":
+        return f"/api/meetups?donor_id={rng.choice(fixtures['donor_ids'])}"
+    if label == "GET /api/meetups?food_bank_id":
+        return f"/api/meetups?food_bank_id={rng.choice(fixtures['bank_ids'])}&completed=false"
+    if label == "GET /api/leaderboard":
+        return f"/api/leaderboard?timeframe={rng.choice(('week', 'month', 'alltime'))}"
+    word = rng.choice(fixtures["words"]) if fixtures["words"] else "rice"
+    return f"/api/search/postings?q={quote(word[:rng.randint(2, 4)])}"
+
+
+# --- Async keep-alive client ---
+
+async def _read_response(reader):
+    """
+    (status, keep_alive) after reading one Content-Length framed response.
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = None
+    keep_alive = True
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value.strip())
+        elif name == b"connection" and value.strip().lower() == b"close":
+            keep_alive = False
+    if length is None:
+        raise ValueError("response without Content-Length")
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def _request(port, conn, path, timeout):
+    """
+    One GET on conn (opened if None); returns (conn or None, status).
+    """
+    if conn is None:
+        conn = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+    reader, writer = conn
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+    status, keep_alive = await asyncio.wait_for(_read_response(reader), timeout)
+    if not keep_alive:
+        writer.close()
+        conn = None
+    return conn, status
+
+
+async def _connection(port, fixtures, seed, deadline, measure_from, samples, statuses, timeout=30.0):
+    rng = random.Random(seed)
+    labels = list(ENDPOINT_WEIGHTS)
+    weights = list(ENDPOINT_WEIGHTS.values())
+    conn = None
+    while timer.perf_counter() < deadline:
+        label = rng.choices(labels, weights)[0]
+        path = _path_for(label, fixtures, rng)
+        start = timer.perf_counter()
+        try:
+            conn, status = await _request(port, conn, path, timeout)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            status = "error"
+            if conn is not None:
+                conn[1].close()
+            conn = None
+            await asyncio.sleep(0.05)
+        elapsed = timer.perf_counter() - start
+        if start >= measure_from:
+            samples[label].append(elapsed)
+            statuses[label][status] += 1
+    if conn is not None:
+        conn[1].close()
+
+
+def _client_process(args):
+    port, fixtures, seed, connections, warmup, duration = args
+
+    async def run():
+        samples = defaultdict(list)
+        statuses = defaultdict(lambda: defaultdict(int))
+        measure_from = timer.perf_counter() + warmup
+        deadline = measure_from + duration
+        await asyncio.gather(*(
+            _connection(port, fixtures, seed * 100003 + i, deadline, measure_from, samples, statuses)
+            for i in range(connections)
+        ))
+        return dict(samples), {k: dict(v) for k, v in statuses.items()}
+
+    return asyncio.run(run())
+
+
+def run_level(port, fixtures, concurrency, warmup, duration, seed, client_procs):
+    """
+    Open concurrency connections (split over client_procs processes) and
+    return (samples, statuses) for the measured window.
+    """
+    procs = max(1, min(client_procs, concurrency))
+    shares = [concurrency // procs + (1 if i < concurrency % procs else 0) for i in range(procs)]
+    jobs = [(port, fixtures, seed + i, n, warmup, duration) for i, n in enumerate(shares)]
+    if procs == 1:
+        results = [_client_process(jobs[0])]
+    else:
+        with multiprocessing.Pool(procs) as pool:
+            results = pool.map(_client_process, jobs)
+
+    samples = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    for part_samples, part_statuses in results:
+        for label, values in part_samples.items():
+            samples[label].extend(values)
+        for label, counts in part_statuses.items():
+            for status, n in counts.items():
+                statuses[label][status] += n
+    return samples, statuses
+
+
+# --- Report ---
+
+def summarize_level(samples, statuses, duration):
+    endpoints = {}
+    for label in sorted(samples):
+        stats = summarize(samples[label])
+        stats["throughput_rps"] = round(len(samples[label]) / duration, 2)
+        stats["status_counts"] = {str(k): v for k, v in sorted(statuses[label].items(), key=str)}
+        endpoints[label] = stats
+    all_samples = [s for values in samples.values() for s in values]
+    overall = summarize(all_samples)
+    overall["throughput_rps"] = round(len(all_samples) / duration, 2)
+    overall["errors"] = sum(counts.get("error", 0) for counts in statuses.values())
+    return {"overall": overall, "endpoints": endpoints}
+
+
+def print_report(report):
+    print(f"\n{'server':<6} {'conns':>6} {'endpoint':<42} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for server, levels in report["results"].items():
+        for conns, level in levels.items():
+            rows = list(level["endpoints"].items()) + [("overall", level["overall"])]
+            for label, s in rows:
+                if not s.get("count"):
+                    continue
+                errors = s.get("errors", s["status_counts"].get("error", 0) if "status_counts" in s else 0)
+                print(f"{server:<6} {conns:>6} {label:<42} {s['throughput_rps']:>9.1f} {s['p50_ms']:>9.2f} "
+                      f"{s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} {errors:>7}")
+    if report["speedup"]:
+        print("\nASGI vs WSGI (overall throughput, p99)")
+        for conns, row in report["speedup"].items():
+            print(f"  {conns:>5} connections: {row['throughput_x']:.2f}x throughput, p99 {row['p99_x']:.2f}x")
+
+
+def _flatten(report):
+    out = {}
+    for server, levels in report["results"].items():
+        for conns, level in levels.items():
+            out[f"{server}/c{conns}/overall"] = level["overall"]
+            for label, stats in level["endpoints"].items():
+                out[f"{server}/c{conns}/{label}"] = stats
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Threaded WSGI vs. ASGI read throughput at high concurrency.")
+    parser.add_argument("--db", default=str(DEFAULT_BENCH_DB))
+    parser.add_argument("--scale", default="small", help="datagen scale used when the db is generated")
+    parser.add_argument("--seed", type=int, default=351)
+    parser.add_argument("--servers", default="wsgi,asgi")
+    parser.add_argument("--concurrency", default="64,256,1000", help="comma-separated connection counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--client-procs", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)),
+                        help="load generator processes (default: half the cores, max 4)")
+    parser.add_argument("--response-cache", default="off", help="RESPONSE_CACHE for the servers (default off)")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative change counted as a regression (default 0.15)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    servers = [s.strip() for s in args.servers.split(",") if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    dataset = {"db": args.db}
+    if not os.path.exists(args.db):
+        from benchmarks.datagen import generate
+
+        dataset.update(generate(args.db, scale=args.scale, seed=args.seed, reset=True))
+    else:
+        use_database(args.db)
+    fixtures = sample_fixtures(args.seed)
+
+    env = {"RESPONSE_CACHE": args.response_cache, "EVENT_BUS": "off"}
+    results = {}
+    for server in servers:
+        print(f"Starting {server} server...", flush=True)
+        proc = start_server(args.db, args.port, extra_env=env, extra_args=("--server", server))
+        try:
+            results[server] = {}
+            for conns in levels:
+                print(f"  {conns} connections for {args.duration:.0f}s", flush=True)
+                samples, statuses = run_level(args.port, fixtures, conns, args.warmup, args.duration,
+                                              args.seed, args.client_procs)
+                results[server][str(conns)] = summarize_level(samples, statuses, args.duration)
+        finally:
+            stop_server(proc)
+
+    speedup = {}
+    if "wsgi" in results and "asgi" in results:
+        for conns in results["asgi"]:
+            w, a = results["wsgi"][conns]["overall"], results["asgi"][conns]["overall"]
+            if w.get("count") and a.get("count"):
+                speedup[conns] = {
+                    "throughput_x": round(a["throughput_rps"] / w["throughput_rps"], 3),
+                    "p99_x": round(a["p99_ms"] / w["p99_ms"], 3),
+                }
+
+    report = {
+        "benchmark": "asgi_read",
+        "meta": run_metadata(),
+        "config": {
+            "servers": servers,
+            "concurrency": levels,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "client_procs": args.client_procs,
+            "response_cache": args.response_cache,
+            "seed": args.seed,
+            "endpoint_weights": ENDPOINT_WEIGHTS,
+        },
+        "dataset": dataset,
+        "results": results,
+        "speedup": speedup,
+    }
+    print_report(report)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nComparing against {args.baseline}")
+        rows = compare_metrics(
+            _flatten(report), _flatten(load_report(args.baseline)),
+            {"p50_ms": True, "p95_ms": True, "p99_ms": True, "throughput_rps": False},
+            threshold=args.threshold,
+        )
+        print_comparison(rows)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        regressions = [r for r in rows if r["regression"]]
+
+    print(f"\nReport written to {write_report(report, args.out)}")
+    if args.save_baseline:
+        print(f"Baseline saved to {write_report(report, args.baseline)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
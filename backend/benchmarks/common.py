@@ -0,0 +1,131 @@
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BENCH_DB = BACKEND_DIR / "bench.db"
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def database_url_for(db):
+    """
+    Accept either a SQLAlchemy URL or a path to a SQLite file.
+    """
+    db = str(db)
+    if "://" in db:
+        return db
+    return f"sqlite:///{Path(db).resolve()}"
+
+
+def use_database(db=None):
+    """
+    Point config.py at the benchmark database.
+    Must run before anything imports config (it reads DATABASE_URL once).
+    """
+    if "config" in sys.modules:
+        raise RuntimeError("use_database() must be called before config is imported")
+    os.environ["DATABASE_URL"] = database_url_for(db or DEFAULT_BENCH_DB)
+    return os.environ["DATABASE_URL"]
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def summarize(samples):
+    """
+    Latency summary (milliseconds) for a list of durations in seconds.
+    """
+    values = sorted(s * 1000.0 for s in samples)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 4),
+        "p50_ms": round(percentile(values, 50), 4),
+        "p95_ms": round(percentile(values, 95), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "max_ms": round(values[-1], 4),
+    }
+
+
+def run_metadata():
+    """
+    Environment info stored with every report so results can be compared across commits.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_report(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_metrics(current, baseline, lower_is_better, threshold=0.10):
+    """
+    Compare two {name: {metric: value}} dicts.
+    lower_is_better maps metric name -> True (latency) / False (throughput).
+    Returns a list of rows; a row is a regression when it got worse by more than threshold.
+    """
+    rows = []
+    for name in sorted(set(current) & set(baseline)):
+        for metric, lower in lower_is_better.items():
+            new = current[name].get(metric)
+            old = baseline[name].get(metric)
+            if new is None or old is None or old == 0:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if lower else change < -threshold
+            rows.append({
+                "name": name,
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change_pct": round(change * 100.0, 2),
+                "regression": worse,
+            })
+    return rows
+
+
+def print_comparison(rows):
+    if not rows:
+        print("No overlapping results to compare.")
+        return
+    print(f"{'name':<40} {'metric':<14} {'baseline':>12} {'current':>12} {'change':>9}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['name']:<40} {r['metric']:<14} {r['baseline']:>12.4f} {r['current']:>12.4f} "
+              f"{r['change_pct']:>+8.1f}%{flag}")
@@ -0,0 +1,370 @@
+"""
+Deterministic synthetic data generator for benchmark databases.
+
+    python -m benchmarks.datagen --scale medium --reset
+    python -m benchmarks.datagen --db /tmp/big.db --postings 2000000 --meetups 3000000
+
+The same --seed and --anchor always produce the same rows, so every
+benchmark can rebuild an identical dataset.
+"""
+import argparse
+import random
+import time as timer
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from benchmarks.common import DEFAULT_BENCH_DB, use_database
+
+
+SCALES = {
+    "tiny": dict(donors=200, food_banks=20, postings=1_000, meetups=2_000, time_changes=200),
+    "small": dict(donors=2_000, food_banks=100, postings=20_000, meetups=50_000, time_changes=5_000),
+    "medium": dict(donors=20_000, food_banks=1_000, postings=200_000, meetups=500_000, time_changes=50_000),
+    "large": dict(donors=200_000, food_banks=10_000, postings=1_000_000, meetups=2_000_000, time_changes=200_000),
+}
+
+URGENCY_MIX = [("Low", 0.45), ("Medium", 0.35), ("High", 0.20)]
+
+# Weighted towards pantry staples so common prefixes ("ri", "can", "mil") are hot
+FOOD_ITEMS = [
+    ("Rice", 9), ("Canned Beans", 9), ("Milk", 8), ("Pasta", 8), ("Canned Tuna", 7),
+    ("Peanut Butter", 7), ("Cereal", 6), ("Oatmeal", 5), ("Canned Corn", 5),
+    ("Canned Soup", 6), ("Bread", 6), ("Eggs", 5), ("Apples", 4), ("Bananas", 4),
+    ("Potatoes", 4), ("Onions", 3), ("Carrots", 3), ("Lentils", 3), ("Flour", 3),
+    ("Sugar", 2), ("Cooking Oil", 3), ("Baby Formula", 3), ("Diapers", 2),
+    ("Canned Tomatoes", 4), ("Tomato Sauce", 3), ("Chicken", 3), ("Ground Beef", 2),
+    ("Frozen Vegetables", 3), ("Yogurt", 2), ("Cheese", 2), ("Juice", 2),
+    ("Granola Bars", 2), ("Crackers", 2), ("Mac and Cheese", 3), ("Ramen", 2),
+    ("Applesauce", 2), ("Raisins", 1), ("Honey", 1), ("Coffee", 1), ("Tea", 1),
+]
+FOOD_QUALIFIERS = [
+    ("", 10), ("Brown", 1), ("White", 1), ("Organic", 1), ("Whole Wheat", 1),
+    ("Low Sodium", 1), ("Fresh", 2), ("Frozen", 1), ("Dried", 1), ("Family Size", 1),
+]
+
+FIRST_NAMES = [
+    "Maria", "James", "Aisha", "Wei", "Carlos", "Priya", "John", "Fatima", "Luis",
+    "Emily", "Omar", "Grace", "Diego", "Hannah", "Kwame", "Sofia", "Ivan", "Mei",
+    "Noah", "Zara", "Ethan", "Leila", "Marcus", "Ana", "Tomas", "Yuki",
+]
+LAST_NAMES = [
+    "Garcia", "Smith", "Khan", "Chen", "Lopez", "Patel", "Johnson", "Nguyen",
+    "Williams", "Brown", "Kowalski", "Okafor", "Rossi", "Kim", "Martinez",
+    "Novak", "Hernandez", "Ali", "Davis", "Wilson",
+]
+CITIES = [
+    ("Chicago", "IL", "606", 70), ("Evanston", "IL", "602", 6), ("Oak Park", "IL", "603", 6),
+    ("Cicero", "IL", "608", 5), ("Skokie", "IL", "600", 5), ("Berwyn", "IL", "604", 4),
+    ("Gary", "IN", "464", 4),
+]
+BANK_KINDS = ["Food Pantry", "Food Bank", "Community Fridge", "Food Hub", "Community Kitchen", "Food Share"]
+STREETS = ["Halsted St", "Ashland Ave", "Western Ave", "Cermak Rd", "Roosevelt Rd", "Clark St", "Damen Ave"]
+TIME_CHANGE_REASONS = ["Dock closed", "Staff shortage", "Holiday hours", "Truck delayed", "", ""]
+
+
+class _Picker:
+    """
+    Weighted choice with a precomputed cumulative table (random.choices
+    recomputes it on every call).
+    """
+
+    def __init__(self, rng, pairs):
+        self.rng = rng
+        self.values = [v for v, _ in pairs]
+        self.cum = []
+        total = 0
+        for _, w in pairs:
+            total += w
+            self.cum.append(total)
+
+    def __call__(self):
+        return self.rng.choices(self.values, cum_weights=self.cum)[0]
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DataGenerator:
+    """
+    Builds rows table by table and bulk-inserts them with executemany.
+    Only the ids needed to link later tables are kept in memory.
+    """
+
+    def __init__(self, db, counts, seed=351, anchor=None, batch_size=10_000, log=print):
+        self.db = db
+        self.counts = counts
+        self.seed = seed
+        self.anchor = anchor or date.today()
+        self.batch_size = batch_size
+        self.log = log
+        self.rng = random.Random(seed)
+
+        self.donor_ids = []
+        self.donor_names = []
+        self.bank_ids = []
+        self.bank_names = []
+        # posting index -> (id, food_bank index, food_name, from_date, to_date)
+        self.postings = []
+        self.meetup_refs = []
+
+    # --- helpers ---
+
+    def _insert(self, table, rows):
+        total = 0
+        for batch in _batched(rows, self.batch_size):
+            self.db.session.execute(table.insert(), batch)
+            self.db.session.commit()
+            total += len(batch)
+        return total
+
+    def _timed(self, name, table, rows):
+        start = timer.perf_counter()
+        n = self._insert(table, rows)
+        elapsed = timer.perf_counter() - start
+        rate = n / elapsed if elapsed else 0.0
+        self.log(f"  {name:<28} {n:>10,} rows  {elapsed:7.2f}s  ({rate:,.0f} rows/s)")
+        return n
+
+    # --- tables ---
+
+    def _profile_rows(self):
+        rng = self.rng
+        now = datetime.combine(self.anchor, time(12, 0))
+        for i in range(self.counts["donors"]):
+            pid = _uuid(rng)
+            self.donor_ids.append(pid)
+            yield {"id": pid, "email": f"donor{i}@example.com", "role": "Donor",
+                   "created_at": now, "updated_at": now}
+        for i in range(self.counts["food_banks"]):
+            pid = _uuid(rng)
+            self.bank_ids.append(pid)
+            yield {"id": pid, "email": f"food_bank_{i}@example.com", "role": "Food Bank",
+                   "created_at": now, "updated_at": now}
+
+    def _donor_rows(self):
+        rng = self.rng
+        now = datetime.combine(self.anchor, time(12, 0))
+        for donor_id in self.donor_ids:
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            city, state, zip_prefix = self._city_pick()
+            self.donor_names.append(f"{first} {last}")
+            yield {
+                "id": donor_id, "first_name": first, "last_name": last,
+                "phone": f"312555{rng.randrange(10_000):04d}",
+                "address": f"{rng.randrange(100, 9999)} {rng.choice(STREETS)}",
+                "city": city, "state": state, "postal_code": f"{zip_prefix}{rng.randrange(100):02d}",
+                "created_at": now, "updated_at": now,
+            }
+
+    def _food_bank_rows(self):
+        rng = self.rng
+        now = datetime.combine(self.anchor, time(12, 0))
+        for i, bank_id in enumerate(self.bank_ids):
+            city, state, zip_prefix = self._city_pick()
+            name = f"{rng.choice(LAST_NAMES)} {rng.choice(BANK_KINDS)} #{i}"
+            self.bank_names.append(name)
+            yield {
+                "id": bank_id, "name": name,
+                "phone": f"773555{rng.randrange(10_000):04d}",
+                "address": f"{rng.randrange(100, 9999)} {rng.choice(STREETS)}",
+                "city": city, "state": state, "postal_code": f"{zip_prefix}{rng.randrange(100):02d}",
+                "created_at": now, "updated_at": now,
+            }
+
+    def _posting_rows(self):
+        rng = self.rng
+        n_banks = len(self.bank_ids)
+        for _ in range(self.counts["postings"]):
+            posting_id = _uuid(rng)
+            bank_idx = rng.randrange(n_banks)
+            qualifier = self._qualifier_pick()
+            food_name = f"{qualifier} {self._food_pick()}".strip()
+            from_date = self.anchor - timedelta(days=rng.randrange(0, 60))
+            to_date = from_date + timedelta(days=rng.randrange(3, 45))
+            created = datetime.combine(from_date, time(8, 0)) - timedelta(hours=rng.randrange(1, 72))
+            self.postings.append((posting_id, bank_idx, food_name, from_date, to_date))
+            yield {
+                "id": posting_id,
+                "food_bank_id": self.bank_ids[bank_idx],
+                "food_name": food_name,
+                "urgency": self._urgency_pick(),
+                "qty_needed": Decimal(rng.randrange(0, 50_000)) / 100,
+                "from_date": from_date,
+                "to_date": to_date,
+                "from_time": time(rng.randrange(7, 12), rng.choice((0, 30))),
+                "to_time": time(rng.randrange(14, 20), rng.choice((0, 30))),
+                "created_at": created,
+                "updated_at": created,
+                "is_active": rng.random() < 0.9,
+            }
+
+    def _meetup_rows(self):
+        rng = self.rng
+        n_postings = len(self.postings)
+        n_donors = len(self.donor_ids)
+        max_pairs = n_postings * n_donors
+        wanted = min(self.counts["meetups"], max_pairs)
+        if wanted < self.counts["meetups"]:
+            self.log(f"  (only {max_pairs:,} unique donor/posting pairs, generating {wanted:,} meetups)")
+        # create_meetup rejects a second booking for the same donor/posting pair
+        seen = set()
+        while len(seen) < wanted:
+            p_idx = rng.randrange(n_postings)
+            d_idx = rng.randrange(n_donors)
+            if (p_idx, d_idx) in seen:
+                continue
+            seen.add((p_idx, d_idx))
+
+            posting_id, bank_idx, food_name, from_date, to_date = self.postings[p_idx]
+            span = (to_date - from_date).days
+            scheduled_date = from_date + timedelta(days=rng.randrange(span + 1))
+            created = datetime.combine(from_date, time(9, 0)) + timedelta(minutes=rng.randrange(600))
+
+            completed = scheduled_date < self.anchor and rng.random() < 0.85
+            status = None
+            completed_at = None
+            if completed:
+                status = "completed" if rng.random() < 0.85 else "not_completed"
+                completed_at = datetime.combine(scheduled_date, time(rng.randrange(9, 19), rng.randrange(60)))
+
+            meetup_id = _uuid(rng)
+            self.meetup_refs.append((meetup_id, bank_idx, d_idx, completed, scheduled_date))
+            yield {
+                "id": meetup_id,
+                "posting_id": posting_id,
+                "donor_id": self.donor_ids[d_idx],
+                "food_bank_id": self.bank_ids[bank_idx],
+                "donation_item": food_name,
+                "quantity": Decimal(rng.randrange(100, 5_000)) / 100,
+                "scheduled_date": scheduled_date,
+                "scheduled_time": time(rng.randrange(9, 18), rng.choice((0, 15, 30, 45))),
+                "completed": completed,
+                "completion_status": status,
+                "completed_at": completed_at,
+                "created_at": created,
+                "updated_at": completed_at or created,
+            }
+
+    def _time_change_rows(self):
+        rng = self.rng
+        wanted = min(self.counts["time_changes"], len(self.meetup_refs))
+        picked = rng.sample(range(len(self.meetup_refs)), wanted)
+        for m_idx in picked:
+            meetup_id, bank_idx, d_idx, completed, scheduled_date = self.meetup_refs[m_idx]
+            created = datetime.combine(scheduled_date, time(8, 0)) - timedelta(days=rng.randrange(1, 5))
+            if completed:
+                status = "approved" if rng.random() < 0.7 else "rejected"
+            else:
+                status = rng.choice(("pending", "pending", "approved", "rejected"))
+            responded = None if status == "pending" else created + timedelta(hours=rng.randrange(1, 48))
+            yield {
+                "id": _uuid(rng),
+                "meetup_id": meetup_id,
+                "requested_by": self.bank_names[bank_idx],
+                "requested_to": self.donor_names[d_idx],
+                "new_date": scheduled_date + timedelta(days=rng.randrange(1, 4)),
+                "new_time": time(rng.randrange(9, 18), rng.choice((0, 30))),
+                "reason": rng.choice(TIME_CHANGE_REASONS),
+                "status": status,
+                "created_at": created,
+                "updated_at": responded or created,
+                "responded_at": responded,
+            }
+
+    def run(self):
+        from models import (
+            Donor,
+            DonationPosting,
+            FoodBank,
+            Meetup,
+            MeetupTimeChangeRequest,
+            Profile,
+        )
+
+        rng = self.rng
+        self._city_pick = _Picker(rng, [((c, s, z), w) for c, s, z, w in CITIES])
+        self._food_pick = _Picker(rng, FOOD_ITEMS)
+        self._qualifier_pick = _Picker(rng, FOOD_QUALIFIERS)
+        self._urgency_pick = _Picker(rng, URGENCY_MIX)
+
+        start = timer.perf_counter()
+        written = {}
+        written["profiles"] = self._timed("profiles", Profile.__table__, self._profile_rows())
+        written["donors"] = self._timed("donors", Donor.__table__, self._donor_rows())
+        written["food_banks"] = self._timed("food_banks", FoodBank.__table__, self._food_bank_rows())
+        written["donation_postings"] = self._timed(
+            "donation_postings", DonationPosting.__table__, self._posting_rows())
+        written["meetups"] = self._timed("meetups", Meetup.__table__, self._meetup_rows())
+        written["meetup_time_change_requests"] = self._timed(
+            "meetup_time_change_requests", MeetupTimeChangeRequest.__table__, self._time_change_rows())
+
+        total = sum(written.values())
+        elapsed = timer.perf_counter() - start
+        self.log(f"  {'total':<28} {total:>10,} rows  {elapsed:7.2f}s")
+        return {"seed": self.seed, "anchor": self.anchor.isoformat(), "rows": written, "seconds": elapsed}
+
+
+def generate(db_url_or_path=None, scale="small", seed=351, anchor=None, reset=False,
+             batch_size=10_000, log=print, **overrides):
+    """
+    Build a benchmark database and return a summary dict.
+    Other benchmarks call this directly instead of shelling out.
+    """
+    url = use_database(db_url_or_path)
+    from config import app, db
+    import models  # noqa: F401  (registers the tables on db.metadata)
+
+    counts = dict(SCALES[scale])
+    counts.update({k: v for k, v in overrides.items() if v is not None})
+
+    log(f"Generating {scale} dataset into {url} (seed={seed})")
+    with app.app_context():
+        if reset:
+            db.drop_all()
+        db.create_all()
+        summary = DataGenerator(db, counts, seed=seed, anchor=anchor,
+                                batch_size=batch_size, log=log).run()
+    summary["database_url"] = url
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Restockd database.")
+    parser.add_argument("--db", default=str(DEFAULT_BENCH_DB),
+                        help="SQLite file path or SQLAlchemy URL (default: backend/bench.db)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=351)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=None,
+                        help="'today' for the generated data, YYYY-MM-DD (default: real today)")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--donors", type=int)
+    parser.add_argument("--food-banks", type=int)
+    parser.add_argument("--postings", type=int)
+    parser.add_argument("--meetups", type=int)
+    parser.add_argument("--time-changes", type=int)
+    args = parser.parse_args(argv)
+
+    generate(
+        args.db, scale=args.scale, seed=args.seed, anchor=args.anchor,
+        reset=args.reset, batch_size=args.batch_size,
+        donors=args.donors, food_banks=args.food_banks, postings=args.postings,
+        meetups=args.meetups, time_changes=args.time_changes,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Micro-benchmark for the food bank location grid (geo_index.GeoGrid).
+
+    python -m benchmarks.geo
+    python -m benchmarks.geo --sizes 10000 50000 100000 --save-baseline
+    python -m benchmarks.geo --quick --fail-on-regression
+
+Needs no database. Points are spread uniformly over the Chicago area
+with a fixed seed; for each size it reports build time and per-query
+latency of within() (limit 20, as the endpoint) at a few radii and
+nearest(k), next to a linear scan over every point (what the endpoint
+would cost without the grid).
+"""
+import argparse
+import os
+import random
+import sys
+
+from benchmarks.common import (
+    RESULTS_DIR,
+    compare_metrics,
+    load_report,
+    print_comparison,
+    run_metadata,
+    write_report,
+)
+from benchmarks.structures import best_of, latency_stats, per_call_latencies
+from geo_index import GeoGrid, haversine_km
+
+
+DEFAULT_OUT = RESULTS_DIR / "geo.json"
+DEFAULT_BASELINE = RESULTS_DIR / "geo.baseline.json"
+DEFAULT_SIZES = [10_000, 50_000, 100_000]
+RADII_KM = [5, 10, 25]
+NEAREST_K = 20
+LIMIT = 20  # as /api/food_banks/nearby
+
+# Roughly Waukegan to Gary
+BBOX = (41.55, 42.35, -88.30, -87.30)
+
+
+def make_points(n, seed):
+    rng = random.Random(seed)
+    lat0, lat1, lon0, lon1 = BBOX
+    return [(f"bank-{i}", rng.uniform(lat0, lat1), rng.uniform(lon0, lon1)) for i in range(n)]
+
+
+def build_grid(points, cell_km):
+    grid = GeoGrid(cell_km)
+    for key, lat, lon in points:
+        grid.insert(key, lat, lon)
+    return grid
+
+
+def linear_within(points, lat, lon, radius_km):
+    out = []
+    for key, plat, plon in points:
+        d = haversine_km(lat, lon, plat, plon)
+        if d <= radius_km:
+            out.append((d, key))
+    out.sort()
+    return out
+
+
+def bench_sizes(sizes, cell_km, repeat, queries, scan_queries, seed):
+    results = {}
+    for n in sizes:
+        points = make_points(n, seed)
+        origins = [(lat, lon) for _, lat, lon in make_points(queries, seed + 1)]
+
+        build_s = best_of(lambda: build_grid(points, cell_km), repeat)
+        results[f"grid.build[n={n}]"] = {"ops_per_s": round(n / build_s, 1)}
+        grid = build_grid(points, cell_km)
+
+        for radius in RADII_KM:
+            args = [(lat, lon, radius, LIMIT) for lat, lon in origins]
+            results[f"grid.within[n={n},r={radius}km]"] = latency_stats(per_call_latencies(grid.within, args))
+
+            # The scan is slow; a few queries are enough for its median
+            scan_args = [(points, lat, lon, radius) for lat, lon in origins[:scan_queries]]
+            results[f"scan.within[n={n},r={radius}km]"] = latency_stats(
+                per_call_latencies(linear_within, scan_args))
+
+            lat, lon = origins[0]
+            expected = linear_within(points, lat, lon, radius)
+            if grid.within(lat, lon, radius) != expected or grid.within(lat, lon, radius, LIMIT) != expected[:LIMIT]:
+                sys.exit(f"grid.within disagrees with the linear scan at n={n}, r={radius}km")
+
+        args = [(lat, lon, NEAREST_K) for lat, lon in origins]
+        results[f"grid.nearest[n={n},k={NEAREST_K}]"] = latency_stats(per_call_latencies(grid.nearest, args))
+    return results
+
+
+# --- Reporting ---
+
+# metric -> lower is better
+COMPARED_METRICS = {
+    "ops_per_s": False,
+    "median_us": True,
+    "p95_us": True,
+}
+
+
+def print_results(results):
+    for name, stats in results.items():
+        shown = ", ".join(f"{k}={v}" for k, v in stats.items())
+        print(f"{name:<40} {shown}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark for the GeoGrid spatial index.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cell-km", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--scan-queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=351)
+    parser.add_argument("--quick", action="store_true", help="small sizes for a fast smoke run")
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.sizes = [1_000, 10_000]
+        args.queries = 500
+        args.scan_queries = 5
+        args.repeat = 2
+
+    results = bench_sizes(args.sizes, args.cell_km, args.repeat, args.queries, args.scan_queries, args.seed)
+    print_results(results)
+
+    report = {
+        "benchmark": "geo",
+        "meta": run_metadata(),
+        "config": {
+            "sizes": args.sizes,
+            "cell_km": args.cell_km,
+            "limit": LIMIT,
+            "radii_km": RADII_KM,
+            "nearest_k": NEAREST_K,
+            "repeat": args.repeat,
+            "queries": args.queries,
+            "scan_queries": args.scan_queries,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nComparing against {args.baseline}")
+        rows = compare_metrics(results, load_report(args.baseline)["results"],
+                               COMPARED_METRICS, threshold=args.threshold)
+        print_comparison(rows)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        regressions = [r for r in rows if r["regression"]]
+
+    print(f"\nReport written to {write_report(report, args.out)}")
+    if args.save_baseline:
+        print(f"Baseline saved to {write_report(report, args.baseline)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+HTTP load test for every API endpoint.
+
+    python -m benchmarks.http_load --scale small --duration 30 --concurrency 16
+    python -m benchmarks.http_load --save-baseline        # store results as the new baseline
+    python -m benchmarks.http_load --fail-on-regression   # exit 1 if p95/throughput got worse
+
+Starts the app (benchmarks.serve) in a subprocess against a generated
+database, replays a weighted mix of user sessions from worker threads
+and writes throughput plus p50/p95/p99 per endpoint to a JSON report.
+Booking sessions write to the database, so regenerate it (--regenerate)
+when comparing runs that must start from identical data.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time as timer
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import quote
+
+from benchmarks.common import (
+    BACKEND_DIR,
+    DEFAULT_BENCH_DB,
+    RESULTS_DIR,
+    compare_metrics,
+    load_report,
+    print_comparison,
+    run_metadata,
+    summarize,
+    use_database,
+    write_report,
+)
+
+
+DEFAULT_OUT = RESULTS_DIR / "http_load.json"
+DEFAULT_BASELINE = RESULTS_DIR / "http_load.baseline.json"
+
+SCENARIO_WEIGHTS = {
+    "autocomplete_burst": 30,
+    "search": 10,
+    "donor_dashboard": 15,
+    "food_bank_dashboard": 15,
+    "booking": 10,
+    "leaderboard": 15,
+    "posting_detail": 5,
+}
+
+
+# --- Fixture sampling ---
+
+def sample_fixtures(seed, limit=2000):
+    """
+    Read ids and search terms the sessions will use straight from the database.
+    """
+    from sqlalchemy import func
+
+    from config import app, db
+    from models import DonationPosting, Donor, FoodBank, Meetup
+
+    rng = random.Random(seed)
+    with app.app_context():
+        bank_ids = [str(r[0]) for r in db.session.query(FoodBank.id).limit(limit).all()]
+        donor_ids = [str(r[0]) for r in db.session.query(Donor.id).limit(limit).all()]
+        postings = [
+            (str(pid), str(fb), float(qty), to_date)
+            for pid, fb, qty, to_date in (
+                db.session.query(DonationPosting.id, DonationPosting.food_bank_id,
+                                 DonationPosting.qty_needed, DonationPosting.to_date)
+                .filter(DonationPosting.is_active.is_(True))
+                .order_by(func.random())
+                .limit(limit)
+                .all()
+            )
+        ]
+        words = set()
+        for (name,) in db.session.query(DonationPosting.food_name).distinct().limit(500).all():
+            for w in name.split():
+                if w.isalpha():
+                    words.add(w.lower())
+        open_meetups = [
+            str(r[0]) for r in db.session.query(Meetup.id)
+            .filter(Meetup.completed.is_(False)).limit(limit).all()
+        ]
+
+    if not bank_ids or not donor_ids or not postings:
+        raise SystemExit("Benchmark database is empty; run benchmarks.datagen first")
+    rng.shuffle(donor_ids)
+    return {
+        "bank_ids": bank_ids,
+        "donor_ids": donor_ids,
+        "postings": postings,
+        "words": sorted(words),
+        "open_meetups": open_meetups,
+    }
+
+
+# --- Client ---
+
+class Client:
+    """
+    One keep-alive connection per worker thread; records every request.
+    """
+
+    def __init__(self, host, port, recorder):
+        self.host = host
+        self.port = port
+        self.recorder = recorder
+        self.conn = None
+
+    def _connect(self):
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def request(self, label, method, path, body=None):
+        if self.conn is None:
+            self._connect()
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+
+        start = timer.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            resp = self.conn.getresponse()
+            data = resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            self.recorder.record(label, timer.perf_counter() - start, 0)
+            return 0, None
+        self.recorder.record(label, timer.perf_counter() - start, status)
+
+        if resp.getheader("Connection", "").lower() == "close":
+            self.conn.close()
+            self.conn = None
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, label, seconds, status):
+        with self.lock:
+            self.samples[label].append(seconds)
+            self.statuses[label][status] += 1
+
+
+# --- Sessions ---
+
+class Sessions:
+    """
+    Each method replays what one screen of the frontend does.
+    """
+
+    def __init__(self, client, fixtures, rng):
+        self.c = client
+        self.f = fixtures
+        self.rng = rng
+
+    def autocomplete_burst(self):
+        # The donor dashboard fires one request per keystroke
+        word = self.rng.choice(self.f["words"])
+        for i in range(1, len(word) + 1):
+            self.c.request("GET /api/items/autocomplete", "GET",
+                           f"/api/items/autocomplete?q={quote(word[:i])}")
+        self.c.request("GET /api/search/postings", "GET", f"/api/search/postings?q={quote(word)}")
+
+    def search(self):
+        word = self.rng.choice(self.f["words"])
+        prefix = word[: self.rng.randint(2, max(2, len(word)))]
+        self.c.request("GET /api/search/postings", "GET", f"/api/search/postings?q={quote(prefix)}")
+
+    def donor_dashboard(self):
+        donor_id = self.rng.choice(self.f["donor_ids"])
+        bank_id = self.rng.choice(self.f["bank_ids"])
+        self.c.request("GET /api/food_banks", "GET", "/api/food_banks")
+        self.c.request("GET /api/donation_postings?food_bank_id", "GET",
+                       f"/api/donation_postings?food_bank_id={bank_id}")
+        self.c.request("GET /api/meetups?donor_id", "GET", f"/api/meetups?donor_id={donor_id}")
+        self.c.request("GET /api/meetup_time_change_requests?status", "GET",
+                       "/api/meetup_time_change_requests?status=pending")
+
+    def food_bank_dashboard(self):
+        bank_id = self.rng.choice(self.f["bank_ids"])
+        status, body = self.c.request("GET /api/donation_postings?food_bank_id", "GET",
+                                      f"/api/donation_postings?food_bank_id={bank_id}")
+        postings = (body or {}).get("postings", []) if status == 200 else []
+        for p in postings[:5]:
+            self.c.request("GET /api/meetups?posting_id", "GET",
+                           f"/api/meetups?posting_id={p['id']}&completed=false")
+        self.c.request("GET /api/meetups?food_bank_id", "GET", f"/api/meetups?food_bank_id={bank_id}")
+        self.c.request("GET /api/meetup_time_change_requests", "GET", "/api/meetup_time_change_requests")
+
+    def booking(self):
+        posting_id, bank_id, qty, to_date = self.rng.choice(self.f["postings"])
+        donor_id = self.rng.choice(self.f["donor_ids"])
+        scheduled = max(date.today(), to_date - timedelta(days=1))
+        status, body = self.c.request("POST /api/meetups", "POST", "/api/meetups", {
+            "posting_id": posting_id,
+            "donor_id": donor_id,
+            "food_bank_id": bank_id,
+            "scheduled_date": scheduled.isoformat(),
+            "scheduled_time": "10:30",
+            "donation_item": "benchmark",
+            "quantity": 0.01,
+        })
+        # Read-your-writes: the donor lands on "My Donations" right after booking
+        self.c.request("GET /api/meetups?donor_id", "GET", f"/api/meetups?donor_id={donor_id}")
+        if status == 201 and body:
+            self.c.request("PUT /api/meetups/<id>/complete", "PUT",
+                           f"/api/meetups/{body['id']}/complete",
+                           {"completed": self.rng.random() < 0.8})
+        else:
+            try:
+                meetup_id = self.f["open_meetups"].pop()
+            except IndexError:
+                return
+            self.c.request("PUT /api/meetups/<id>/complete", "PUT",
+                           f"/api/meetups/{meetup_id}/complete", {"completed": True})
+
+    def leaderboard(self):
+        timeframe = self.rng.choice(("week", "month", "alltime"))
+        self.c.request("GET /api/leaderboard", "GET", f"/api/leaderboard?timeframe={timeframe}")
+
+    def posting_detail(self):
+        posting_id = self.rng.choice(self.f["postings"])[0]
+        donor_id = self.rng.choice(self.f["donor_ids"])
+        self.c.request("GET /api/donation_postings/<id>", "GET", f"/api/donation_postings/{posting_id}")
+        self.c.request("GET /api/donors/<id>", "GET", f"/api/donors/{donor_id}")
+
+
+def _worker(host, port, fixtures, recorder, seed, deadline, session_counts, lock):
+    rng = random.Random(seed)
+    client = Client(host, port, recorder)
+    sessions = Sessions(client, fixtures, rng)
+    names = list(SCENARIO_WEIGHTS)
+    weights = [SCENARIO_WEIGHTS[n] for n in names]
+    try:
+        while timer.perf_counter() < deadline:
+            name = rng.choices(names, weights=weights)[0]
+            getattr(sessions, name)()
+            with lock:
+                session_counts[name] += 1
+    finally:
+        client.close()
+
+
+# --- Server lifecycle ---
+
+def start_server(db_path, port, extra_env=None, extra_args=()):
+    env = dict(os.environ)
+    env.update(extra_env or {})
+    env.pop("DATABASE_URL", None)
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    log_path = RESULTS_DIR / "server.log"
+    log = open(log_path, "wb")
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "benchmarks.serve", "--db", str(db_path), "--port", str(port),
+         *extra_args],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    log.close()
+    deadline = timer.time() + 300
+    while timer.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited early, see {log_path}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/_ready")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc
+        except OSError:
+            pass
+        timer.sleep(0.25)
+    proc.kill()
+    raise SystemExit("Server did not become ready in time")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# --- Main ---
+
+def run_load(port, fixtures, duration, concurrency, seed, warmup=2.0):
+    if warmup > 0:
+        _run_phase(port, fixtures, warmup, concurrency, seed + 10_000)
+    return _run_phase(port, fixtures, duration, concurrency, seed)
+
+
+def _run_phase(port, fixtures, duration, concurrency, seed):
+    recorder = Recorder()
+    session_counts = defaultdict(int)
+    lock = threading.Lock()
+    start = timer.perf_counter()
+    deadline = start + duration
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=("127.0.0.1", port, fixtures, recorder, seed + i, deadline, session_counts, lock),
+            daemon=True,
+        )
+        for i in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = timer.perf_counter() - start
+    return recorder, dict(session_counts), elapsed
+
+
+def build_report(recorder, session_counts, elapsed, args, dataset):
+    endpoints = {}
+    total = 0
+    for label, samples in sorted(recorder.samples.items()):
+        stats = summarize(samples)
+        stats["throughput_rps"] = round(len(samples) / elapsed, 2)
+        stats["status_counts"] = {str(k): v for k, v in sorted(recorder.statuses[label].items())}
+        endpoints[label] = stats
+        total += len(samples)
+    all_samples = [s for samples in recorder.samples.values() for s in samples]
+    overall = summarize(all_samples)
+    overall["throughput_rps"] = round(total / elapsed, 2)
+    return {
+        "benchmark": "http_load",
+        "meta": run_metadata(),
+        "config": {
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "scale": args.scale,
+            "scenario_weights": SCENARIO_WEIGHTS,
+        },
+        "dataset": dataset,
+        "elapsed_s": round(elapsed, 3),
+        "sessions": session_counts,
+        "overall": overall,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<46} {'count':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, s in report["endpoints"].items():
+        print(f"{label:<46} {s['count']:>7} {s['throughput_rps']:>9.1f} "
+              f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}")
+    o = report["overall"]
+    print(f"{'overall':<46} {o['count']:>7} {o['throughput_rps']:>9.1f} "
+          f"{o['p50_ms']:>9.2f} {o['p95_ms']:>9.2f} {o['p99_ms']:>9.2f}")
+
+
+def compare_reports(report, baseline, threshold):
+    current = dict(report["endpoints"], overall=report["overall"])
+    previous = dict(baseline["endpoints"], overall=baseline["overall"])
+    return compare_metrics(
+        current, previous,
+        {"p50_ms": True, "p95_ms": True, "p99_ms": True, "throughput_rps": False},
+        threshold=threshold,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test for the Restockd API.")
+    parser.add_argument("--db", default=str(DEFAULT_BENCH_DB))
+    parser.add_argument("--scale", default="small", help="datagen scale used when the db is (re)generated")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild the database before the run")
+    parser.add_argument("--seed", type=int, default=351)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative change counted as a regression (default 0.15)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    dataset = {"db": args.db}
+    if args.regenerate or not os.path.exists(args.db):
+        from benchmarks.datagen import generate
+
+        dataset.update(generate(args.db, scale=args.scale, seed=args.seed, reset=True))
+    else:
+        use_database(args.db)
+
+    fixtures = sample_fixtures(args.seed)
+    proc = start_server(args.db, args.port)
+    try:
+        recorder, sessions, elapsed = run_load(
+            args.port, fixtures, args.duration, args.concurrency, args.seed, warmup=args.warmup)
+    finally:
+        stop_server(proc)
+
+    report = build_report(recorder, sessions, elapsed, args, dataset)
+    print_report(report)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nComparing against {args.baseline}")
+        rows = compare_reports(report, load_report(args.baseline), args.threshold)
+        print_comparison(rows)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        regressions = [r for r in rows if r["regression"]]
+
+    print(f"\nReport written to {write_report(report, args.out)}")
+    if args.save_baseline:
+        print(f"Baseline saved to {write_report(report, args.baseline)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Micro-benchmark for donor recommendations (recommendations.PostingRanker).
+
+    python -m benchmarks.recommendations
+    python -m benchmarks.recommendations --sizes 10000 100000 --save-baseline
+    python -m benchmarks.recommendations --quick --fail-on-regression
+
+Needs no database. Random postings spread over --banks food banks in the
+Chicago area; for each size it reports ranker build time, the cost of
+one upsert (a quantity change) and per-donor top-N latency, next to
+scoring every posting for every request.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+from benchmarks.common import (
+    RESULTS_DIR,
+    compare_metrics,
+    load_report,
+    print_comparison,
+    run_metadata,
+    write_report,
+)
+from benchmarks.datagen import FOOD_ITEMS, URGENCY_MIX
+from benchmarks.geo import make_points
+from benchmarks.structures import best_of, latency_stats, per_call_latencies
+from geo_index import GeoGrid, haversine_km
+from recommendations import WEIGHTS, PostingRanker, distance_bonus, item_key, posting_score
+
+
+DEFAULT_OUT = RESULTS_DIR / "recommendations.json"
+DEFAULT_BASELINE = RESULTS_DIR / "recommendations.baseline.json"
+DEFAULT_SIZES = [10_000, 50_000, 100_000]
+TOP_N = 10
+NEAR_KM = 25.0  # as app.RECOMMENDATION_NEAR_KM
+
+
+def make_postings(n, banks, seed):
+    rng = random.Random(seed)
+    today = date.today()
+    names = [name for name, _ in FOOD_ITEMS]
+    urgencies = [u for u, _ in URGENCY_MIX]
+    weights = [w for _, w in URGENCY_MIX]
+    return [
+        (f"posting-{i}", rng.choice(banks), rng.choice(names), rng.choices(urgencies, weights)[0],
+         today + timedelta(days=rng.randint(0, 45)), round(rng.uniform(1, 500), 2))
+        for i in range(n)
+    ]
+
+
+def build_ranker(postings):
+    ranker = PostingRanker()
+    ranker.load(postings)
+    return ranker
+
+
+def make_donors(count, seed):
+    rng = random.Random(seed)
+    names = [item_key(name) for name, _ in FOOD_ITEMS]
+    return [
+        (lat, lon, set(rng.sample(names, rng.randint(0, 4))))
+        for _, lat, lon in make_points(count, seed)
+    ]
+
+
+def ranked_top(ranker, grid, lat, lon, items):
+    near = {key: km for km, key in grid.within(lat, lon, NEAR_KM)}
+
+    def far_distance(food_bank_id):
+        point = grid.points.get(food_bank_id)
+        return haversine_km(lat, lon, point[0], point[1]) if point else None
+
+    return ranker.top(TOP_N, near, items, far_distance, NEAR_KM)
+
+
+def full_pass_top(postings, grid, lat, lon, items, today):
+    scored = []
+    for posting_id, food_bank_id, food_name, urgency, to_date, qty in postings:
+        point = grid.points[food_bank_id]
+        km = haversine_km(lat, lon, point[0], point[1])
+        given_before = item_key(food_name) in items
+        score = (posting_score(urgency, to_date, qty, today) + distance_bonus(km)
+                 + (WEIGHTS["history"] if given_before else 0.0))
+        scored.append((score, posting_id, km, given_before))
+    scored.sort(reverse=True)
+    return scored[:TOP_N]
+
+
+def bench_sizes(sizes, banks, repeat, queries, scan_queries, seed):
+    grid = GeoGrid()
+    bank_ids = []
+    for key, lat, lon in make_points(banks, seed):
+        grid.insert(key, lat, lon)
+        bank_ids.append(key)
+    donors = make_donors(queries, seed + 1)
+    today = date.today()
+
+    results = {}
+    for n in sizes:
+        postings = make_postings(n, bank_ids, seed)
+        build_s = best_of(lambda: build_ranker(postings), repeat)
+        results[f"ranker.build[n={n}]"] = {"ops_per_s": round(n / build_s, 1)}
+        ranker = build_ranker(postings)
+
+        rng = random.Random(seed + 2)
+        updates = [rng.choice(postings)[:5] + (round(rng.uniform(1, 500), 2),) for _ in range(queries)]
+        results[f"ranker.upsert[n={n}]"] = latency_stats(per_call_latencies(ranker.upsert, updates))
+        ranker = build_ranker(postings)
+
+        args = [(ranker, grid, lat, lon, items) for lat, lon, items in donors]
+        results[f"ranker.top[n={n},k={TOP_N}]"] = latency_stats(per_call_latencies(ranked_top, args))
+
+        scan_args = [(postings, grid, lat, lon, items, today) for lat, lon, items in donors[:scan_queries]]
+        results[f"full_pass.top[n={n},k={TOP_N}]"] = latency_stats(per_call_latencies(full_pass_top, scan_args))
+
+        for lat, lon, items in donors[:scan_queries]:
+            got = [p for _, p, _, _ in ranked_top(ranker, grid, lat, lon, items)]
+            expected = [p for _, p, _, _ in full_pass_top(postings, grid, lat, lon, items, today)]
+            if got != expected:
+                sys.exit(f"ranker.top disagrees with the full scoring pass at n={n}")
+    return results
+
+
+# --- Reporting ---
+
+# metric -> lower is better
+COMPARED_METRICS = {
+    "ops_per_s": False,
+    "median_us": True,
+    "p95_us": True,
+}
+
+
+def print_results(results):
+    for name, stats in results.items():
+        shown = ", ".join(f"{k}={v}" for k, v in stats.items())
+        print(f"{name:<40} {shown}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark for the recommendation ranker.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--banks", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--scan-queries", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=351)
+    parser.add_argument("--quick", action="store_true", help="small sizes for a fast smoke run")
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.sizes = [1_000, 10_000]
+        args.queries = 200
+        args.scan_queries = 3
+        args.repeat = 2
+
+    results = bench_sizes(args.sizes, args.banks, args.repeat, args.queries, args.scan_queries, args.seed)
+    print_results(results)
+
+    report = {
+        "benchmark": "recommendations",
+        "meta": run_metadata(),
+        "config": {
+            "sizes": args.sizes,
+            "banks": args.banks,
+            "top_n": TOP_N,
+            "near_km": NEAR_KM,
+            "repeat": args.repeat,
+            "queries": args.queries,
+            "scan_queries": args.scan_queries,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nComparing against {args.baseline}")
+        rows = compare_metrics(results, load_report(args.baseline)["results"],
+                               COMPARED_METRICS, threshold=args.threshold)
+        print_comparison(rows)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        regressions = [r for r in rows if r["regression"]]
+
+    print(f"\nReport written to {write_report(report, args.out)}")
+    if args.save_baseline:
+        print(f"Baseline saved to {write_report(report, args.baseline)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Compare the search backends (SEARCH_BACKEND=trie vs database) on a
+generated database.
+
+    python -m benchmarks.datagen --scale small
+    python -m benchmarks.search_backends --db bench.db
+    python -m benchmarks.search_backends --backends database --save-baseline
+
+For each backend: cold build time (the database backend's FTS5 / word
+tables are dropped first), warm start time, retained memory, per-call
+suggest/search_ids latency by prefix length, end-to-end latency of the
+two endpoints through the Flask test client, and incremental
+re-index cost. Note that the database backend leaves its index tables
+in the benchmark database.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time as timer
+import tracemalloc
+
+from benchmarks.common import (
+    DEFAULT_BENCH_DB,
+    RESULTS_DIR,
+    compare_metrics,
+    load_report,
+    print_comparison,
+    run_metadata,
+    summarize,
+    use_database,
+    write_report,
+)
+
+
+DEFAULT_OUT = RESULTS_DIR / "search_backends.json"
+DEFAULT_BASELINE = RESULTS_DIR / "search_backends.baseline.json"
+BACKENDS = ("trie", "database")
+COMPARED_METRICS = {"p50_ms": True, "p95_ms": True, "seconds": True}
+
+DROP_INDEX_TABLES = {
+    "sqlite": ["DROP TABLE IF EXISTS posting_search_vocab", "DROP TABLE IF EXISTS posting_search_fts",
+               "DROP TABLE IF EXISTS posting_search_ids"],
+    "postgresql": ["DROP TABLE IF EXISTS posting_search_words"],
+}
+
+
+def sample_prefixes(db, count, seed):
+    """
+    Prefixes of length 1-4 drawn from real food_name words, so every
+    backend answers the same queries.
+    """
+    from models import DonationPosting
+    from search_backend import clean_prefix
+
+    names = [n for (n,) in db.session.query(DonationPosting.food_name).distinct().limit(5000)]
+    words = sorted({clean_prefix(w) for n in names for w in (n or "").split()} - {""})
+    rng = random.Random(seed)
+    out = {}
+    for length in (1, 2, 3, 4):
+        pool = [w for w in words if len(w) >= length]
+        if pool:
+            out[length] = [rng.choice(pool)[:length] for _ in range(count)]
+    return out
+
+
+def sample_postings(db, count, seed):
+    from models import DonationPosting
+
+    rows = db.session.query(DonationPosting.id, DonationPosting.food_name).limit(20_000).all()
+    rng = random.Random(seed)
+    return rng.sample(rows, min(count, len(rows)))
+
+
+def per_call(fn, args_list):
+    out = []
+    for args in args_list:
+        start = timer.perf_counter()
+        fn(*args)
+        out.append(timer.perf_counter() - start)
+    return out
+
+
+def make_backend(name, db):
+    import metrics
+    import search_backend
+    import warmup
+    from trie import Trie
+
+    status = warmup.IndexStatus(f"bench_{name}")
+    return search_backend.create_backend(
+        name, db, status, trie=Trie(), lock=metrics.TimedLock(f"bench_{name}_lock"),
+    )
+
+
+def timed_rebuild(backend):
+    """
+    (seconds, retained bytes) of one rebuild, with its console output muted.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = timer.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.rebuild()
+    elapsed = timer.perf_counter() - start
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, after - before
+
+
+def bench_backend(name, app_module, prefixes, postings, http_queries):
+    from sqlalchemy import text
+
+    db = app_module.db
+    results = {}
+
+    dialect = db.engine.dialect.name
+    if name == "database":
+        for sql in DROP_INDEX_TABLES.get(dialect, []):
+            db.session.execute(text(sql))
+        db.session.commit()
+
+    backend = make_backend(name, db)
+    seconds, retained = timed_rebuild(backend)
+    results[f"{name}.build_cold"] = {"seconds": round(seconds, 4), "retained_bytes": retained}
+
+    # What a restarted worker pays: the Trie rebuilds, the tables are already in sync
+    restarted = make_backend(name, db)
+    seconds, _ = timed_rebuild(restarted)
+    results[f"{name}.build_restart"] = {"seconds": round(seconds, 4)}
+    db.session.remove()
+
+    for length, ps in prefixes.items():
+        results[f"{name}.suggest[len={length}]"] = summarize(
+            per_call(backend.suggest, [(p, 10) for p in ps]))
+        results[f"{name}.search_ids[len={length}]"] = summarize(
+            per_call(backend.search_ids, [(p, 20) for p in ps]))
+    db.session.remove()
+
+    # End to end through the real views, with this backend swapped in
+    previous = app_module.search_index
+    app_module.search_index = backend
+    try:
+        client = app_module.app.test_client()
+        ps = prefixes.get(3) or next(iter(prefixes.values()))
+        ps = ps[:http_queries]
+        results[f"{name}.http_autocomplete"] = summarize(per_call(
+            lambda p: client.get("/api/items/autocomplete", query_string={"q": p}), [(p,) for p in ps]))
+        results[f"{name}.http_search"] = summarize(per_call(
+            lambda p: client.get("/api/search/postings", query_string={"q": p}), [(p,) for p in ps]))
+    finally:
+        app_module.search_index = previous
+
+    def reindex(posting_id, food_name):
+        backend.remove_posting(posting_id, food_name)
+        backend.index_posting(posting_id, food_name)
+
+    results[f"{name}.reindex_posting"] = summarize(per_call(reindex, postings))
+    db.session.remove()
+    return results
+
+
+def print_results(results):
+    for name, stats in results.items():
+        shown = ", ".join(f"{k}={v}" for k, v in stats.items())
+        print(f"{name:<40} {shown}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the trie and database search backends.")
+    parser.add_argument("--db", default=str(DEFAULT_BENCH_DB))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--http-queries", type=int, default=300)
+    parser.add_argument("--reindex", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=351)
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    db_url = use_database(args.db)
+    import app as app_module
+
+    results = {}
+    with app_module.app.app_context():
+        prefixes = sample_prefixes(app_module.db, args.queries, args.seed)
+        postings = sample_postings(app_module.db, args.reindex, args.seed)
+        app_module.db.session.remove()
+        if not prefixes:
+            sys.exit(f"No donation postings in {db_url}; run python -m benchmarks.datagen first")
+        for name in args.backends:
+            results.update(bench_backend(name, app_module, prefixes, postings, args.http_queries))
+    print_results(results)
+
+    report = {
+        "benchmark": "search_backends",
+        "meta": run_metadata(),
+        "config": {
+            "database": db_url,
+            "backends": args.backends,
+            "queries": args.queries,
+            "http_queries": args.http_queries,
+            "reindex": args.reindex,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nComparing against {args.baseline}")
+        rows = compare_metrics(results, load_report(args.baseline)["results"],
+                               COMPARED_METRICS, threshold=args.threshold)
+        print_comparison(rows)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        regressions = [r for r in rows if r["regression"]]
+
+    print(f"\nReport written to {write_report(report, args.out)}")
+    if args.save_baseline:
+        print(f"Baseline saved to {write_report(report, args.baseline)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
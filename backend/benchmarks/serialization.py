@@ -0,0 +1,175 @@
+"""
+Serialization cost of large list responses: ORM objects + to_json()
+vs. column tuples + the precompiled row encoders (row_encoders.py).
+
+    python -m benchmarks.datagen --scale small
+    python -m benchmarks.serialization --rows 10000
+    python -m benchmarks.serialization --save-baseline
+    python -m benchmarks.serialization --fail-on-regression
+
+For postings and meetups, each variant fetches --rows rows, builds the
+response dicts and JSON-encodes them the way jsonify() does, --repeat
+times. Reported per variant: fetch / encode / dumps / total time per
+response (p50, p95) and rows per second end to end. "sparse" selects
+only the --fields subset, as ?fields= does.
+"""
+import argparse
+import os
+import sys
+import time as timer
+
+from benchmarks.common import (
+    DEFAULT_BENCH_DB,
+    RESULTS_DIR,
+    compare_metrics,
+    load_report,
+    print_comparison,
+    run_metadata,
+    summarize,
+    use_database,
+    write_report,
+)
+
+
+DEFAULT_OUT = RESULTS_DIR / "serialization.json"
+DEFAULT_BASELINE = RESULTS_DIR / "serialization.baseline.json"
+COMPARED_METRICS = {"total_p50_ms": True, "total_p95_ms": True, "rows_per_s": False}
+
+SPARSE_FIELDS = {
+    "postings": "id,food_name,qty_needed",
+    "meetups": "id,scheduled_date,completed",
+}
+
+
+def bench_variant(db, dumps, fetch, encode, repeat):
+    """
+    Time fetch(), encode(result) and dumps(payload) separately, repeat times.
+    """
+    phases = {"fetch": [], "encode": [], "dumps": [], "total": []}
+    rows = 0
+    for _ in range(repeat):
+        db.session.remove()  # no identity-map reuse between runs
+        start = timer.perf_counter()
+        result = fetch()
+        fetched = timer.perf_counter()
+        payload = encode(result)
+        encoded = timer.perf_counter()
+        dumps(payload)
+        done = timer.perf_counter()
+        phases["fetch"].append(fetched - start)
+        phases["encode"].append(encoded - fetched)
+        phases["dumps"].append(done - encoded)
+        phases["total"].append(done - start)
+        rows = len(payload)
+    db.session.remove()
+
+    out = {"rows": rows}
+    for phase, samples in phases.items():
+        s = summarize(samples)
+        out[f"{phase}_p50_ms"] = s["p50_ms"]
+        out[f"{phase}_p95_ms"] = s["p95_ms"]
+    out["rows_per_s"] = round(rows / (out["total_p50_ms"] / 1000.0), 1) if out["total_p50_ms"] else 0.0
+    return out
+
+
+def bench_model(name, model, encoders, db, app, rows, repeat, fields):
+    from sqlalchemy import select
+
+    dumps = app.json.dumps
+    full = encoders.all
+    sparse, error = encoders.for_fields(fields)
+    if error:
+        sys.exit(error)
+
+    results = {}
+    results[f"{name}/orm_to_json"] = bench_variant(
+        db, dumps,
+        lambda: db.session.execute(select(model).limit(rows)).scalars().all(),
+        lambda objs: [o.to_json() for o in objs],
+        repeat,
+    )
+    results[f"{name}/row_encoder"] = bench_variant(
+        db, dumps,
+        lambda: db.session.execute(select(*full.columns).limit(rows)).all(),
+        full.encode_all,
+        repeat,
+    )
+    results[f"{name}/row_encoder_sparse"] = bench_variant(
+        db, dumps,
+        lambda: db.session.execute(select(*sparse.columns).limit(rows)).all(),
+        sparse.encode_all,
+        repeat,
+    )
+    return results
+
+
+def print_results(results):
+    print(f"\n{'variant':<32} {'rows':>6} {'fetch':>9} {'encode':>9} {'dumps':>9} {'total':>9} {'rows/s':>11}")
+    for label, r in results.items():
+        print(f"{label:<32} {r['rows']:>6} {r['fetch_p50_ms']:>9.2f} {r['encode_p50_ms']:>9.2f} "
+              f"{r['dumps_p50_ms']:>9.2f} {r['total_p50_ms']:>9.2f} {r['rows_per_s']:>11.0f}")
+    print("(p50 ms per response)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ORM to_json vs. row encoder serialization.")
+    parser.add_argument("--db", default=str(DEFAULT_BENCH_DB))
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    db_url = use_database(args.db)
+    import row_encoders
+    from config import app, db
+    from models import DonationPosting, Meetup
+
+    results = {}
+    with app.app_context():
+        for name, model, encoders in (("postings", DonationPosting, row_encoders.POSTINGS),
+                                      ("meetups", Meetup, row_encoders.MEETUPS)):
+            results.update(bench_model(name, model, encoders, db, app, args.rows, args.repeat,
+                                       SPARSE_FIELDS[name]))
+    if not any(r["rows"] for r in results.values()):
+        sys.exit(f"No rows in {db_url}; run python -m benchmarks.datagen first")
+    print_results(results)
+    for name in SPARSE_FIELDS:
+        orm, fast = results[f"{name}/orm_to_json"], results[f"{name}/row_encoder"]
+        if fast["total_p50_ms"]:
+            print(f"{name}: row encoder {orm['total_p50_ms'] / fast['total_p50_ms']:.2f}x faster end to end")
+
+    report = {
+        "benchmark": "serialization",
+        "meta": run_metadata(),
+        "config": {
+            "database": db_url,
+            "rows": args.rows,
+            "repeat": args.repeat,
+            "sparse_fields": SPARSE_FIELDS,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nComparing against {args.baseline}")
+        rows = compare_metrics(results, load_report(args.baseline)["results"],
+                               COMPARED_METRICS, threshold=args.threshold)
+        print_comparison(rows)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        regressions = [r for r in rows if r["regression"]]
+
+    print(f"\nReport written to {write_report(report, args.out)}")
+    if args.save_baseline:
+        print(f"Baseline saved to {write_report(report, args.baseline)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
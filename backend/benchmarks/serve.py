@@ -0,0 +1,55 @@
+"""
+Serve the Flask app against a benchmark database.
+
+    python -m benchmarks.serve --db bench.db --port 5055
+    python -m benchmarks.serve --server asgi   # uvicorn + asgi.py
+
+Uses a threaded werkzeug server with HTTP/1.1 keep-alive and no
+per-request logging, so the load generator measures the app rather
+than the dev server's console output. --server asgi runs asgi.py under
+uvicorn (one process, one event loop) instead. Posting expiry is off
+unless POSTING_EXPIRY is set, so generated postings with past dates stay
+in the workload and runs stay comparable.
+"""
+import argparse
+import logging
+import os
+
+from benchmarks.common import DEFAULT_BENCH_DB, use_database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API against a benchmark database.")
+    parser.add_argument("--db", default=str(DEFAULT_BENCH_DB))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi")
+    args = parser.parse_args(argv)
+
+    use_database(args.db)
+    os.environ.setdefault("POSTING_EXPIRY", "0")
+
+    if args.server == "asgi":
+        import uvicorn
+
+        print(f"Serving benchmark API (ASGI) on http://{args.host}:{args.port}", flush=True)
+        uvicorn.run("asgi:application", host=args.host, port=args.port,
+                    log_level="warning", access_log=False, backlog=4096)
+        return
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    from app import create_app
+
+    # Indexes build in the background; the load generator waits on /api/_ready
+    flask_app = create_app()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    server = make_server(args.host, args.port, flask_app, threaded=True)
+    print(f"Serving benchmark API on http://{args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Micro-benchmarks for the in-process search structures (Trie, BloomFilter).
+
+    python -m benchmarks.structures
+    python -m benchmarks.structures --sizes 1000 10000 100000 --save-baseline
+    python -m benchmarks.structures --quick --fail-on-regression
+
+Needs no database. Every case uses a fixed seed so the numbers are
+comparable across commits; results go to benchmarks/results/structures.json.
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time as timer
+import tracemalloc
+import uuid
+
+from benchmarks.common import (
+    RESULTS_DIR,
+    compare_metrics,
+    load_report,
+    print_comparison,
+    run_metadata,
+    write_report,
+)
+from benchmarks.datagen import FOOD_ITEMS, FOOD_QUALIFIERS
+from bloom_filter import BloomFilter
+from trie import Trie
+
+
+DEFAULT_OUT = RESULTS_DIR / "structures.json"
+DEFAULT_BASELINE = RESULTS_DIR / "structures.baseline.json"
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+SYLLABLES = ["ba", "ca", "ri", "mi", "lo", "pe", "to", "ne", "su", "ga", "ko", "ve", "la", "do", "an", "er"]
+
+
+# --- Data ---
+
+def make_pairs(n, seed):
+    """
+    n (word, posting_id) pairs: pantry vocabulary plus synthetic words so the
+    trie grows with n instead of saturating at a few dozen words.
+    """
+    rng = random.Random(seed)
+    vocab = sorted({w.lower() for name, _ in FOOD_ITEMS + FOOD_QUALIFIERS for w in name.split()})
+    pairs = []
+    for _ in range(n):
+        if rng.random() < 0.6:
+            word = rng.choice(vocab)
+        else:
+            word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+        pairs.append((word, str(uuid.UUID(int=rng.getrandbits(128), version=4))))
+    return pairs
+
+
+def make_prefixes(pairs, length, count, seed):
+    rng = random.Random(seed + length)
+    words = [w for w, _ in pairs if len(w) >= length]
+    return [rng.choice(words)[:length] for _ in range(count)] if words else []
+
+
+def build_trie(pairs):
+    t = Trie()
+    for word, item_id in pairs:
+        t.insert(word, item_id=item_id)
+    return t
+
+
+# --- Timing helpers ---
+
+def best_of(fn, repeat):
+    """
+    Run fn() `repeat` times and return the fastest wall time (seconds).
+    """
+    times = []
+    for _ in range(repeat):
+        start = timer.perf_counter()
+        fn()
+        times.append(timer.perf_counter() - start)
+    return min(times)
+
+
+def per_call_latencies(fn, args_list):
+    out = []
+    for args in args_list:
+        start = timer.perf_counter()
+        fn(*args)
+        out.append(timer.perf_counter() - start)
+    return out
+
+
+def latency_stats(samples):
+    samples = sorted(samples)
+    us = [s * 1e6 for s in samples]
+    return {
+        "count": len(us),
+        "median_us": round(statistics.median(us), 3),
+        "p95_us": round(us[min(len(us) - 1, math.ceil(0.95 * len(us)) - 1)], 3),
+        "mean_us": round(sum(us) / len(us), 3),
+    }
+
+
+def measure_memory(build):
+    """
+    Bytes still allocated after build() returns (the structure is kept alive).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return {"retained_bytes": after - before, "peak_bytes": peak - before}
+
+
+# --- Trie cases ---
+
+def bench_trie(sizes, repeat, queries, seed):
+    results = {}
+    for n in sizes:
+        pairs = make_pairs(n, seed)
+
+        insert_s = best_of(lambda: build_trie(pairs), repeat)
+        results[f"trie.insert[n={n}]"] = {"ops_per_s": round(n / insert_s, 1)}
+
+        def remove_all():
+            t = build_trie(pairs)
+            start = timer.perf_counter()
+            for word, item_id in pairs:
+                t.remove(word, item_id=item_id)
+            return timer.perf_counter() - start
+
+        remove_s = min(remove_all() for _ in range(repeat))
+        results[f"trie.remove[n={n}]"] = {"ops_per_s": round(n / remove_s, 1)}
+
+        trie = build_trie(pairs)
+        for length in (1, 2, 3, 4):
+            prefixes = make_prefixes(pairs, length, queries, seed)
+            if not prefixes:
+                continue
+            # limit=10 / limit=20 match autocomplete_items and search_postings
+            wp = per_call_latencies(trie.words_with_prefix, [(p, 10) for p in prefixes])
+            results[f"trie.words_with_prefix[n={n},len={length}]"] = latency_stats(wp)
+            wp_all = per_call_latencies(trie.words_with_prefix, [(p,) for p in prefixes[: max(1, queries // 10)]])
+            results[f"trie.words_with_prefix_unbounded[n={n},len={length}]"] = latency_stats(wp_all)
+            pi = per_call_latencies(trie.prefix_ids, [(p, 20) for p in prefixes])
+            results[f"trie.prefix_ids[n={n},len={length}]"] = latency_stats(pi)
+
+        mem = measure_memory(lambda: build_trie(pairs))
+        mem["bytes_per_entry"] = round(mem["retained_bytes"] / n, 1)
+        mem["unique_words"] = trie.wordCount()
+        results[f"trie.memory[n={n}]"] = mem
+
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+            for i in range(0, n, 12):
+                f.write(" ".join(w for w, _ in pairs[i:i + 12]) + "\n")
+            path = f.name
+        try:
+            load_s = best_of(lambda: Trie().getFromFile(path), repeat)
+        finally:
+            os.unlink(path)
+        results[f"trie.getFromFile[n={n}]"] = {"ops_per_s": round(n / load_s, 1)}
+    return results
+
+
+# --- Bloom cases ---
+
+def bloom_theoretical_fp(m, k, n):
+    return (1.0 - math.exp(-k * n / m)) ** k
+
+
+def bench_bloom(sizes, repeat, seed, m=8192, k=3, probes=20_000):
+    """
+    Defaults match meetup_bloom in app.py (size=8192, hash_count=3).
+    """
+    results = {}
+    rng = random.Random(seed)
+
+    def key():
+        return f"{uuid.UUID(int=rng.getrandbits(128), version=4)}:{uuid.UUID(int=rng.getrandbits(128), version=4)}"
+
+    for n in sizes:
+        members = [key() for _ in range(n)]
+        outsiders = [key() for _ in range(probes)]
+
+        def fill():
+            b = BloomFilter(size=m, hash_count=k)
+            for item in members:
+                b.add(item)
+            return b
+
+        add_s = best_of(fill, repeat)
+        results[f"bloom.add[n={n}]"] = {"ops_per_s": round(n / add_s, 1)}
+
+        bloom = fill()
+        lookups = members[: min(n, probes)] + outsiders
+        contains_s = best_of(lambda: [x in bloom for x in lookups], repeat)
+        results[f"bloom.contains[n={n}]"] = {"ops_per_s": round(len(lookups) / contains_s, 1)}
+
+        false_pos = sum(1 for x in outsiders if x in bloom)
+        measured = false_pos / len(outsiders)
+        theory = bloom_theoretical_fp(m, k, n)
+        results[f"bloom.false_positive_rate[n={n}]"] = {
+            "measured": round(measured, 6),
+            "theoretical": round(theory, 6),
+            "bits": m,
+            "hashes": k,
+            "probes": len(outsiders),
+        }
+
+        mem = measure_memory(fill)
+        results[f"bloom.memory[n={n}]"] = mem
+    return results
+
+
+# --- Reporting ---
+
+# metric -> lower is better
+COMPARED_METRICS = {
+    "ops_per_s": False,
+    "median_us": True,
+    "p95_us": True,
+    "retained_bytes": True,
+    "measured": True,
+}
+
+
+def print_results(results):
+    for name, stats in results.items():
+        shown = ", ".join(f"{k}={v}" for k, v in stats.items())
+        print(f"{name:<56} {shown}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for Trie and BloomFilter.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--bloom-sizes", type=int, nargs="+", default=[500, 1_000, 2_000, 4_000, 8_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=351)
+    parser.add_argument("--quick", action="store_true", help="small sizes for a fast smoke run")
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.sizes = [1_000, 10_000]
+        args.bloom_sizes = [1_000, 4_000]
+        args.queries = 500
+        args.repeat = 2
+
+    results = {}
+    results.update(bench_trie(args.sizes, args.repeat, args.queries, args.seed))
+    results.update(bench_bloom(args.bloom_sizes, args.repeat, args.seed))
+    print_results(results)
+
+    report = {
+        "benchmark": "structures",
+        "meta": run_metadata(),
+        "config": {
+            "sizes": args.sizes,
+            "bloom_sizes": args.bloom_sizes,
+            "repeat": args.repeat,
+            "queries": args.queries,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        print(f"\nComparing against {args.baseline}")
+        rows = compare_metrics(results, load_report(args.baseline)["results"],
+                               COMPARED_METRICS, threshold=args.threshold)
+        print_comparison(rows)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "rows": rows}
+        regressions = [r for r in rows if r["regression"]]
+
+    print(f"\nReport written to {write_report(report, args.out)}")
+    if args.save_baseline:
+        print(f"Baseline saved to {write_report(report, args.baseline)}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# coalesce.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from search_backend import clean_prefix
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Concurrent callers with the same key share one execution of fn:
+    the first runs it, the rest wait and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop (asgi.py): followers
+    await the leader's future instead of blocking a thread.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        future = self.calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: a follower that disconnects must not cancel the leader's work
+            return await asyncio.shield(future)
+
+        future = self.calls[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # retrieved: no "never retrieved" warning without followers
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.calls[key]
+
+
+class PrefixCache:
+    """
+    Small LRU of search results keyed by (kind, cleaned prefix, ...).
+    Entries expire after ttl seconds and are dropped early by
+    invalidate_text() when an indexed food_name has a word they match.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get_or_compute(self, key, fn):
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self.lock:
+            version = self.version
+        value = fn()
+        with self.lock:
+            # An invalidation while fn() ran may have made value stale
+            if version == self.version and self.maxsize > 0:
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return value
+
+    def invalidate_text(self, food_name):
+        """
+        Drop entries whose prefix food_name matches: every word of the
+        prefix starts a word of food_name (see search_backend.search_terms).
+        Keys are (kind, prefix, ...).
+        """
+        words = clean_prefix(food_name or "").split()
+        with self.lock:
+            self.version += 1
+            stale = []
+            for key in self.entries:
+                hit = all(any(w.startswith(p) for w in words) for p in key[1].split())
+                if hit:
+                    stale.append(key)
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidated": self.invalidations,
+            }
+
+
+def register_metrics(registry, cache, flight, async_flight=None):
+    registry.register_counter(
+        "prefix_cache_events_total", "Prefix result cache hits, misses and invalidated entries.",
+        lambda: {
+            (("event", "hit"),): cache.hits,
+            (("event", "miss"),): cache.misses,
+            (("event", "invalidated"),): cache.invalidations,
+        },
+    )
+    registry.register_gauge("prefix_cache_entries", "Entries in the prefix result cache.",
+                            lambda: {(): len(cache.entries)})
+    registry.register_counter(
+        "search_singleflight_calls_total", "Search computations run (leader) vs. shared with a concurrent identical request (coalesced).",
+        lambda: {
+            (("role", "leader"),): flight.leaders + (async_flight.leaders if async_flight else 0),
+            (("role", "coalesced"),): flight.coalesced + (async_flight.coalesced if async_flight else 0),
+        },
+    )
@@ -5,6 +5,10 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from dotenv import load_dotenv
+from sqlalchemy import event
+
+from metrics import TimedQueuePool
+from routing import REPLICA_BIND, RoutingSession
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -21,6 +25,11 @@ if not database_url:
 if database_url.startswith("postgres://"):
     database_url = database_url.replace("postgres://", "postgresql+psycopg2://", 1)
 
+# Optional read replica for read-only GET endpoints (see routing.py)
+replica_url = os.getenv("DATABASE_REPLICA_URL")
+if replica_url and replica_url.startswith("postgres://"):
+    replica_url = replica_url.replace("postgres://", "postgresql+psycopg2://", 1)
+
 app = Flask(__name__)
 
 app.config["SQLALCHEMY_DATABASE_URI"] = database_url
@@ -33,8 +42,158 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,     # Recycle connections after 5 minutes
     "pool_size": 10,         # Number of connections to maintain
     "max_overflow": 5,       # Additional connections if pool is full
+    "poolclass": TimedQueuePool,  # QueuePool that reports checkout wait to /api/_metrics
+}
+
+# Slow-query log (opt-in): statements slower than the threshold are logged with
+# their route and redacted parameters, and SELECTs get an EXPLAIN plan.
+# Top fingerprints are served on GET /api/_admin/slow_queries.
+app.config["SLOW_QUERY_LOG"] = os.getenv("SLOW_QUERY_LOG", "0").lower() in ("1", "true", "yes")
+app.config["SLOW_QUERY_THRESHOLD_MS"] = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+app.config["SLOW_QUERY_EXPLAIN"] = os.getenv("SLOW_QUERY_EXPLAIN", "1").lower() in ("1", "true", "yes")
+app.config["SLOW_QUERY_TOP_N"] = int(os.getenv("SLOW_QUERY_TOP_N", "20"))
+
+# Required as X-Admin-Token on /api/_admin/* and POST /api/profiles/bulk (see
+# admin.py); without it those endpoints answer 403 outside the debug server
+app.config["ADMIN_TOKEN"] = os.getenv("ADMIN_TOKEN")
+
+IS_SQLITE = database_url.startswith("sqlite")
+
+# One writer at a time on SQLite; wait for the lock instead of failing
+SQLITE_CONNECT_ARGS = {
+    "check_same_thread": False,
+    "timeout": 30,
+}
+
+if IS_SQLITE:
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"]["connect_args"] = SQLITE_CONNECT_ARGS
+
+if replica_url:
+    # Binds don't inherit SQLALCHEMY_ENGINE_OPTIONS, so copy the pool settings over
+    replica_bind = {
+        k: v for k, v in app.config["SQLALCHEMY_ENGINE_OPTIONS"].items() if k != "connect_args"
+    }
+    replica_bind["url"] = replica_url
+    if replica_url.startswith("sqlite"):
+        replica_bind["connect_args"] = SQLITE_CONNECT_ARGS
+    app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: replica_bind}
+
+# Search index behind autocomplete and posting search: "trie" keeps an
+# in-memory Trie per process, "database" uses SQLite FTS5 / Postgres
+# index tables shared by every worker (see search_backend.py)
+app.config["SEARCH_BACKEND"] = os.getenv("SEARCH_BACKEND", "trie").lower()
+
+# Recent autocomplete/search results per worker (entries are also dropped
+# when a new or deleted posting matches their prefix)
+app.config["PREFIX_CACHE_SIZE"] = int(os.getenv("PREFIX_CACHE_SIZE", "1024"))
+app.config["PREFIX_CACHE_TTL"] = float(os.getenv("PREFIX_CACHE_TTL", "30"))
+
+# Response cache for dashboard GETs: "local" (per-process LRU), "off", or
+# a shared backend registered in response_cache.py
+app.config["RESPONSE_CACHE"] = os.getenv("RESPONSE_CACHE", "local").lower()
+app.config["RESPONSE_CACHE_SIZE"] = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+app.config["RESPONSE_CACHE_TTL"] = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+# Cross-worker events that keep per-worker indexes and caches in sync:
+# "auto" (Postgres LISTEN/NOTIFY on Postgres, Unix sockets otherwise),
+# "postgres", "unix" or "off". EVENT_BUS_DIR overrides the socket directory.
+app.config["EVENT_BUS"] = os.getenv("EVENT_BUS", "auto").lower()
+app.config["EVENT_BUS_DIR"] = os.getenv("EVENT_BUS_DIR")
+
+# GET /api/stream (Server-Sent Events): per-worker connection cap, events a
+# slow client may fall behind before it is told to resync, keep-alive interval.
+# Under a threaded WSGI server every open stream holds a thread, so keep the
+# cap well below the worker's thread count or streams starve the writes
+app.config["STREAM_MAX_CLIENTS"] = int(os.getenv("STREAM_MAX_CLIENTS", "32"))
+app.config["STREAM_QUEUE_SIZE"] = int(os.getenv("STREAM_QUEUE_SIZE", "256"))
+app.config["STREAM_HEARTBEAT_SECONDS"] = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+
+# Background deactivation of postings whose to_date/to_time has passed
+# (expiry.py): on/off, longest sleep between checks, rows per UPDATE
+app.config["POSTING_EXPIRY"] = os.getenv("POSTING_EXPIRY", "1").lower() in ("1", "true", "yes")
+app.config["POSTING_EXPIRY_INTERVAL"] = float(os.getenv("POSTING_EXPIRY_INTERVAL", "30"))
+app.config["POSTING_EXPIRY_BATCH"] = int(os.getenv("POSTING_EXPIRY_BATCH", "500"))
+
+# Pickup slots for banks without their own settings (PUT
+# /api/food_banks/<id>/slots/settings): slot length in minutes and
+# meetups per slot, 0 = no limit
+app.config["SLOT_MINUTES"] = int(os.getenv("SLOT_MINUTES", "30"))
+app.config["SLOT_CAPACITY"] = int(os.getenv("SLOT_CAPACITY", "0"))
+
+# Post-commit background tasks (tasks.py): worker threads (0 runs them
+# inline), queued tasks per thread before submit() blocks, items merged
+# into one call, and how long submit() blocks before dropping the work
+app.config["TASK_QUEUE_WORKERS"] = int(os.getenv("TASK_QUEUE_WORKERS", "2"))
+app.config["TASK_QUEUE_SIZE"] = int(os.getenv("TASK_QUEUE_SIZE", "10000"))
+app.config["TASK_QUEUE_BATCH"] = int(os.getenv("TASK_QUEUE_BATCH", "256"))
+app.config["TASK_QUEUE_BLOCK_SECONDS"] = float(os.getenv("TASK_QUEUE_BLOCK_SECONDS", "2"))
+
+# Archive job (flask --app app archive, see archive.py): days after
+# completion/answer before a meetup or time change request moves to the
+# archive tables (at least 31), and rows per transaction
+app.config["ARCHIVE_AFTER_DAYS"] = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+app.config["ARCHIVE_BATCH"] = int(os.getenv("ARCHIVE_BATCH", "1000"))
+
+# Rows per multi-row INSERT for bulk user seeding (POST
+# /api/profiles/bulk, flask --app app seed-users; see seeding.py)
+app.config["SEED_BATCH"] = int(os.getenv("SEED_BATCH", "500"))
+
+# Idempotency-Key on POST /api/meetups and /api/donation_postings
+# (idempotency.py): how long a key's response is kept, how long a retry
+# waits on a first attempt that never finished before running again,
+# and responses held in each worker's replay cache
+app.config["IDEMPOTENCY_TTL"] = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+app.config["IDEMPOTENCY_LOCK_SECONDS"] = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+app.config["IDEMPOTENCY_CACHE_SIZE"] = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+# Extra postal code centroids for /api/food_banks/nearby, e.g. the Census
+# ZCTA Gazetteer file; the bundled data/postal_centroids.csv covers the
+# Chicago area and is always loaded
+app.config["POSTAL_CENTROIDS_FILE"] = os.getenv("POSTAL_CENTROIDS_FILE")
+
+# Food bank tags and refrigeration for the posting facets (facet_index.py),
+# a JSON list like data/banks.json matched to food banks by name
+app.config["BANK_ATTRIBUTES_FILE"] = os.getenv("BANK_ATTRIBUTES_FILE", str(BASE_DIR / "data" / "banks.json"))
+
+# Async read path (asgi.py, optional): driver URLs for the async engines,
+# derived from the sync ones when unset (sqlite -> aiosqlite, postgres ->
+# asyncpg), and the threads serving every other route through Flask
+app.config["ASYNC_DATABASE_URL"] = os.getenv("ASYNC_DATABASE_URL")
+app.config["ASYNC_DATABASE_REPLICA_URL"] = os.getenv("ASYNC_DATABASE_REPLICA_URL")
+app.config["ASGI_WSGI_THREADS"] = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+# /api/stream connections per worker under asgi.py, where they run on the
+# event loop instead of holding one of those threads
+app.config["ASGI_STREAM_MAX_CLIENTS"] = int(os.getenv("ASGI_STREAM_MAX_CLIENTS", "5000"))
+
+# SQLite tuning for local load tests (ignored on Postgres)
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 30000,
+    "foreign_keys": "ON",
 }
 
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Apply SQLITE_PRAGMAS to every new pooled connection.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+with app.app_context():
+    for _engine in db.engines.values():
+        if _engine.dialect.name == "sqlite":
+            event.listen(_engine, "connect", _set_sqlite_pragmas)
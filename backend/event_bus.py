@@ -0,0 +1,333 @@
+# event_bus.py
+import atexit
+import hashlib
+import json
+import os
+import select
+import socket
+import tempfile
+import threading
+import time
+import traceback
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import text
+
+
+CHANNEL = "restockd_events"
+SEND_TIMEOUT_SECONDS = 0.05  # UnixSocketTransport: wait on a full peer queue before dropping
+
+
+class EventBus:
+    """
+    Post-commit events ("posting_created", "meetup_changed", ...).
+    emit() runs the local handlers right away and publishes the event so
+    every other worker runs the same handlers with remote=True.
+
+    Each published message carries a per-origin sequence number. A
+    receiver that sees one skipped (a dropped datagram, a failed publish)
+    runs the gap handlers, as after a lost LISTEN connection.
+    """
+
+    def __init__(self, app, transport=None):
+        self.app = app
+        self.transport = transport
+        self.handlers = {}      # event type -> [fn(event, remote)]
+        self.gap_handlers = []  # fn() after messages may have been missed
+        self.origin = None
+        self.lock = threading.Lock()
+        self.publish_lock = threading.Lock()  # sequence numbers go out in order
+        self.seq = 0
+        self.last_seq = {}      # origin -> highest sequence number received
+        self.gaps = 0
+        self.published = 0
+        self.received = 0
+        self.failed = 0
+        self.handler_failures = {"local": 0, "remote": 0}
+        self.last_lag = 0.0
+        self._new_origin()
+
+    def _new_origin(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.seq = 0
+        self.last_seq = {}
+
+    def handler(self, event_type):
+        def decorator(fn):
+            self.handlers.setdefault(event_type, []).append(fn)
+            return fn
+        return decorator
+
+    def on_gap(self, fn):
+        self.gap_handlers.append(fn)
+        return fn
+
+    def _run_handlers(self, event, remote):
+        """
+        Run every handler for the event; one failing doesn't stop the rest.
+        """
+        for fn in self.handlers.get(event.get("type"), ()):
+            try:
+                fn(event, remote)
+            except Exception as e:
+                with self.lock:
+                    self.handler_failures["remote" if remote else "local"] += 1
+                print(f"WARNING: handler for {'remote' if remote else 'local'} {event.get('type')} failed:", repr(e))
+                traceback.print_exc()
+
+    def emit(self, event_type, **fields):
+        """
+        Called after the write committed, so a failing local handler must
+        neither fail the request nor keep the event from other workers.
+        """
+        event = dict(fields, type=event_type)
+        self._run_handlers(event, False)
+        if self.transport is None:
+            return event
+        with self.publish_lock:
+            self.seq += 1
+            message = json.dumps(dict(event, origin=self.origin, seq=self.seq, ts=time.time()), default=str)
+            try:
+                self.transport.publish(message)
+                with self.lock:
+                    self.published += 1
+            except Exception as e:
+                # The write is committed; the skipped sequence number makes
+                # the other workers resync on our next event
+                with self.lock:
+                    self.failed += 1
+                print(f"WARNING: could not publish {event_type} event:", repr(e))
+        return event
+
+    def _receive(self, message):
+        try:
+            event = json.loads(message)
+        except ValueError:
+            return
+        origin = event.get("origin")
+        if origin == self.origin:
+            return
+        seq = event.get("seq")
+        gap = False
+        with self.lock:
+            self.received += 1
+            self.last_lag = max(0.0, time.time() - event.get("ts", time.time()))
+            if seq is not None:
+                last = self.last_seq.get(origin)
+                # The first message from a worker sets its baseline
+                gap = last is not None and seq > last + 1
+                self.last_seq[origin] = seq if last is None else max(last, seq)
+                if gap:
+                    self.gaps += 1
+        with self.app.app_context():
+            self._run_handlers(event, True)
+        if gap:
+            print(f"WARNING: missed events from {origin} (got #{seq}); resyncing")
+            self._gap()
+
+    def _gap(self):
+        with self.app.app_context():
+            for fn in self.gap_handlers:
+                try:
+                    fn()
+                except Exception as e:
+                    print("WARNING: event bus gap handler failed:", repr(e))
+
+    def start(self):
+        if self.transport is not None:
+            self.transport.start(self._receive, self._gap)
+
+    def restart_after_fork(self):
+        """
+        Listener threads and sockets don't survive fork(); give the child
+        its own identity and listener.
+        """
+        self._new_origin()
+        if self.transport is not None:
+            self.transport.reset_after_fork()
+            self.start()
+
+
+class UnixSocketTransport:
+    """
+    Local stand-in for LISTEN/NOTIFY: each process binds a datagram socket
+    in a shared directory and publish() sends to every other socket there.
+    Delivery is immediate; only processes on the same host are reached.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.sock = None
+        self.path = None
+        self.thread = None
+
+    def start(self, on_message, on_gap):
+        if self.thread is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f"{os.getpid()}.sock"
+        if self.path.exists():
+            self.path.unlink()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(str(self.path))
+        atexit.register(self.path.unlink, missing_ok=True)
+
+        def loop():
+            while True:
+                try:
+                    data = self.sock.recv(65536)
+                except OSError:
+                    return
+                on_message(data.decode("utf-8"))
+
+        self.thread = threading.Thread(target=loop, name="event-bus-unix", daemon=True)
+        self.thread.start()
+
+    def publish(self, message):
+        data = message.encode("utf-8")
+        out = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        out.setblocking(False)
+        try:
+            for peer in self.directory.glob("*.sock"):
+                if peer == self.path:
+                    continue
+                try:
+                    out.sendto(data, str(peer))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker exited without cleaning up
+                    peer.unlink(missing_ok=True)
+                except BlockingIOError:
+                    # Peer's queue is full: give it a moment, then drop (the
+                    # receiver notices the skipped sequence number)
+                    try:
+                        out.settimeout(SEND_TIMEOUT_SECONDS)
+                        out.sendto(data, str(peer))
+                    except OSError:
+                        print(f"WARNING: event bus peer {peer.name} is not keeping up; dropped an event")
+                    finally:
+                        out.setblocking(False)
+        finally:
+            out.close()
+
+    def reset_after_fork(self):
+        # The parent keeps its socket; the child binds its own
+        self.sock = None
+        self.path = None
+        self.thread = None
+
+
+class PostgresTransport:
+    """
+    LISTEN/NOTIFY on a dedicated psycopg2 connection. After a lost
+    connection it reconnects and reports a gap, since notifications sent
+    meanwhile are gone.
+    """
+
+    def __init__(self, engine, channel=CHANNEL, poll_seconds=1.0):
+        self.engine = engine
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.thread = None
+
+    def start(self, on_message, on_gap):
+        if self.thread is not None:
+            return
+
+        def loop():
+            first = True
+            while True:
+                conn = None
+                try:
+                    conn = self.engine.raw_connection()
+                    dbapi = conn.dbapi_connection
+                    dbapi.autocommit = True
+                    cursor = dbapi.cursor()
+                    cursor.execute(f"LISTEN {self.channel}")
+                    if not first:
+                        on_gap()
+                    first = False
+                    while True:
+                        if select.select([dbapi], [], [], self.poll_seconds) == ([], [], []):
+                            continue
+                        dbapi.poll()
+                        while dbapi.notifies:
+                            on_message(dbapi.notifies.pop(0).payload)
+                except Exception as e:
+                    print("WARNING: event bus LISTEN connection lost:", repr(e))
+                    if conn is not None:
+                        try:
+                            conn.invalidate()
+                        except Exception:
+                            pass
+                    time.sleep(self.poll_seconds)
+
+        self.thread = threading.Thread(target=loop, name="event-bus-postgres", daemon=True)
+        self.thread.start()
+
+    def publish(self, message):
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {"channel": self.channel, "payload": message})
+            conn.commit()
+
+    def reset_after_fork(self):
+        self.thread = None
+
+
+def _default_socket_dir(database_url):
+    # One directory per database, so unrelated apps on the host don't talk
+    digest = hashlib.sha1(database_url.encode("utf-8")).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"restockd-bus-{digest}"
+
+
+def init_app(app, db, registry):
+    """
+    Build the bus selected by EVENT_BUS: "postgres", "unix", "off" or
+    "auto" (postgres on Postgres, unix sockets elsewhere). The listener
+    starts with start().
+    """
+    mode = app.config["EVENT_BUS"]
+    with app.app_context():
+        engine = db.engine
+    if mode == "auto":
+        if engine.dialect.name == "postgresql":
+            mode = "postgres"
+        elif hasattr(socket, "AF_UNIX"):
+            mode = "unix"
+        else:
+            mode = "off"
+
+    if mode == "postgres":
+        transport = PostgresTransport(engine)
+    elif mode == "unix":
+        directory = app.config.get("EVENT_BUS_DIR") or _default_socket_dir(app.config["SQLALCHEMY_DATABASE_URI"])
+        transport = UnixSocketTransport(directory)
+    elif mode == "off":
+        transport = None
+    else:
+        raise ValueError(f"Unknown EVENT_BUS {mode!r} (expected auto, postgres, unix or off)")
+
+    bus = EventBus(app, transport)
+    bus.mode = mode
+
+    registry.register_counter(
+        "event_bus_messages_total", "Events published to / received from other workers.",
+        lambda: {
+            (("direction", "published"),): bus.published,
+            (("direction", "received"),): bus.received,
+            (("direction", "publish_failed"),): bus.failed,
+        },
+    )
+    registry.register_counter("event_bus_gaps_total",
+                              "Skipped sequence numbers seen from other workers (each resyncs).",
+                              lambda: {(): bus.gaps})
+    registry.register_counter(
+        "event_bus_handler_failures_total", "Event handlers that raised, for local and remote events.",
+        lambda: {(("source", source),): n for source, n in bus.handler_failures.items()},
+    )
+    registry.register_gauge("event_bus_last_lag_seconds", "Commit-to-apply delay of the last remote event.",
+                            lambda: {(): round(bus.last_lag, 6)})
+
+    app.extensions["event_bus"] = bus
+    return bus
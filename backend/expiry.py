@@ -0,0 +1,211 @@
+# expiry.py
+import heapq
+import threading
+import time
+import traceback
+from datetime import datetime
+
+
+def posting_expires_at(to_date, to_time):
+    """
+    A posting closes at the end of its to_date/to_time window (the food
+    bank's wall-clock time, compared with the server's local time).
+    """
+    return datetime.combine(to_date, to_time)
+
+
+class ExpiryWheel:
+    """
+    Keys bucketed by expiry time into slot_seconds-wide slots (a hashed
+    timing wheel whose occupied slots are kept in a heap, so idle stretches
+    cost nothing). Scheduling and cancelling are O(1) apart from the
+    first key of a new slot; due() only touches slots that have come due.
+    Times are timestamps.
+    Not thread-safe: ExpiryScheduler holds a lock.
+    """
+
+    def __init__(self, slot_seconds=60):
+        self.slot_seconds = slot_seconds
+        self.slots = {}      # slot -> {key: expires_at timestamp}
+        self.heap = []       # occupied slots, may hold stale entries
+        self.slot_of = {}    # key -> slot
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def _slot(self, ts):
+        return int(ts // self.slot_seconds)
+
+    def schedule(self, key, ts):
+        """
+        (Re)schedule key to expire at ts (a timestamp).
+        """
+        self.cancel(key)
+        slot = self._slot(ts)
+        bucket = self.slots.get(slot)
+        if bucket is None:
+            bucket = self.slots[slot] = {}
+            heapq.heappush(self.heap, slot)
+        bucket[key] = ts
+        self.slot_of[key] = slot
+
+    def cancel(self, key):
+        slot = self.slot_of.pop(key, None)
+        if slot is None:
+            return False
+        bucket = self.slots[slot]
+        del bucket[key]
+        if not bucket:
+            del self.slots[slot]  # its heap entry is skipped when popped
+        return True
+
+    def clear(self):
+        self.slots.clear()
+        self.heap.clear()
+        self.slot_of.clear()
+
+    def next_due(self):
+        """
+        Earliest expiry timestamp, or None.
+        """
+        while self.heap and self.heap[0] not in self.slots:
+            heapq.heappop(self.heap)
+        return min(self.slots[self.heap[0]].values()) if self.heap else None
+
+    def due(self, now, limit=None):
+        """
+        Remove and return up to limit keys whose expiry is <= now (a timestamp).
+        """
+        out = []
+        while self.heap and (limit is None or len(out) < limit):
+            slot = self.heap[0]
+            bucket = self.slots.get(slot)
+            if bucket is None:
+                heapq.heappop(self.heap)
+                continue
+            if slot * self.slot_seconds > now:
+                break
+            for key, ts in list(bucket.items()):
+                if ts <= now and (limit is None or len(out) < limit):
+                    out.append(key)
+                    del bucket[key]
+                    del self.slot_of[key]
+            if bucket:
+                break  # the rest of the current slot is not due yet (or limit hit)
+            del self.slots[slot]
+            heapq.heappop(self.heap)
+        return out
+
+
+class ExpiryScheduler:
+    """
+    Background thread that pops due keys off an ExpiryWheel and hands
+    them to expire(keys) in batches of batch_size, inside an app context.
+    expire() returns how many keys it actually expired (another worker may
+    have got there first).
+    """
+
+    def __init__(self, expire, interval=30.0, batch_size=500, slot_seconds=60):
+        self.expire = expire
+        self.interval = interval
+        self.batch_size = batch_size
+        self.wheel = ExpiryWheel(slot_seconds)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.app = None
+        self.ticks = 0
+        self.expired = 0
+        self.batches = 0
+        self.last_tick_seconds = 0.0
+
+    def schedule(self, key, when):
+        """
+        (Re)schedule key to expire at when (a naive local datetime).
+        """
+        with self.lock:
+            self.wheel.schedule(key, when.timestamp())
+
+    def cancel(self, key):
+        with self.lock:
+            self.wheel.cancel(key)
+
+    def load(self, entries):
+        """
+        Replace the schedule with (key, when) pairs; wakes the thread so
+        a backlog of already-expired keys is handled straight away.
+        """
+        with self.lock:
+            self.wheel.clear()
+            for key, when in entries:
+                self.wheel.schedule(key, when.timestamp())
+        self.wakeup.set()
+
+    def run_once(self, now=None):
+        """
+        Expire everything due at now (a timestamp); returns the count expired.
+        """
+        now = time.time() if now is None else now
+        start = time.perf_counter()
+        expired = 0
+        while True:
+            with self.lock:
+                keys = self.wheel.due(now, self.batch_size)
+            if not keys:
+                break
+            try:
+                expired += self.expire(keys)
+            except Exception:
+                # Put the batch back for the next tick
+                with self.lock:
+                    for key in keys:
+                        self.wheel.schedule(key, now)
+                raise
+            self.batches += 1
+        self.ticks += 1
+        self.expired += expired
+        self.last_tick_seconds = time.perf_counter() - start
+        return expired
+
+    def start(self, app):
+        """
+        Start the thread (once per process; call again after a fork).
+        """
+        self.app = app
+        if self.thread is not None and self.thread.is_alive():
+            return False
+        self.thread = threading.Thread(target=self._run, name="posting-expiry", daemon=True)
+        self.thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            with self.lock:
+                next_due = self.wheel.next_due()
+            wait = self.interval
+            if next_due is not None:
+                wait = min(wait, max(0.0, next_due - time.time()))
+            self.wakeup.wait(wait)
+            self.wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception as e:
+                print("WARNING: posting expiry tick failed:", repr(e))
+                traceback.print_exc()
+                time.sleep(self.interval)
+
+
+def register_metrics(registry, scheduler):
+    registry.register_counter(
+        "posting_expiry_events_total", "Postings expired by the background scheduler, UPDATE batches and ticks.",
+        lambda: {
+            (("event", "expired"),): scheduler.expired,
+            (("event", "batch"),): scheduler.batches,
+            (("event", "tick"),): scheduler.ticks,
+        },
+    )
+    registry.register_gauge("posting_expiry_scheduled", "Active postings waiting to expire on this worker.",
+                            lambda: {(): len(scheduler.wheel)})
+    registry.register_gauge("posting_expiry_tick_seconds", "Duration of the last expiry tick.",
+                            lambda: {(): scheduler.last_tick_seconds})
@@ -0,0 +1,382 @@
+# facet_index.py
+import bisect
+import heapq
+import json
+
+from search_backend import clean_prefix, search_terms
+
+
+# Active postings filtered by facet values and a text prefix without a
+# query per combination. Every posting gets a dense ordinal (freed
+# ordinals are reused, smallest first, so the bitmaps stay short) and
+# every facet value and food_name word keeps a bitmap of its postings as
+# a Python int, so filtering is a few big-int ANDs and ORs and a facet
+# count is one popcount.
+
+FACETS = ("urgency", "food_bank_id", "city", "tag", "refrigerated")
+
+# ?facets=true counts these; food_bank_id has a value per food bank, so it
+# is only counted when named (?facets=food_bank_id) and then only its
+# MAX_BANK_COUNTS largest values are returned
+DEFAULT_COUNTED = ("urgency", "city", "tag", "refrigerated")
+MAX_BANK_COUNTS = 50
+
+_TRUE = ("1", "true", "yes")
+_FALSE = ("0", "false", "no")
+
+# byte value -> positions of its set bits
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+def name_key(name):
+    return " ".join((name or "").lower().split())
+
+
+def value_key(facet, value):
+    """
+    Normalized facet value, or None when it can't match anything.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if facet == "refrigerated":
+        value = value.lower()
+        if value in _TRUE:
+            return "1"
+        if value in _FALSE:
+            return "0"
+        return None
+    if facet == "food_bank_id":
+        return value.lower() or None
+    return name_key(value) or None
+
+
+def load_bank_attributes(path):
+    """
+    {bank name key: (city, tags, refrigerated)} from a banks.json list
+    like data/banks.json. Its ids are not the database's, so banks are
+    matched by name.
+    """
+    with open(path, encoding="utf-8") as f:
+        records = json.load(f)
+    out = {}
+    for record in records:
+        key = name_key(record.get("name"))
+        if key:
+            refrigerated = record.get("refrigerated")
+            out[key] = (record.get("city"), tuple(record.get("tags") or ()),
+                        None if refrigerated is None else bool(refrigerated))
+    return out
+
+
+def parse_filters(args):
+    """
+    ({facet: set of value keys}, error message or None) from query params
+    such as ?urgency=high,medium&city=Chicago&refrigerated=1 (commas mean
+    OR).
+    """
+    filters = {}
+    for facet in FACETS:
+        raw = args.get(facet)
+        if not raw:
+            continue
+        values = {value_key(facet, value) for value in raw.split(",")}
+        if facet == "refrigerated" and None in values:
+            return None, "refrigerated must be 1 or 0"
+        filters[facet] = values - {None}
+    return filters, None
+
+
+def parse_counted(raw):
+    """
+    (facets to count, error message or None) from ?facets=: true for
+    DEFAULT_COUNTED, false for none, or facet names separated by commas.
+    """
+    raw = (raw or "").strip().lower()
+    if raw in _TRUE:
+        return DEFAULT_COUNTED, None
+    if not raw or raw in _FALSE:
+        return (), None
+    counted = tuple(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    if not set(counted) <= set(FACETS):
+        return None, f"facets must be true or a comma-separated list of {', '.join(FACETS)}"
+    return counted, None
+
+
+def bank_matches(filters, food_bank_id, city, tags=(), refrigerated=None):
+    """
+    Whether a food bank's postings can pass filters, going by the filters
+    on the bank's own attributes (every facet but urgency).
+    """
+    keys = {
+        "food_bank_id": {value_key("food_bank_id", food_bank_id)},
+        "city": {value_key("city", city)},
+        "tag": {value_key("tag", tag) for tag in tags or ()},
+        "refrigerated": {None if refrigerated is None else "1" if refrigerated else "0"},
+    }
+    return all(keys[facet] & values for facet, values in filters.items() if facet in keys)
+
+
+def filters_key(filters):
+    """
+    Hashable form of parse_filters() output, for cache keys.
+    """
+    return tuple(sorted((facet, tuple(sorted(values))) for facet, values in filters.items()))
+
+
+def ordinals(bitmap, limit=None):
+    """
+    Set bit positions of bitmap, ascending.
+    """
+    if limit is not None and limit <= 0:
+        return []
+    out = []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for i, byte in enumerate(data):
+        if byte:
+            base = i * 8
+            for bit in _BYTE_BITS[byte]:
+                out.append(base + bit)
+            if limit is not None and len(out) >= limit:
+                return out[:limit]
+    return out
+
+
+class FacetIndex:
+    """
+    Not thread-safe: callers hold a lock (see app.py).
+    """
+
+    def __init__(self):
+        self.ids = []          # ordinal -> posting_id (None when free)
+        self.ordinal = {}      # posting_id -> ordinal
+        self.free = []         # heap of freed ordinals
+        self.postings = {}     # ordinal -> (food_name, urgency, food_bank_id)
+        self.keys = {}         # ordinal -> (facet value pairs, words) it is set in
+        self.bitmaps = {facet: {} for facet in FACETS}  # facet -> {value key: bitmap}
+        self.words = {}        # word -> bitmap
+        self.vocab = []        # sorted words
+        self.banks = {}        # food_bank_id -> (city, tags, refrigerated)
+        self.live = 0          # bitmap of every indexed posting
+
+    def __len__(self):
+        return len(self.ordinal)
+
+    def clear(self):
+        self.__init__()
+
+    # --- Maintenance ---
+
+    def set_bank(self, food_bank_id, city, tags=(), refrigerated=None):
+        """
+        Set a food bank's city and banks.json attributes; its postings
+        already indexed are re-keyed.
+        """
+        food_bank_id = str(food_bank_id).lower()
+        attributes = (city, tuple(tags or ()), refrigerated)
+        if self.banks.get(food_bank_id) == attributes:
+            return
+        self.banks[food_bank_id] = attributes
+        bank_bitmap = self.bitmaps["food_bank_id"].get(food_bank_id, 0)
+        for n in ordinals(bank_bitmap):
+            self._unset(n)
+            self._set(n)
+
+    def upsert(self, posting_id, food_name, urgency, food_bank_id):
+        posting_id = str(posting_id)
+        n = self.ordinal.get(posting_id)
+        if n is None:
+            n = heapq.heappop(self.free) if self.free else len(self.ids)
+            if n == len(self.ids):
+                self.ids.append(posting_id)
+            else:
+                self.ids[n] = posting_id
+            self.ordinal[posting_id] = n
+            self.live |= 1 << n
+        else:
+            self._unset(n)
+        self.postings[n] = (food_name, urgency, str(food_bank_id).lower())
+        self._set(n)
+
+    def remove(self, posting_id):
+        n = self.ordinal.pop(str(posting_id), None)
+        if n is None:
+            return
+        self._unset(n)
+        del self.postings[n]
+        self.ids[n] = None
+        self.live &= ~(1 << n)
+        heapq.heappush(self.free, n)
+
+    def load(self, banks, postings):
+        """
+        Replace the contents with (food_bank_id, city, tags, refrigerated)
+        and (posting_id, food_name, urgency, food_bank_id) tuples. Each
+        bitmap is built once from its ordinals rather than one bit at a
+        time.
+        """
+        self.clear()
+        for food_bank_id, city, tags, refrigerated in banks:
+            self.banks[str(food_bank_id).lower()] = (city, tuple(tags or ()), refrigerated)
+        for posting_id, food_name, urgency, food_bank_id in postings:
+            posting_id = str(posting_id)
+            if posting_id in self.ordinal:
+                continue
+            n = len(self.ids)
+            self.ids.append(posting_id)
+            self.ordinal[posting_id] = n
+            self.postings[n] = (food_name, urgency, str(food_bank_id).lower())
+            self.keys[n] = self._keys_for(n)
+
+        size = (len(self.ids) + 7) // 8
+        facet_bits = {}
+        word_bits = {}
+        for n, (pairs, words) in self.keys.items():
+            byte, bit = n >> 3, 1 << (n & 7)
+            for pair in pairs:
+                bits = facet_bits.get(pair)
+                if bits is None:
+                    bits = facet_bits[pair] = bytearray(size)
+                bits[byte] |= bit
+            for word in words:
+                bits = word_bits.get(word)
+                if bits is None:
+                    bits = word_bits[word] = bytearray(size)
+                bits[byte] |= bit
+        for (facet, key), bits in facet_bits.items():
+            self.bitmaps[facet][key] = int.from_bytes(bits, "little")
+        self.words = {word: int.from_bytes(bits, "little") for word, bits in word_bits.items()}
+        self.vocab = sorted(self.words)
+        self.live = (1 << len(self.ids)) - 1
+
+    def _keys_for(self, n):
+        """
+        ((facet, value key) pairs, food_name words) of ordinal n.
+        """
+        food_name, urgency, food_bank_id = self.postings[n]
+        city, tags, refrigerated = self.banks.get(food_bank_id, (None, (), None))
+        values = [("urgency", urgency), ("food_bank_id", food_bank_id), ("city", city)]
+        values.extend(("tag", tag) for tag in tags)
+        if refrigerated is not None:
+            values.append(("refrigerated", "1" if refrigerated else "0"))
+        pairs = []
+        for facet, value in values:
+            key = value_key(facet, value)
+            if key is not None and (facet, key) not in pairs:
+                pairs.append((facet, key))
+        words = {word for word in clean_prefix(food_name or "").split()}
+        return tuple(pairs), tuple(words)
+
+    def _set(self, n):
+        bit = 1 << n
+        pairs, words = self.keys[n] = self._keys_for(n)
+        for facet, key in pairs:
+            bitmaps = self.bitmaps[facet]
+            bitmaps[key] = bitmaps.get(key, 0) | bit
+        for word in words:
+            bitmap = self.words.get(word)
+            if bitmap is None:
+                bisect.insort(self.vocab, word)
+                bitmap = 0
+            self.words[word] = bitmap | bit
+
+    def _unset(self, n):
+        mask = ~(1 << n)
+        pairs, words = self.keys.pop(n)
+        for facet, key in pairs:
+            bitmaps = self.bitmaps[facet]
+            bitmap = bitmaps[key] & mask
+            if bitmap:
+                bitmaps[key] = bitmap
+            else:
+                del bitmaps[key]
+        for word in words:
+            bitmap = self.words[word] & mask
+            if bitmap:
+                self.words[word] = bitmap
+            else:
+                del self.words[word]
+                del self.vocab[bisect.bisect_left(self.vocab, word)]
+
+    # --- Queries ---
+
+    def text_bitmap(self, prefix):
+        """
+        Postings with a food_name word starting with each word of prefix.
+        """
+        result = self.live
+        for term in search_terms(prefix):
+            lo = bisect.bisect_left(self.vocab, term)
+            hi = bisect.bisect_left(self.vocab, term[:-1] + chr(ord(term[-1]) + 1), lo)
+            matched = 0
+            for word in self.vocab[lo:hi]:
+                matched |= self.words[word]
+            result &= matched
+            if not result:
+                break
+        return result
+
+    def _facet_bitmap(self, facet, values):
+        bitmaps = self.bitmaps[facet]
+        bitmap = 0
+        for value in values:
+            bitmap |= bitmaps.get(value, 0)
+        return bitmap
+
+    def search(self, filters, prefix=None, limit=None, offset=0, counted=()):
+        """
+        (posting ids, total matches, PendingCounts for the facets in
+        counted or None): facets AND together, values of one facet OR.
+        The counts are left to PendingCounts.counts() so the caller can
+        run them after releasing its lock.
+        """
+        base = self.text_bitmap(prefix) if prefix else self.live
+        by_facet = {facet: self._facet_bitmap(facet, values) for facet, values in filters.items()}
+        matched = base
+        for bitmap in by_facet.values():
+            matched &= bitmap
+
+        end = None if limit is None else offset + limit
+        hits = ordinals(matched, end)[offset:]
+        ids = [self.ids[n] for n in hits]
+        if not counted:
+            return ids, matched.bit_count(), None
+        # The bitmaps are immutable ints; only the dicts holding them change
+        values = {facet: list(self.bitmaps[facet].items()) for facet in counted}
+        return ids, matched.bit_count(), PendingCounts(base, by_facet, values)
+
+
+class PendingCounts:
+    """
+    The bitmaps FacetIndex.search needs for facet counts, taken out of
+    the index so the popcounts don't hold its lock.
+    """
+
+    __slots__ = ("base", "by_facet", "values")
+
+    def __init__(self, base, by_facet, values):
+        self.base = base          # text prefix matches
+        self.by_facet = by_facet  # facet -> bitmap of its filter values
+        self.values = values      # counted facet -> [(value key, bitmap)]
+
+    def counts(self):
+        """
+        {facet: {value key: matches}}. Each facet's counts apply every
+        filter except its own, so they show what picking another value
+        of that facet would return.
+        """
+        facet_counts = {}
+        for facet, values in self.values.items():
+            scope = self.base
+            for other, bitmap in self.by_facet.items():
+                if other != facet:
+                    scope &= bitmap
+            out = {}
+            for key, bitmap in values:
+                count = (scope & bitmap).bit_count()
+                if count:
+                    out[key] = count
+            if facet == "food_bank_id" and len(out) > MAX_BANK_COUNTS:
+                out = dict(heapq.nlargest(MAX_BANK_COUNTS, out.items(), key=lambda item: item[1]))
+            facet_counts[facet] = out
+        return facet_counts
@@ -0,0 +1,209 @@
+# geo_index.py
+import csv
+import math
+from pathlib import Path
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def normalize_postal_code(value):
+    """
+    "60607", "60607-1234" and " 60607 " all become "60607"; None if
+    there are not five leading digits.
+    """
+    digits = (value or "").strip()[:5]
+    return digits if len(digits) == 5 and digits.isdigit() else None
+
+
+class PostalCentroids:
+    """
+    Offline postal code -> (lat, lon) table. Reads the bundled
+    data/postal_centroids.csv (postal_code,lat,lon) or a Census ZCTA
+    Gazetteer file (tab-separated GEOID / INTPTLAT / INTPTLONG).
+    Codes missing from the table fall back to the mean centroid of their
+    three-digit area (precision "area" instead of "postal").
+    """
+
+    def __init__(self):
+        self.points = {}  # "60607" -> (lat, lon)
+        self.areas = {}   # "606" -> (lat, lon)
+
+    def load(self, path):
+        path = Path(path)
+        with open(path, newline="", encoding="utf-8") as f:
+            first = f.readline()
+            f.seek(0)
+            delimiter = "\t" if "\t" in first else ","
+            reader = csv.DictReader(f, delimiter=delimiter)
+            reader.fieldnames = [name.strip() for name in reader.fieldnames]
+            code_col, lat_col, lon_col = (
+                ("GEOID", "INTPTLAT", "INTPTLONG") if "GEOID" in reader.fieldnames
+                else ("postal_code", "lat", "lon")
+            )
+            for row in reader:
+                code = normalize_postal_code(row[code_col])
+                if code is None:
+                    continue
+                self.points[code] = (float(row[lat_col]), float(row[lon_col]))
+        self._build_areas()
+        return len(self.points)
+
+    def _build_areas(self):
+        sums = {}
+        for code, (lat, lon) in self.points.items():
+            s = sums.setdefault(code[:3], [0.0, 0.0, 0])
+            s[0] += lat
+            s[1] += lon
+            s[2] += 1
+        self.areas = {area: (s[0] / s[2], s[1] / s[2]) for area, s in sums.items()}
+
+    def lookup(self, postal_code):
+        """
+        (lat, lon, precision) or None.
+        """
+        code = normalize_postal_code(postal_code)
+        if code is None:
+            return None
+        point = self.points.get(code)
+        if point is not None:
+            return point[0], point[1], "postal"
+        area = self.areas.get(code[:3])
+        if area is not None:
+            return area[0], area[1], "area"
+        return None
+
+
+class GeoGrid:
+    """
+    Points bucketed into square cells of cell_km; a radius query only
+    measures the points in the cells its bounding box touches.
+    Not thread-safe: callers hold a lock (see app.py).
+    """
+
+    def __init__(self, cell_km=2.0):
+        self.cell_km = cell_km
+        self.step = cell_km / KM_PER_DEGREE_LAT  # cell size in degrees
+        self.cells = {}   # (row, col) -> {key: (lat, lon)}
+        self.points = {}  # key -> (lat, lon)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.step)), int(math.floor(lon / self.step))
+
+    def insert(self, key, lat, lon):
+        self.remove(key)
+        self.points[key] = (lat, lon)
+        self.cells.setdefault(self._cell(lat, lon), {})[key] = (lat, lon)
+
+    def remove(self, key):
+        point = self.points.pop(key, None)
+        if point is None:
+            return False
+        cell = self._cell(*point)
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self.cells[cell]
+        return True
+
+    def clear(self):
+        self.cells.clear()
+        self.points.clear()
+
+    def within(self, lat, lon, radius_km, limit=None):
+        """
+        [(distance_km, key)] for points within radius_km, nearest first.
+        With a limit, cells are visited in rings around the origin and the
+        search stops once no unvisited cell can hold a closer point.
+        """
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        # Degrees of longitude shrink toward the poles: size the box for
+        # the box edge farthest from the equator
+        widest = min(abs(lat) + dlat, 89.0)
+        coslat = max(math.cos(math.radians(widest)), 0.01)
+        dlon = radius_km / (KM_PER_DEGREE_LAT * coslat)
+        r0, c0 = self._cell(lat - dlat, lon - dlon)
+        r1, c1 = self._cell(lat + dlat, lon + dlon)
+
+        if limit is None:
+            if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self.cells):
+                # Radius wider than the populated area: walk the occupied cells instead
+                buckets = self.cells.values()
+            else:
+                buckets = (self.cells.get((r, c)) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1))
+            out = self._measure(buckets, lat, lon, radius_km, dlat, dlon)
+            out.sort()
+            return out
+
+        # Every point in ring n + 1 is at least n cell widths away
+        ring_km = self.cell_km * coslat
+        rc, cc = self._cell(lat, lon)
+        out = []
+        visited = 0
+        n = 0
+        while True:
+            ring = [cell for cell in self._ring(rc, cc, n)
+                    if r0 <= cell[0] <= r1 and c0 <= cell[1] <= c1]
+            visited += len(ring)
+            if visited > len(self.cells):
+                # Sparse grid: cheaper to measure every occupied cell once
+                out = self._measure(self.cells.values(), lat, lon, radius_km, dlat, dlon)
+                break
+            out.extend(self._measure((self.cells.get(cell) for cell in ring),
+                                     lat, lon, radius_km, dlat, dlon))
+            if len(out) >= limit:
+                out.sort()
+                del out[limit:]
+                if out[-1][0] <= n * ring_km:
+                    break
+            if rc - n <= r0 and rc + n >= r1 and cc - n <= c0 and cc + n >= c1:
+                break
+            n += 1
+        out.sort()
+        return out[:limit]
+
+    @staticmethod
+    def _ring(rc, cc, n):
+        """
+        Cells at Chebyshev distance n from (rc, cc).
+        """
+        if n == 0:
+            return [(rc, cc)]
+        cells = [(rc - n, c) for c in range(cc - n, cc + n + 1)]
+        cells += [(rc + n, c) for c in range(cc - n, cc + n + 1)]
+        cells += [(r, cc - n) for r in range(rc - n + 1, rc + n)]
+        cells += [(r, cc + n) for r in range(rc - n + 1, rc + n)]
+        return cells
+
+    @staticmethod
+    def _measure(buckets, lat, lon, radius_km, dlat, dlon):
+        out = []
+        for bucket in buckets:
+            if not bucket:
+                continue
+            for key, (plat, plon) in bucket.items():
+                if abs(plat - lat) > dlat or abs(plon - lon) > dlon:
+                    continue
+                d = haversine_km(lat, lon, plat, plon)
+                if d <= radius_km:
+                    out.append((d, key))
+        return out
+
+    def nearest(self, lat, lon, k, max_km=500.0):
+        """
+        The k nearest points within max_km, nearest first.
+        """
+        return self.within(lat, lon, max_km, limit=k)
@@ -0,0 +1,242 @@
+# idempotency.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from config import db
+from models import IdempotencyKey
+
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+PRUNE_EVERY_SECONDS = 3600
+
+
+class ReplayCache:
+    """
+    In-process LRU of finished responses, key_hash -> (fingerprint,
+    status_code, body), each kept for ttl seconds. Entries never change
+    once stored, so workers need no invalidation between them.
+    """
+
+    def __init__(self, maxsize=10000, ttl=24 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key_hash -> (expires_at, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key_hash):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key_hash)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self.entries[key_hash]
+                return None
+            self.entries.move_to_end(key_hash)
+            return entry[1]
+
+    def set(self, key_hash, value, ttl=None):
+        with self.lock:
+            self.entries.pop(key_hash, None)
+            self.entries[key_hash] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def _sha256(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class IdempotencyKeys:
+    """
+    Replays the stored response of a POST retried with the same
+    Idempotency-Key instead of running the handler again.
+
+    The first request claims the key by inserting a pending row (status
+    NULL) and committing, so a concurrent retry on any worker gets a 409
+    instead of a second run. Once the handler returns, its response is
+    written to the row and to this worker's ReplayCache; a 5xx or an
+    exception releases the key so the client can retry. A pending row
+    older than lock_seconds (the worker died mid-request) is taken over.
+    Only JSON responses are replayed.
+    """
+
+    def __init__(self, ttl=24 * 3600, lock_seconds=60.0, cache_size=10000):
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.cache = ReplayCache(cache_size, ttl)
+        self.lock = threading.Lock()
+        self.last_prune = 0.0
+        self.counts = {"stored": 0, "replay_cache": 0, "replay_db": 0,
+                       "in_progress": 0, "mismatch": 0, "released": 0}
+
+    def _count(self, event):
+        with self.lock:
+            self.counts[event] += 1
+
+    def _replay(self, status_code, body, source):
+        self._count("replay_" + source)
+        response = current_app.response_class(body, status=status_code, mimetype="application/json")
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    def _prune(self, now):
+        """
+        Drop expired keys, at most once per PRUNE_EVERY_SECONDS per worker.
+        """
+        with self.lock:
+            if time.monotonic() - self.last_prune < PRUNE_EVERY_SECONDS:
+                return
+            self.last_prune = time.monotonic()
+        db.session.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.created_at < now - timedelta(seconds=self.ttl)))
+        db.session.commit()
+
+    def _claim(self, key_hash, fingerprint):
+        """
+        None once the key is ours, or the response to send instead.
+        """
+        now = datetime.utcnow()
+        row = db.session.get(IdempotencyKey, key_hash)
+        if row is not None and row.created_at < now - timedelta(seconds=self.ttl):
+            db.session.delete(row)
+            db.session.commit()
+            row = None
+
+        if row is not None:
+            if row.fingerprint != fingerprint:
+                self._count("mismatch")
+                return jsonify({"error": f"{HEADER} was already used with a different request"}), 422
+            if row.status_code is not None:
+                self.cache.set(key_hash, (row.fingerprint, row.status_code, row.body),
+                               self.ttl - (now - row.created_at).total_seconds())
+                return self._replay(row.status_code, row.body, "db")
+            if row.created_at > now - timedelta(seconds=self.lock_seconds):
+                self._count("in_progress")
+                return jsonify({"error": f"A request with this {HEADER} is still being processed"}), 409
+            # The first attempt never finished: run again under a fresh claim
+            claimed = db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status_code.is_(None),
+                       IdempotencyKey.created_at == row.created_at)
+                .values(created_at=now)
+            ).rowcount
+            db.session.commit()
+            if not claimed:
+                self._count("in_progress")
+                return jsonify({"error": f"A request with this {HEADER} is still being processed"}), 409
+            return None
+
+        self._prune(now)
+        db.session.add(IdempotencyKey(key_hash=key_hash, fingerprint=fingerprint, created_at=now))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker claimed it between our read and insert
+            db.session.rollback()
+            self._count("in_progress")
+            return jsonify({"error": f"A request with this {HEADER} is still being processed"}), 409
+        return None
+
+    def _release(self, key_hash):
+        db.session.rollback()
+        db.session.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.key_hash == key_hash, IdempotencyKey.status_code.is_(None)))
+        db.session.commit()
+        self._count("released")
+
+    def _record(self, key_hash, fingerprint, response):
+        body = response.get_data(as_text=True)
+        db.session.rollback()  # anything the handler left uncommitted is not part of its result
+        db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == key_hash)
+            .values(status_code=response.status_code, body=body)
+        )
+        db.session.commit()
+        self.cache.set(key_hash, (fingerprint, response.status_code, body))
+        self._count("stored")
+
+    def idempotent(self, view):
+        """
+        View decorator for POST handlers that return JSON. Requests
+        without the header run as before.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None:
+                return view(*args, **kwargs)
+            key = key.strip()
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"}), 400
+
+            key_hash = _sha256(request.path, key)
+            fingerprint = _sha256(request.method, request.path, request.get_data(cache=True))
+
+            hit = self.cache.get(key_hash)
+            if hit is not None:
+                if hit[0] != fingerprint:
+                    self._count("mismatch")
+                    return jsonify({"error": f"{HEADER} was already used with a different request"}), 422
+                return self._replay(hit[1], hit[2], "cache")
+
+            refused = self._claim(key_hash, fingerprint)
+            if refused is not None:
+                return refused
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                self._release(key_hash)
+                raise
+            if response.status_code >= 500 or response.mimetype != "application/json":
+                self._release(key_hash)
+            else:
+                self._record(key_hash, fingerprint, response)
+            return response
+        return wrapper
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+        return {"cached": len(self.cache), "events": counts}
+
+
+def init_app(app, registry):
+    keys = IdempotencyKeys(
+        ttl=app.config["IDEMPOTENCY_TTL"],
+        lock_seconds=app.config["IDEMPOTENCY_LOCK_SECONDS"],
+        cache_size=app.config["IDEMPOTENCY_CACHE_SIZE"],
+    )
+
+    def events():
+        with keys.lock:
+            return {(("event", event),): n for event, n in keys.counts.items()}
+
+    registry.register_counter("idempotency_events_total", "Idempotency-Key requests stored, replayed and refused.",
+                              events)
+    registry.register_gauge("idempotency_cached_responses", "Responses in this worker's idempotency replay cache.",
+                            lambda: {(): len(keys.cache)})
+    app.extensions["idempotency"] = keys
+    return keys
@@ -0,0 +1,354 @@
+# metrics.py
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram: fixed upper bounds, counts kept per bucket
+    and made cumulative only when rendered.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        out = []
+        running = 0
+        for bound, c in zip(self.buckets + (float("inf"),), self.counts):
+            running += c
+            out.append((bound, running))
+        return out
+
+
+class MetricsRegistry:
+    """
+    Holds every series the app exposes on /api/_metrics.
+    Keys are label tuples; one lock guards all updates.
+    """
+
+    def __init__(self, prefix="restockd"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.request_latency = {}   # (method, route) -> Histogram
+        self.request_sql_count = {}  # (method, route) -> Histogram
+        self.request_db_time = {}   # (method, route) -> Histogram
+        self.requests_total = {}    # (method, route, status) -> int
+        self.lock_wait = {}         # lock name -> Histogram
+        self.pool_wait = {}         # engine name -> Histogram
+        self.pool_timeouts = {}     # engine name -> int
+        self.sql_total = 0
+        self.sql_seconds = 0.0
+        self.callbacks = {}         # name -> (type, help, callable returning {labels: value})
+
+    def _hist(self, table, key, buckets):
+        h = table.get(key)
+        if h is None:
+            h = table[key] = Histogram(buckets)
+        return h
+
+    def observe_request(self, method, route, status, seconds, sql_count, db_seconds):
+        key = (method, route)
+        with self.lock:
+            self._hist(self.request_latency, key, LATENCY_BUCKETS).observe(seconds)
+            self._hist(self.request_sql_count, key, COUNT_BUCKETS).observe(sql_count)
+            self._hist(self.request_db_time, key, LATENCY_BUCKETS).observe(db_seconds)
+            k = (method, route, str(status))
+            self.requests_total[k] = self.requests_total.get(k, 0) + 1
+
+    def observe_sql(self, seconds):
+        with self.lock:
+            self.sql_total += 1
+            self.sql_seconds += seconds
+
+    def observe_lock_wait(self, name, seconds):
+        with self.lock:
+            self._hist(self.lock_wait, name, LATENCY_BUCKETS).observe(seconds)
+
+    def observe_pool_wait(self, engine_name, seconds, timed_out=False):
+        with self.lock:
+            self._hist(self.pool_wait, engine_name, LATENCY_BUCKETS).observe(seconds)
+            if timed_out:
+                self.pool_timeouts[engine_name] = self.pool_timeouts.get(engine_name, 0) + 1
+
+    def register_gauge(self, name, help_text, fn):
+        """
+        fn() returns {((label, value), ...): number}; evaluated at scrape time.
+        """
+        self.callbacks[name] = ("gauge", help_text, fn)
+
+    def register_counter(self, name, help_text, fn):
+        """
+        Like register_gauge, for totals that only go up (name them *_total).
+        """
+        self.callbacks[name] = ("counter", help_text, fn)
+
+    # --- Prometheus text format ---
+
+    @staticmethod
+    def _labels(pairs):
+        if not pairs:
+            return ""
+        inner = ",".join(
+            '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+            for k, v in pairs
+        )
+        return "{" + inner + "}"
+
+    def _render_hist(self, lines, name, help_text, table, label_names):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, h in sorted(table.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            base = list(zip(label_names, key))
+            for bound, c in h.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{self._labels(base + [('le', le)])} {c}")
+            lines.append(f"{name}_sum{self._labels(base)} {h.sum}")
+            lines.append(f"{name}_count{self._labels(base)} {h.count}")
+
+    def render(self):
+        p = self.prefix
+        lines = []
+        with self.lock:
+            self._render_hist(lines, f"{p}_http_request_duration_seconds",
+                              "Request latency by route.", self.request_latency, ("method", "route"))
+            self._render_hist(lines, f"{p}_http_request_sql_statements",
+                              "SQL statements issued per request.", self.request_sql_count, ("method", "route"))
+            self._render_hist(lines, f"{p}_http_request_db_seconds",
+                              "Time spent in the database per request.", self.request_db_time, ("method", "route"))
+            self._render_hist(lines, f"{p}_lock_wait_seconds",
+                              "Time spent waiting to acquire an in-process lock.", self.lock_wait, ("lock",))
+            self._render_hist(lines, f"{p}_pool_checkout_wait_seconds",
+                              "Time spent waiting for a pooled DB connection.", self.pool_wait, ("engine",))
+
+            lines.append(f"# HELP {p}_pool_checkout_timeouts_total Pool checkouts that timed out.")
+            lines.append(f"# TYPE {p}_pool_checkout_timeouts_total counter")
+            for engine_name, n in sorted(self.pool_timeouts.items()):
+                lines.append(f"{p}_pool_checkout_timeouts_total{self._labels([('engine', engine_name)])} {n}")
+
+            lines.append(f"# HELP {p}_http_requests_total Requests by route and status.")
+            lines.append(f"# TYPE {p}_http_requests_total counter")
+            for (method, route, status), n in sorted(self.requests_total.items()):
+                labels = self._labels([("method", method), ("route", route), ("status", status)])
+                lines.append(f"{p}_http_requests_total{labels} {n}")
+
+            lines.append(f"# HELP {p}_sql_statements_total SQL statements executed.")
+            lines.append(f"# TYPE {p}_sql_statements_total counter")
+            lines.append(f"{p}_sql_statements_total {self.sql_total}")
+            lines.append(f"# HELP {p}_sql_seconds_total Time spent executing SQL.")
+            lines.append(f"# TYPE {p}_sql_seconds_total counter")
+            lines.append(f"{p}_sql_seconds_total {self.sql_seconds}")
+
+        for name, (kind, help_text, fn) in sorted(self.callbacks.items()):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+            for labels, value in sorted(fn().items()):
+                lines.append(f"{p}_{name}{self._labels(list(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# --- Per-request stats ---
+
+class RequestStats:
+    __slots__ = ("start", "sql_count", "db_seconds", "lock_seconds")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.db_seconds = 0.0
+        self.lock_seconds = 0.0
+
+
+def current_stats():
+    if has_request_context():
+        return g.get("_request_stats")
+    return None
+
+
+class TimedLock:
+    """
+    Drop-in threading.Lock that records how long callers waited for it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+
+    def acquire(self, blocking=True, timeout=-1):
+        start = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        waited = time.perf_counter() - start
+        registry.observe_lock_wait(self.name, waited)
+        stats = current_stats()
+        if stats is not None:
+            stats.lock_seconds += waited
+        return ok
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+# --- Connection pool ---
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited for a connection.
+    metrics_name is set per engine by init_app ("primary", "replica").
+    """
+
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            registry.observe_pool_wait(self.metrics_name, time.perf_counter() - start, timed_out=True)
+            raise
+        registry.observe_pool_wait(self.metrics_name, time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+def _pool_gauges(engines):
+    """
+    Build the scrape-time callbacks for checked-out / idle / saturation gauges.
+    """
+    def collect(fn):
+        def inner():
+            out = {}
+            for name, engine in engines.items():
+                pool = engine.pool
+                if isinstance(pool, QueuePool):
+                    out[(("engine", name),)] = fn(pool)
+            return out
+        return inner
+
+    def saturation(pool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        return round(pool.checkedout() / capacity, 4) if capacity else 0.0
+
+    registry.register_gauge("pool_checked_out", "Connections currently checked out.",
+                            collect(lambda p: p.checkedout()))
+    registry.register_gauge("pool_checked_in", "Idle connections in the pool.",
+                            collect(lambda p: p.checkedin()))
+    registry.register_gauge("pool_overflow", "Connections open beyond pool_size.",
+                            collect(lambda p: max(p.overflow(), 0)))
+    registry.register_gauge("pool_size", "Configured pool_size.",
+                            collect(lambda p: p.size()))
+    registry.register_gauge("pool_saturation", "Checked-out connections / (pool_size + max_overflow).",
+                            collect(saturation))
+
+
+# --- SQLAlchemy engine events ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    registry.observe_sql(elapsed)
+    stats = current_stats()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine):
+    """
+    Count and time every statement run on this engine.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Flask wiring ---
+
+def _route_label():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def init_app(app, db):
+    """
+    Register the timing middleware, SQL listeners and GET /api/_metrics.
+    """
+    with app.app_context():
+        engines = {}
+        for bind_key, engine in db.engines.items():
+            name = "primary" if bind_key is None else bind_key
+            engine.pool.metrics_name = name
+            engines[name] = engine
+            instrument_engine(engine)
+    _pool_gauges(engines)
+
+    @app.before_request
+    def _start_request_timer():
+        g._request_stats = RequestStats()
+
+    @app.after_request
+    def _record_request(response):
+        stats = g.get("_request_stats")
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.start
+        registry.observe_request(
+            request.method, _route_label(), response.status_code,
+            total, stats.sql_count, stats.db_seconds,
+        )
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.sql_count} queries", '
+            f"lock;dur={stats.lock_seconds * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+        return response
+
+    @app.get("/api/_metrics")
+    def metrics_endpoint():
+        """
+        Prometheus text exposition of the in-process metrics.
+        """
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    return registry
@@ -1,11 +1,11 @@
 from config import db
-from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
+from db_types import GUID
 
 
 class Profile(db.Model):
     __tablename__ = "profiles"
 
-    id = db.Column(UUID(as_uuid=True), primary_key=True)
+    id = db.Column(GUID(), primary_key=True)
     email = db.Column(db.String, nullable=False)
     role = db.Column(db.String, nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), nullable=False)
@@ -25,7 +25,7 @@ class Donor(db.Model):
     __tablename__ = "donors"
 
     id = db.Column(
-        UUID(as_uuid=True),
+        GUID(),
         db.ForeignKey("profiles.id"),
         primary_key=True,
     )
@@ -60,7 +60,7 @@ class FoodBank(db.Model):
     __tablename__ = "food_banks"
 
     id = db.Column(
-        UUID(as_uuid=True),
+        GUID(),
         db.ForeignKey("profiles.id"),
         primary_key=True,
     )
@@ -147,9 +147,9 @@ class FoodBank(db.Model):
 class DonationPosting(db.Model):
     __tablename__ = "donation_postings"
 
-    id = db.Column(UUID(as_uuid=True), primary_key=True)
+    id = db.Column(GUID(), primary_key=True)
     food_bank_id = db.Column(
-        UUID(as_uuid=True),
+        GUID(),
         db.ForeignKey("food_banks.id"),
         nullable=False,
     )
@@ -163,8 +163,9 @@ class DonationPosting(db.Model):
     from_time = db.Column(db.Time, nullable=False)
     to_time = db.Column(db.Time, nullable=False)
 
-    created_at = db.Column(db.DateTime(timezone=False), nullable=False)
-    updated_at = db.Column(db.DateTime(timezone=False), nullable=False)
+    # Supabase fills these with now(); server_default keeps SQLite in line
+    created_at = db.Column(db.DateTime(timezone=False), nullable=False, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime(timezone=False), nullable=False, server_default=db.func.now())
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     food_bank = db.relationship("FoodBank", backref="postings")
 
@@ -244,10 +245,10 @@ class DonationPosting(db.Model):
 class Meetup(db.Model):
     __tablename__ = "meetups"
 
-    id = db.Column(UUID(as_uuid=True), primary_key=True)
-    posting_id = db.Column(UUID(as_uuid=True), db.ForeignKey("donation_postings.id"), nullable=False)
-    donor_id = db.Column(UUID(as_uuid=True), db.ForeignKey("donors.id"), nullable=False)
-    food_bank_id = db.Column(UUID(as_uuid=True), db.ForeignKey("food_banks.id"), nullable=False)
+    id = db.Column(GUID(), primary_key=True)
+    posting_id = db.Column(GUID(), db.ForeignKey("donation_postings.id"), nullable=False)
+    donor_id = db.Column(GUID(), db.ForeignKey("donors.id"), nullable=False)
+    food_bank_id = db.Column(GUID(), db.ForeignKey("food_banks.id"), nullable=False)
 
     donation_item = db.Column(db.String, nullable=False)
     quantity = db.Column(db.Numeric, nullable=False)
@@ -285,9 +286,9 @@ class Meetup(db.Model):
 class MeetupTimeChangeRequest(db.Model):
     __tablename__ = "meetup_time_change_requests"
 
-    id = db.Column(UUID(as_uuid=True), primary_key=True)
+    id = db.Column(GUID(), primary_key=True)
     meetup_id = db.Column(
-        UUID(as_uuid=True),
+        GUID(),
         db.ForeignKey("meetups.id"),
         nullable=False,
     )
@@ -324,7 +325,7 @@ class Leaderboard(db.Model):
     __tablename__ = "leaderboard"
 
     donor_id = db.Column(
-        UUID(as_uuid=True),
+        GUID(),
         db.ForeignKey("donors.id"),
         primary_key=True,
     )
@@ -347,3 +348,104 @@ class Leaderboard(db.Model):
             "last_updated": self.last_updated.isoformat()
             if self.last_updated else None,
         }
+
+
+class FoodBankSlotSettings(db.Model):
+    """
+    Pickup slot length and how many meetups one slot takes (0 = no
+    limit). Banks without a row use SLOT_MINUTES / SLOT_CAPACITY.
+    """
+    __tablename__ = "food_bank_slot_settings"
+
+    food_bank_id = db.Column(
+        GUID(),
+        db.ForeignKey("food_banks.id"),
+        primary_key=True,
+    )
+    slot_minutes = db.Column(db.Integer, nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    def to_json(self):
+        return {
+            "food_bank_id": str(self.food_bank_id),
+            "slot_minutes": self.slot_minutes,
+            "capacity": self.capacity,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class IdempotencyKey(db.Model):
+    """
+    Stored outcome of a POST sent with an Idempotency-Key header (see
+    idempotency.py). status_code is NULL while the first request is still
+    running.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key_hash = db.Column(db.String(64), primary_key=True)     # sha256 of path + key
+    fingerprint = db.Column(db.String(64), nullable=False)    # sha256 of the request body
+    status_code = db.Column(db.SmallInteger, nullable=True)
+    body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+
+# --- Archive (see archive.py) ---
+# Closed meetups and answered time change requests are moved here once
+# they are older than ARCHIVE_AFTER_DAYS. Same columns as the hot tables,
+# minus the foreign keys, plus when the row was moved.
+
+class MeetupArchive(db.Model):
+    __tablename__ = "meetups_archive"
+
+    id = db.Column(GUID(), primary_key=True)
+    posting_id = db.Column(GUID(), nullable=False, index=True)
+    donor_id = db.Column(GUID(), nullable=False)
+    food_bank_id = db.Column(GUID(), nullable=False, index=True)
+
+    donation_item = db.Column(db.String, nullable=False)
+    quantity = db.Column(db.Numeric, nullable=False)
+    scheduled_date = db.Column(db.Date, nullable=False)
+    scheduled_time = db.Column(db.Time, nullable=False)
+
+    completed = db.Column(db.Boolean, nullable=False)
+    completion_status = db.Column(db.String, nullable=True)
+    completed_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    archived_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    # The duplicate-booking check in create_meetup looks archived pairs up too
+    __table_args__ = (db.Index("ix_meetups_archive_donor_posting", "donor_id", "posting_id"),)
+
+
+class MeetupTimeChangeRequestArchive(db.Model):
+    __tablename__ = "meetup_time_change_requests_archive"
+
+    id = db.Column(GUID(), primary_key=True)
+    meetup_id = db.Column(GUID(), nullable=False, index=True)
+    requested_by = db.Column(db.String, nullable=False)
+    requested_to = db.Column(db.String, nullable=False)
+    new_date = db.Column(db.Date, nullable=False)
+    new_time = db.Column(db.Time, nullable=False)
+    reason = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String, nullable=False)
+
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    responded_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    archived_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+
+class ArchivedDonorTotal(db.Model):
+    """
+    Completed meetups and weight per donor that have moved to
+    meetups_archive, so the all-time leaderboard stays exact without
+    reading the archive.
+    """
+    __tablename__ = "archived_donor_totals"
+
+    donor_id = db.Column(GUID(), primary_key=True)
+    total_meetups = db.Column(db.Integer, nullable=False)
+    total_weight = db.Column(db.Numeric, nullable=False)
@@ -0,0 +1,344 @@
+# read_queries.py
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import Column, Table, func, or_, select, union, union_all
+from sqlalchemy.sql import visitors
+
+import facet_index
+import row_encoders
+import search_backend
+from archive import ARCHIVES
+from models import ArchivedDonorTotal, DonationPosting, Donor, FoodBank, Meetup, MeetupTimeChangeRequest, Profile
+
+
+# Statements shared by the Flask views (app.py) and the async read path
+# (asgi.py), so both return the same rows in the same order.
+
+ID_BATCH = 500  # ids per IN (...) when hydrating a long id list
+
+
+def uuid_arg(args, name):
+    """
+    (UUID or None, error message or None) for an optional id query param.
+    """
+    value = args.get(name)
+    if not value:
+        return None, None
+    try:
+        return UUID(value), None
+    except (ValueError, TypeError):
+        return None, f"Invalid {name} format"
+
+
+def donation_postings_query(encoder, food_bank_id=None):
+    # Only active postings (soft-deleted ones are hidden)
+    stmt = select(*encoder.columns).where(DonationPosting.is_active.is_(True))
+    if food_bank_id is not None:
+        stmt = stmt.where(DonationPosting.food_bank_id == food_bank_id)
+    return stmt
+
+
+def postings_by_ids_query(encoder, ids):
+    # The id is selected separately so results can be put in search order
+    # whichever fields were asked for
+    return (
+        select(DonationPosting.id.label("search_id"), *encoder.columns)
+        .where(DonationPosting.id.in_(ids))
+    )
+
+
+def postings_by_ids_queries(encoder, id_list, batch_size=ID_BATCH):
+    """
+    postings_by_ids_query for a long list of id strings, batch_size ids
+    per statement.
+    """
+    ids = []
+    for value in id_list:
+        try:
+            ids.append(UUID(value))
+        except ValueError:
+            continue
+    return [postings_by_ids_query(encoder, ids[start:start + batch_size])
+            for start in range(0, len(ids), batch_size)]
+
+
+def faceted_arg(args, plain=()):
+    """
+    Whether a postings request goes through the facet index (see
+    facet_index.py): a facet filter or q prefix other than the params in
+    plain (which the endpoint handles without it), or ?facets= for the
+    counts alone.
+    """
+    counted, error = facet_index.parse_counted(args.get("facets"))
+    return (any(args.get(name) for name in (*facet_index.FACETS, "q") if name not in plain)
+            or bool(counted) or error is not None)
+
+
+def facet_args(args, default_limit=None, max_limit=None):
+    """
+    (filters, facets to count, limit, offset, error message or None) for
+    a faceted postings request; limit None means every match.
+    """
+    filters, error = facet_index.parse_filters(args)
+    if error:
+        return None, None, None, None, error
+    counted, error = facet_index.parse_counted(args.get("facets"))
+    if error:
+        return None, None, None, None, error
+    try:
+        limit = int(args["limit"]) if args.get("limit") else default_limit
+        offset = int(args.get("offset") or 0)
+    except ValueError:
+        return None, None, None, None, "limit and offset must be numbers"
+    if offset < 0:
+        return None, None, None, None, "offset must be at least 0"
+    if limit is not None and not 1 <= limit <= (max_limit or limit):
+        error = f"limit must be between 1 and {max_limit}" if max_limit else "limit must be at least 1"
+        return None, None, None, None, error
+    return filters, counted, limit, offset, None
+
+
+def faceted_posting_ids_queries(filters, food_bank_ids, prefix, limit=None, offset=0):
+    """
+    (ids statement, total statement) answering facet filters straight
+    from donation_postings while the facet index is not built.
+    food_bank_ids is None without a bank filter, or the banks that pass
+    the food_bank_id, city, tag and refrigerated filters.
+    """
+    stmt = select(DonationPosting.id).where(DonationPosting.is_active.is_(True))
+    if filters.get("urgency") is not None:
+        stmt = stmt.where(func.lower(DonationPosting.urgency).in_(sorted(filters["urgency"])))
+    if food_bank_ids is not None:
+        stmt = stmt.where(DonationPosting.food_bank_id.in_(food_bank_ids))
+    for term in search_backend.clean_prefix(prefix or "").split():
+        stmt = stmt.where(or_(DonationPosting.food_name.ilike(f"{term}%"),
+                              DonationPosting.food_name.ilike(f"% {term}%")))
+    total = select(func.count()).select_from(stmt.subquery())
+    stmt = stmt.order_by(DonationPosting.created_at, DonationPosting.id).offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt, total
+
+
+def history_arg(args):
+    """
+    ?history=true: also read the archive tables (see archive.py).
+    """
+    return (args.get("history") or "").lower() in ("true", "1", "yes")
+
+
+def on_archive(stmt):
+    """
+    The same statement reading the archive tables instead of the hot ones.
+    """
+    def replace(element):
+        if isinstance(element, Table):
+            return ARCHIVES.get(element)
+        if isinstance(element, Column) and element.table in ARCHIVES:
+            return ARCHIVES[element.table].c[element.name]
+        return None
+    return visitors.replacement_traverse(stmt, {}, replace)
+
+
+def with_archive(stmt, order_by):
+    """
+    stmt over the hot tables UNION ALL the same over the archive, in one
+    order. order_by: [(column of the hot table, descending)]; the sort
+    keys ride along in the union and are dropped from the outer select,
+    so rows keep the encoder's column layout.
+    """
+    width = len(stmt.selected_columns)
+    keyed = stmt.add_columns(*[column.label(f"_order_{i}") for i, (column, _) in enumerate(order_by)])
+    both = union_all(keyed, on_archive(keyed)).subquery("with_archive")
+    keys = list(both.c)[width:]
+    return select(*list(both.c)[:width]).order_by(
+        *[key.desc() if descending else key for key, (_, descending) in zip(keys, order_by)]
+    )
+
+
+def meetup_pairs_query():
+    """
+    (donor_id, posting_id) of every meetup, archived ones included, for
+    the duplicate-booking Bloom filter.
+    """
+    stmt = select(Meetup.donor_id, Meetup.posting_id)
+    return union_all(stmt, on_archive(stmt))
+
+
+def donated_items_query(donor_id):
+    """
+    Distinct donation_item of a donor's completed meetups, archived ones
+    included.
+    """
+    stmt = select(Meetup.donation_item).where(Meetup.donor_id == donor_id, Meetup.completion_status == "completed")
+    return union(stmt, on_archive(stmt))
+
+
+def meetups_query(encoder, args):
+    """
+    (statement, error) for list_meetups' filters:
+    donor_id, food_bank_id, posting_id, completed (true/false),
+    history (true: include archived meetups)
+    """
+    stmt = select(*encoder.columns)
+    for name, column in (("donor_id", Meetup.donor_id),
+                         ("food_bank_id", Meetup.food_bank_id),
+                         ("posting_id", Meetup.posting_id)):
+        value, error = uuid_arg(args, name)
+        if error:
+            return None, error
+        if value is not None:
+            stmt = stmt.where(column == value)
+
+    completed = args.get("completed")
+    if completed is not None:
+        stmt = stmt.where(Meetup.completed == (completed.lower() in ("true", "1", "yes")))
+
+    if history_arg(args):
+        return with_archive(stmt, [(Meetup.scheduled_date, True), (Meetup.scheduled_time, True)]), None
+    return stmt.order_by(Meetup.scheduled_date.desc(), Meetup.scheduled_time.desc()), None
+
+
+def meetup_export_query(encoder, food_bank_id, history=True):
+    """
+    A food bank's meetups, oldest first, with donor names and posting
+    food names joined in (no per-row lookups). Archived meetups are
+    included unless history is False.
+    """
+    stmt = (
+        select(*encoder.columns)
+        .select_from(Meetup)
+        .outerjoin(Donor, Donor.id == Meetup.donor_id)
+        .outerjoin(DonationPosting, DonationPosting.id == Meetup.posting_id)
+        .where(Meetup.food_bank_id == food_bank_id)
+    )
+    order_by = [(Meetup.scheduled_date, False), (Meetup.scheduled_time, False), (Meetup.id, False)]
+    if history:
+        return with_archive(stmt, order_by)
+    return stmt.order_by(*[column for column, _ in order_by])
+
+
+def food_banks_query(encoder):
+    """
+    Food banks by name; items_needed (active postings) comes from one
+    grouped join rather than a count per bank.
+    """
+    return (
+        select(*encoder.columns)
+        .select_from(row_encoders.food_bank_source(encoder))
+        .order_by(FoodBank.name)
+    )
+
+
+def food_banks_by_ids_query(encoder, ids):
+    # id selected separately so rows can be matched to their distance
+    return (
+        select(FoodBank.id.label("geo_id"), *encoder.columns)
+        .select_from(row_encoders.food_bank_source(encoder))
+        .where(FoodBank.id.in_(ids))
+    )
+
+
+def postings_at_banks_query(encoder, food_bank_ids):
+    """
+    Active postings at these food banks, soonest to_date first; each row
+    starts with (food_bank_id, to_date) for ordering by distance.
+    """
+    return (
+        select(DonationPosting.food_bank_id.label("geo_bank_id"),
+               DonationPosting.to_date.label("geo_to_date"), *encoder.columns)
+        .where(DonationPosting.is_active.is_(True))
+        .where(DonationPosting.food_bank_id.in_(food_bank_ids))
+        .order_by(DonationPosting.to_date)
+    )
+
+
+def time_change_requests_query(encoder, meetup_id=None, status=None, history=False):
+    stmt = select(*encoder.columns)
+    if meetup_id is not None:
+        stmt = stmt.where(MeetupTimeChangeRequest.meetup_id == meetup_id)
+    if status:
+        stmt = stmt.where(MeetupTimeChangeRequest.status == status)
+    if history:
+        return with_archive(stmt, [(MeetupTimeChangeRequest.created_at, True)])
+    return stmt.order_by(MeetupTimeChangeRequest.created_at.desc())
+
+
+def leaderboard_cutoff(timeframe, now=None):
+    now = now or datetime.now()
+    if timeframe == "week":
+        return now - timedelta(days=7)
+    if timeframe == "month":
+        return now - timedelta(days=30)
+    return None
+
+
+def leaderboard_query(cutoff=None, limit=50):
+    """
+    Top donors by total weight (sum of Meetup.quantity) of completed meetups.
+    All time (no cutoff) adds the per-donor totals of archived meetups;
+    week and month only ever need the hot table.
+    """
+    total_weight = func.coalesce(func.sum(Meetup.quantity), 0)
+    stmt = select(
+        Meetup.donor_id,
+        func.count(Meetup.id).label("total_meetups"),
+        total_weight.label("total_weight"),
+    ).where(Meetup.completed.is_(True))
+
+    if cutoff is not None:
+        stmt = stmt.where(Meetup.completed_at >= cutoff)
+        return stmt.group_by(Meetup.donor_id).order_by(total_weight.desc()).limit(limit)
+
+    totals = union_all(
+        stmt.group_by(Meetup.donor_id),
+        select(ArchivedDonorTotal.donor_id, ArchivedDonorTotal.total_meetups, ArchivedDonorTotal.total_weight),
+    ).subquery("donor_totals")
+    total_weight = func.sum(totals.c.total_weight)
+    return (
+        select(
+            totals.c.donor_id,
+            func.sum(totals.c.total_meetups).label("total_meetups"),
+            total_weight.label("total_weight"),
+        )
+        .group_by(totals.c.donor_id)
+        .order_by(total_weight.desc())
+        .limit(limit)
+    )
+
+
+def leaderboard_people_queries(donor_ids):
+    return (
+        select(Donor).where(Donor.id.in_(donor_ids)),
+        select(Profile).where(Profile.id.in_(donor_ids)),
+    )
+
+
+def leaderboard_json(rows, donors, profiles):
+    donor_by_id = {d.id: d for d in donors}
+    profile_by_id = {p.id: p for p in profiles}
+
+    out = []
+    for rank, row in enumerate(rows, start=1):
+        donor = donor_by_id.get(row.donor_id)
+        profile = profile_by_id.get(row.donor_id)
+        out.append({
+            "rank": rank,
+            "donor_id": str(row.donor_id),
+            "first_name": donor.first_name if donor else None,
+            "last_name": donor.last_name if donor else None,
+            "email": profile.email if profile else None,
+            "total_meetups": int(row.total_meetups or 0),
+            "total_weight": float(row.total_weight or 0),
+        })
+    return out
+
+
+def ordered_postings_json(encoder, rows, id_list):
+    """
+    Encoded postings_by_ids_query rows in the order the search backend
+    returned their ids.
+    """
+    row_by_id = {str(row[0]): row for row in rows}
+    return [encoder.encode(row_by_id[_id][1:]) for _id in id_list if _id in row_by_id]
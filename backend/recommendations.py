@@ -0,0 +1,182 @@
+# recommendations.py
+import bisect
+import heapq
+import math
+from datetime import date
+
+
+# Score = posting part (urgency, days until to_date, remaining quantity),
+# the same for every donor, + donor part (distance to the food bank, food
+# the donor has donated before). The posting part is kept pre-sorted; a
+# donor's top N merges a few of those sorted lists and stops as soon as
+# no unread posting could beat the current N-th score (threshold algorithm).
+
+WEIGHTS = {
+    "urgency": 3.0,
+    "expiry": 2.0,
+    "quantity": 1.0,
+    "distance": 2.0,
+    "history": 1.5,
+}
+URGENCY_LEVELS = {"high": 1.0, "medium": 0.6, "low": 0.3}
+EXPIRY_DAYS = 7.0     # expiry term halves at a week out
+QUANTITY_SCALE = 100  # lbs still needed for the full quantity term
+DISTANCE_KM = 5.0     # distance term halves at 5 km
+
+
+def item_key(name):
+    return " ".join((name or "").lower().split())
+
+
+def posting_score(urgency, to_date, qty_needed, today):
+    days_left = max((to_date - today).days, 0)
+    qty = max(float(qty_needed or 0), 0.0)
+    return (
+        WEIGHTS["urgency"] * URGENCY_LEVELS.get((urgency or "").lower(), URGENCY_LEVELS["low"])
+        + WEIGHTS["expiry"] / (1.0 + days_left / EXPIRY_DAYS)
+        + WEIGHTS["quantity"] * min(1.0, math.log1p(qty) / math.log1p(QUANTITY_SCALE))
+    )
+
+
+def distance_bonus(km):
+    if km is None:
+        return 0.0
+    return WEIGHTS["distance"] / (1.0 + km / DISTANCE_KM)
+
+
+class PostingRanker:
+    """
+    Active postings ordered by their donor-independent score, overall and
+    per food bank and per item. Scores depend on today's date, so the
+    lists are re-sorted when the day changes.
+    Not thread-safe: callers hold a lock (see app.py).
+    """
+
+    def __init__(self):
+        self.day = date.today()
+        self.entries = {}   # posting_id -> (food_bank_id, item, urgency, to_date, qty_needed, base)
+        self.order = []     # [(-base, posting_id)]
+        self.by_bank = {}   # food_bank_id -> [(-base, posting_id)]
+        self.by_item = {}   # item key -> [(-base, posting_id)]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.order.clear()
+        self.by_bank.clear()
+        self.by_item.clear()
+
+    def load(self, postings, today=None):
+        """
+        Replace the contents with (posting_id, food_bank_id, food_name,
+        urgency, to_date, qty_needed) rows, sorting each list once.
+        """
+        self.clear()
+        self.day = today or date.today()
+        for posting_id, food_bank_id, food_name, urgency, to_date, qty_needed in postings:
+            key = self._add(posting_id, food_bank_id, food_name, urgency, to_date, qty_needed)
+            if key is not None:
+                self.order.append(key)
+                self.by_bank.setdefault(food_bank_id, []).append(key)
+                self.by_item.setdefault(self.entries[posting_id][1], []).append(key)
+        for keys in (self.order, *self.by_bank.values(), *self.by_item.values()):
+            keys.sort()
+
+    def upsert(self, posting_id, food_bank_id, food_name, urgency, to_date, qty_needed):
+        """
+        Add or re-score a posting; expired or fully covered postings are dropped.
+        """
+        self.remove(posting_id)
+        key = self._add(posting_id, food_bank_id, food_name, urgency, to_date, qty_needed)
+        if key is None:
+            return False
+        bisect.insort(self.order, key)
+        bisect.insort(self.by_bank.setdefault(food_bank_id, []), key)
+        bisect.insort(self.by_item.setdefault(self.entries[posting_id][1], []), key)
+        return True
+
+    def _add(self, posting_id, food_bank_id, food_name, urgency, to_date, qty_needed):
+        if to_date < self.day or not qty_needed or qty_needed <= 0:
+            return None
+        base = posting_score(urgency, to_date, qty_needed, self.day)
+        self.entries[posting_id] = (food_bank_id, item_key(food_name), urgency, to_date, qty_needed, base)
+        return (-base, posting_id)
+
+    def remove(self, posting_id):
+        entry = self.entries.pop(posting_id, None)
+        if entry is None:
+            return False
+        food_bank_id, item, base = entry[0], entry[1], entry[5]
+        key = (-base, posting_id)
+        for lists, name in ((self.by_bank, food_bank_id), (self.by_item, item)):
+            _discard(lists[name], key)
+            if not lists[name]:
+                del lists[name]
+        _discard(self.order, key)
+        return True
+
+    def rescore(self, today):
+        self.load([(posting_id, *entry[:5]) for posting_id, entry in self.entries.items()], today)
+
+    def top(self, n, near_banks, items, far_distance, far_km, today=None):
+        """
+        [(score, posting_id, distance_km, given_before)] best first.
+
+        near_banks: {food_bank_id: km} for every bank within far_km of the
+        donor; far_distance(food_bank_id) -> km or None for the rest.
+        items: item keys the donor has donated before.
+        """
+        today = today or date.today()
+        if today != self.day:
+            self.rescore(today)
+
+        # One cursor per sorted list, with a bound on the donor part for
+        # every posting that list is responsible for:
+        # - banks within far_km: their exact distance bonus (+ history)
+        # - the donor's items, at the other banks: the bonus at far_km + history
+        # - everything else: the bonus at far_km
+        far_bonus = distance_bonus(far_km) if far_km is not None else 0.0
+        history = WEIGHTS["history"] if items else 0.0
+        cursors = []
+        for food_bank_id, km in near_banks.items():
+            if food_bank_id in self.by_bank:
+                cursors.append((self.by_bank[food_bank_id], distance_bonus(km) + history))
+        for item in items:
+            if item in self.by_item:
+                cursors.append((self.by_item[item], far_bonus + history))
+        cursors.append((self.order, far_bonus))
+
+        heap = [(keys[0][0] - bound, i, 0) for i, (keys, bound) in enumerate(cursors) if keys]
+        heapq.heapify(heap)
+        best = []  # min-heap of (score, posting_id, km, given_before)
+        seen = set()
+        while heap:
+            neg_bound, i, pos = heapq.heappop(heap)
+            if len(best) >= n and -neg_bound < best[0][0]:
+                break
+            keys, bound = cursors[i]
+            neg_base, posting_id = keys[pos]
+            if pos + 1 < len(keys):
+                heapq.heappush(heap, (keys[pos + 1][0] - bound, i, pos + 1))
+            if posting_id in seen:
+                continue
+            seen.add(posting_id)
+
+            food_bank_id, item = self.entries[posting_id][:2]
+            km = near_banks[food_bank_id] if food_bank_id in near_banks else far_distance(food_bank_id)
+            given_before = item in items
+            score = -neg_base + distance_bonus(km) + (WEIGHTS["history"] if given_before else 0.0)
+            candidate = (score, posting_id, km, given_before)
+            if len(best) < n:
+                heapq.heappush(best, candidate)
+            elif candidate > best[0]:
+                heapq.heapreplace(best, candidate)
+        return sorted(best, reverse=True)
+
+
+def _discard(keys, key):
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
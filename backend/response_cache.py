@@ -0,0 +1,268 @@
+# response_cache.py
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, g, jsonify, make_response, request
+
+from admin import admin_only
+
+
+class CacheBackend:
+    """
+    Storage behind ResponseCache. The local backend lives in one process;
+    a shared one (e.g. Redis with a set per tag) implements the same four
+    methods and is registered with register_backend().
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl, tags):
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self):
+        return None
+
+
+class LocalCacheBackend(CacheBackend):
+    """
+    In-process LRU with per-entry TTL and a tag -> keys index so a write
+    can drop exactly the responses it affects.
+    """
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self.by_tag = {}              # tag -> set(keys)
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self.by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_tag[tag]
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                self._drop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, tags):
+        with self.lock:
+            self._drop(key)
+            self.entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            for tag in tags:
+                self.by_tag.setdefault(tag, set()).add(key)
+            while len(self.entries) > self.maxsize:
+                self._drop(next(iter(self.entries)))
+
+    def invalidate_tags(self, tags):
+        dropped = 0
+        with self.lock:
+            for tag in tags:
+                for key in list(self.by_tag.get(tag, ())):
+                    self._drop(key)
+                    dropped += 1
+        return dropped
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.by_tag.clear()
+
+    def size(self):
+        return len(self.entries)
+
+
+BACKENDS = {"local": LocalCacheBackend}
+
+
+def register_backend(name, factory):
+    """
+    factory(maxsize=...) -> CacheBackend; selected with RESPONSE_CACHE=<name>.
+    """
+    BACKENDS[name] = factory
+
+
+class ResponseCache:
+    """
+    Caches successful JSON GET responses keyed by endpoint and sorted query
+    string. Each entry carries scope tags (see the *_tag helpers in app.py)
+    that mutating handlers invalidate after they commit.
+    """
+
+    def __init__(self, backend=None, ttl=30.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.version = 0
+        self.stats = {}  # endpoint -> {"hit": n, "miss": n}
+        self.invalidated = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _count(self, endpoint, event):
+        with self.lock:
+            counts = self.stats.setdefault(endpoint, {"hit": 0, "miss": 0})
+            counts[event] += 1
+
+    @staticmethod
+    def key_for(endpoint, args, replica):
+        query = urlencode(sorted(args.items(multi=True)))
+        # Replica and primary reads may differ (lag), so never share entries
+        return f"{endpoint}?{query}#{'replica' if replica else 'primary'}"
+
+    @classmethod
+    def make_key(cls, endpoint):
+        return cls.key_for(endpoint, request.args, g.get("_use_replica"))
+
+    def lookup(self, endpoint, key):
+        """
+        Cached (body, mimetype) or None, counted as a hit or miss.
+        """
+        hit = self.backend.get(key)
+        self._count(endpoint, "hit" if hit is not None else "miss")
+        return hit
+
+    def begin(self):
+        """
+        Version to pass to store() once the response is built.
+        """
+        with self.lock:
+            return self.version
+
+    def store(self, key, value, tags, version):
+        with self.lock:
+            # A write committed while we were reading; our copy may predate it
+            fresh = version == self.version
+        if fresh:
+            self.backend.set(key, value, self.ttl, tags)
+
+    def cached(self, tags):
+        """
+        View decorator. tags(args) returns the scope tags of the response
+        for these query params. Only 200 responses are stored.
+        """
+        def decorator(view):
+            endpoint = view.__name__
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+
+                key = self.make_key(endpoint)
+                hit = self.lookup(endpoint, key)
+                if hit is not None:
+                    body, mimetype = hit
+                    response = current_app.response_class(body, status=200, mimetype=mimetype)
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+
+                version = self.begin()
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    self.store(key, (response.get_data(), response.mimetype),
+                               tags(request.args), version)
+                response.headers["X-Cache"] = "MISS"
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        if not self.enabled:
+            return 0
+        with self.lock:
+            self.version += 1
+        dropped = self.backend.invalidate_tags(tags)
+        with self.lock:
+            self.invalidated += dropped
+        return dropped
+
+    def clear(self):
+        if self.enabled:
+            with self.lock:
+                self.version += 1
+            self.backend.clear()
+
+    def snapshot(self):
+        with self.lock:
+            endpoints = {}
+            for endpoint, c in self.stats.items():
+                total = c["hit"] + c["miss"]
+                endpoints[endpoint] = dict(c, hit_rate=round(c["hit"] / total, 4) if total else 0.0)
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "ttl": self.ttl,
+            "size": self.backend.size() if self.backend else 0,
+            "invalidated": self.invalidated,
+            "endpoints": endpoints,
+        }
+
+
+def init_app(app, registry):
+    """
+    Build the cache selected by RESPONSE_CACHE ("local", "off", or a
+    registered backend name), export hit/miss counts and register the
+    admin endpoints.
+    """
+    name = app.config["RESPONSE_CACHE"]
+    backend = None
+    if name != "off":
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown RESPONSE_CACHE {name!r} (expected one of {sorted(BACKENDS)} or 'off')")
+        backend = BACKENDS[name](maxsize=app.config["RESPONSE_CACHE_SIZE"])
+    cache = ResponseCache(backend, ttl=app.config["RESPONSE_CACHE_TTL"])
+
+    def events():
+        with cache.lock:
+            return {
+                (("endpoint", endpoint), ("event", event)): n
+                for endpoint, counts in cache.stats.items()
+                for event, n in counts.items()
+            }
+
+    registry.register_counter("response_cache_events_total", "Response cache hits and misses by endpoint.", events)
+    registry.register_gauge("response_cache_entries", "Entries in the response cache.",
+                            lambda: {(): cache.backend.size() or 0} if cache.enabled else {})
+
+    @app.get("/api/_admin/cache")
+    @admin_only
+    def response_cache_stats():
+        """
+        Response cache size and per-endpoint hit rates.
+        """
+        return jsonify(cache.snapshot())
+
+    @app.delete("/api/_admin/cache")
+    @admin_only
+    def clear_response_cache():
+        cache.clear()
+        return jsonify({"message": "Response cache cleared"})
+
+    app.extensions["response_cache"] = cache
+    return cache
@@ -0,0 +1,45 @@
+# routing.py
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+
+REPLICA_BIND = "replica"
+RYW_HEADER = "X-Consistent-Read"
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to the replica engine while a request is marked with
+    @read_replica; everything else (and every flush) uses the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing
+                and has_request_context() and g.get("_use_replica")):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def consistent_read(header_value):
+    """
+    True when the client asked to read from the primary with
+    X-Consistent-Read, e.g. to see its own write right away despite
+    replica lag. Shared with the async read path (asgi.py).
+    """
+    return (header_value or "").lower() in ("1", "true", "yes")
+
+
+def read_replica(view):
+    """
+    Mark a read-only view as safe to serve from the replica.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g._use_replica = not consistent_read(request.headers.get(RYW_HEADER))
+        return view(*args, **kwargs)
+    return wrapper
+
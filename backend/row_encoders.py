@@ -0,0 +1,188 @@
+# row_encoders.py
+from functools import lru_cache
+
+from sqlalchemy import func, select
+
+from models import DonationPosting, Donor, FoodBank, Meetup, MeetupTimeChangeRequest
+
+
+# List endpoints select plain column tuples and turn each row into the
+# same dict the model's to_json() builds, without hydrating ORM objects.
+# The per-row function is generated once per (model, field subset), so
+# a row costs one call with no per-field dispatch.
+
+# Conversion per value kind; "{v}" is the column value
+CONVERT = {
+    None: "{v}",
+    "uuid": "str({v})",
+    "iso": "{v}.isoformat()",
+    "float": "float({v})",
+}
+
+
+class Field:
+    __slots__ = ("key", "column", "kind", "nullable")
+
+    def __init__(self, key, column, kind=None, nullable=None):
+        self.key = key
+        self.column = column
+        self.kind = kind
+        if nullable is None:
+            nullable = getattr(column.expression, "nullable", True)
+        self.nullable = nullable
+
+    def expression(self, v):
+        expr = CONVERT[self.kind].format(v=v)
+        if self.kind is not None and self.nullable:
+            expr = f"({expr} if {v} is not None else None)"
+        return expr
+
+
+class RowEncoder:
+    """
+    Columns to select for a field subset and encode(row) -> dict.
+    """
+
+    def __init__(self, name, fields):
+        self.fields = fields
+        self.keys = tuple(f.key for f in fields)
+        self.columns = [f.column for f in fields]
+        self.encode = self._compile(name, fields)
+
+    @staticmethod
+    def _compile(name, fields):
+        names = [f"c{i}" for i in range(len(fields))]
+        unpack = f"    {', '.join(names)}, = row\n" if fields else ""
+        items = ", ".join(f"{f.key!r}: {f.expression(v)}" for f, v in zip(fields, names))
+        source = f"def encode_{name}(row):\n{unpack}    return {{{items}}}\n"
+        namespace = {}
+        exec(compile(source, f"<row encoder {name}>", "exec"), namespace)
+        return namespace[f"encode_{name}"]
+
+    def encode_all(self, rows):
+        return list(map(self.encode, rows))
+
+
+class ModelEncoder:
+    """
+    Every field a list endpoint can return for one model, in to_json()
+    order. for_fields() picks the ?fields= subset.
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = {f.key: f for f in fields}
+        self.all = RowEncoder(name, list(fields))
+        self._subset = lru_cache(maxsize=64)(self._build)
+
+    def _build(self, keys):
+        return RowEncoder(self.name, [f for k, f in self.fields.items() if k in keys])
+
+    def for_fields(self, value):
+        """
+        (RowEncoder, error) for a ?fields=a,b,c value; None/empty means all fields.
+        """
+        if not value:
+            return self.all, None
+        keys = frozenset(k.strip() for k in value.split(",") if k.strip())
+        unknown = sorted(keys - self.fields.keys())
+        if unknown:
+            return None, f"Unknown field(s) in fields: {', '.join(unknown)} (valid: {', '.join(self.fields)})"
+        if not keys:
+            return self.all, None
+        return self._subset(keys), None
+
+
+# Active postings per food bank, joined in when items_needed is selected
+_active_counts = (
+    select(DonationPosting.food_bank_id, func.count(DonationPosting.id).label("n"))
+    .where(DonationPosting.is_active.is_(True))
+    .group_by(DonationPosting.food_bank_id)
+    .subquery("active_posting_counts")
+)
+
+
+POSTINGS = ModelEncoder("posting", [
+    Field("id", DonationPosting.id, "uuid"),
+    Field("food_bank_id", DonationPosting.food_bank_id, "uuid"),
+    Field("food_name", DonationPosting.food_name),
+    Field("urgency", DonationPosting.urgency),
+    Field("qty_needed", DonationPosting.qty_needed, "float"),
+    Field("from_date", DonationPosting.from_date, "iso"),
+    Field("to_date", DonationPosting.to_date, "iso"),
+    Field("from_time", DonationPosting.from_time, "iso"),
+    Field("to_time", DonationPosting.to_time, "iso"),
+    Field("created_at", DonationPosting.created_at, "iso"),
+    Field("updated_at", DonationPosting.updated_at, "iso"),
+])
+
+MEETUPS = ModelEncoder("meetup", [
+    Field("id", Meetup.id, "uuid"),
+    Field("posting_id", Meetup.posting_id, "uuid"),
+    Field("donor_id", Meetup.donor_id, "uuid"),
+    Field("food_bank_id", Meetup.food_bank_id, "uuid"),
+    Field("donation_item", Meetup.donation_item),
+    Field("quantity", Meetup.quantity, "float"),
+    Field("scheduled_date", Meetup.scheduled_date, "iso"),
+    Field("scheduled_time", Meetup.scheduled_time, "iso"),
+    Field("completed", Meetup.completed),
+    Field("completion_status", Meetup.completion_status),
+    Field("completed_at", Meetup.completed_at, "iso"),
+    Field("created_at", Meetup.created_at, "iso"),
+    Field("updated_at", Meetup.updated_at, "iso"),
+])
+
+FOOD_BANKS = ModelEncoder("food_bank", [
+    Field("id", FoodBank.id, "uuid"),
+    Field("name", FoodBank.name),
+    Field("phone", FoodBank.phone),
+    Field("address", FoodBank.address),
+    Field("city", FoodBank.city),
+    Field("state", FoodBank.state),
+    Field("postal_code", FoodBank.postal_code),
+    Field("created_at", FoodBank.created_at, "iso"),
+    Field("updated_at", FoodBank.updated_at, "iso"),
+    Field("items_needed", func.coalesce(_active_counts.c.n, 0).label("items_needed"), nullable=False),
+])
+
+TIME_CHANGE_REQUESTS = ModelEncoder("time_change_request", [
+    Field("id", MeetupTimeChangeRequest.id, "uuid"),
+    Field("meetup_id", MeetupTimeChangeRequest.meetup_id, "uuid"),
+    Field("requested_by", MeetupTimeChangeRequest.requested_by),
+    Field("requested_to", MeetupTimeChangeRequest.requested_to),
+    Field("new_date", MeetupTimeChangeRequest.new_date, "iso"),
+    Field("new_time", MeetupTimeChangeRequest.new_time, "iso"),
+    Field("reason", MeetupTimeChangeRequest.reason),
+    Field("status", MeetupTimeChangeRequest.status),
+    Field("created_at", MeetupTimeChangeRequest.created_at, "iso"),
+    Field("updated_at", MeetupTimeChangeRequest.updated_at, "iso"),
+    Field("responded_at", MeetupTimeChangeRequest.responded_at, "iso"),
+])
+
+# Flat rows for GET /api/food_banks/<id>/meetups/export (CSV columns, NDJSON keys)
+MEETUP_EXPORT = RowEncoder("meetup_export", [
+    Field("meetup_id", Meetup.id, "uuid"),
+    Field("scheduled_date", Meetup.scheduled_date, "iso"),
+    Field("scheduled_time", Meetup.scheduled_time, "iso"),
+    Field("donation_item", Meetup.donation_item),
+    Field("quantity", Meetup.quantity, "float"),
+    Field("completed", Meetup.completed),
+    Field("completion_status", Meetup.completion_status),
+    Field("completed_at", Meetup.completed_at, "iso"),
+    Field("created_at", Meetup.created_at, "iso"),
+    Field("posting_id", Meetup.posting_id, "uuid"),
+    Field("posting_food_name", DonationPosting.food_name),
+    Field("donor_id", Meetup.donor_id, "uuid"),
+    Field("donor_first_name", Donor.first_name),
+    Field("donor_last_name", Donor.last_name),
+])
+
+
+def food_bank_source(encoder):
+    """
+    FROM clause for a FOOD_BANKS encoder: the count subquery is joined
+    only when items_needed was asked for.
+    """
+    if "items_needed" in encoder.keys:
+        return FoodBank.__table__.outerjoin(_active_counts, _active_counts.c.food_bank_id == FoodBank.id)
+    return FoodBank.__table__
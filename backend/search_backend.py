@@ -0,0 +1,430 @@
+# search_backend.py
+import heapq
+from uuid import UUID
+
+from sqlalchemy import text
+
+from models import DonationPosting
+
+
+def clean_prefix(s):
+    """
+    Same normalization the Trie applies to words and prefixes.
+    """
+    return "".join(ch.lower() for ch in s if ch.isalpha() or ch.isspace())
+
+
+def search_terms(prefix):
+    """
+    The words of a search prefix. Every backend (and the facet index)
+    matches postings with a food_name word starting with each of them,
+    and suggests completions only for a single word.
+    """
+    return clean_prefix(prefix or "").split()
+
+
+def _words(food_name):
+    out = []
+    for w in (food_name or "").split():
+        c = clean_prefix(w)
+        if c:
+            out.append(c)
+    return out
+
+
+def _prefix_upper_bound(p):
+    """
+    Smallest string greater than every string starting with p.
+    """
+    return p[:-1] + chr(ord(p[-1]) + 1)
+
+
+class SearchBackend:
+    """
+    What autocomplete_items and search_postings need from a search index.
+    Implementations keep `status` (a warmup.IndexStatus) up to date and
+    fall back to plain LIKE queries until it is ready.
+    """
+
+    name = None
+
+    def __init__(self, db, status):
+        self.db = db
+        self.status = status
+
+    @property
+    def ready(self):
+        return self.status.ready
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def index_posting(self, posting_id, food_name):
+        raise NotImplementedError
+
+    def remove_posting(self, posting_id, food_name):
+        raise NotImplementedError
+
+    def suggest(self, prefix, limit=10):
+        """
+        Distinct indexed words starting with prefix, alphabetical; none
+        for a prefix of several words.
+        """
+        raise NotImplementedError
+
+    def search_ids(self, prefix, limit=20):
+        """
+        Ids (as strings, ascending) of postings with a word starting with
+        each word of prefix (see search_terms).
+        """
+        raise NotImplementedError
+
+    # --- Degraded path while the index is not ready ---
+
+    def _prefix_filter(self, *terms):
+        return self.db.and_(
+            DonationPosting.is_active.is_(True),
+            *[self.db.or_(
+                DonationPosting.food_name.ilike(f"{p}%"),
+                DonationPosting.food_name.ilike(f"% {p}%"),
+            ) for p in terms],
+        )
+
+    def fallback_suggest(self, prefix, limit=10):
+        terms = search_terms(prefix)
+        if len(terms) != 1:
+            return []
+        p = terms[0]
+        names = (
+            self.db.session.query(DonationPosting.food_name)
+            .filter(self._prefix_filter(p))
+            .distinct()
+            .limit(200)
+            .all()
+        )
+        words = set()
+        for (name,) in names:
+            for w in _words(name):
+                if w.startswith(p):
+                    words.add(w)
+        return sorted(words)[:limit]
+
+    def fallback_search_ids(self, prefix, limit=20):
+        terms = search_terms(prefix)
+        if not terms:
+            return []
+        rows = (
+            self.db.session.query(DonationPosting.id)
+            .filter(self._prefix_filter(*terms))
+            .order_by(DonationPosting.id)
+            .limit(limit)
+            .all()
+        )
+        return [str(r[0]) for r in rows]
+
+
+class TrieSearchBackend(SearchBackend):
+    """
+    The in-process Trie: fastest lookups, but every process holds and
+    rebuilds its own copy.
+    """
+
+    name = "trie"
+
+    def __init__(self, db, status, trie, lock):
+        super().__init__(db, status)
+        self.trie = trie
+        self.lock = lock
+
+    def _insert(self, posting_id, food_name):
+        if not food_name:
+            return
+        for w in food_name.split():
+            self.trie.insert(w, item_id=str(posting_id))
+
+    def index_posting(self, posting_id, food_name):
+        with self.lock:
+            self._insert(posting_id, food_name)
+
+    def remove_posting(self, posting_id, food_name):
+        with self.lock:
+            for w in (food_name or "").split():
+                self.trie.remove(w, item_id=str(posting_id))
+
+    def rebuild(self, batch_size=2000):
+        """
+        Rebuild from all active DonationPosting rows in batches, so a background
+        build reports progress and does not hold the lock for the whole scan.
+        """
+        db = self.db
+        total = (
+            db.session.query(db.func.count(DonationPosting.id))
+            .filter(DonationPosting.is_active.is_(True))
+            .scalar()
+        )
+        self.status.start(total)
+
+        with self.lock:
+            self.trie.clear()
+
+        rows = (
+            db.session.query(DonationPosting.id, DonationPosting.food_name)
+            .filter(DonationPosting.is_active.is_(True))
+            .execution_options(yield_per=batch_size)
+        )
+        batch = []
+        indexed = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                with self.lock:
+                    for posting_id, food_name in batch:
+                        self._insert(posting_id, food_name)
+                self.status.advance(len(batch))
+                indexed += len(batch)
+                batch = []
+        with self.lock:
+            for posting_id, food_name in batch:
+                self._insert(posting_id, food_name)
+            indexed_words = self.trie.words()
+        self.status.advance(len(batch))
+        indexed += len(batch)
+        self.status.finish()
+
+        print(f"Trie Index Built Successfully")
+        print(f"Total postings indexed: {indexed}")
+        print(f"Total unique words indexed: {len(indexed_words)}")
+        print(f"\nIndexed words: {sorted(indexed_words)}")
+
+    def suggest(self, prefix, limit=10):
+        if not self.ready:
+            return self.fallback_suggest(prefix, limit)
+        terms = search_terms(prefix)
+        if len(terms) != 1:
+            return []
+        with self.lock:
+            return self.trie.words_with_prefix(terms[0], limit=limit)
+
+    def search_ids(self, prefix, limit=20):
+        if not self.ready:
+            return self.fallback_search_ids(prefix, limit)
+        terms = search_terms(prefix)
+        if not terms:
+            return []
+        with self.lock:
+            matched = self.trie.prefix_id_set(terms[0])
+            for term in terms[1:]:
+                if not matched:
+                    break
+                matched &= self.trie.prefix_id_set(term)
+        return heapq.nsmallest(limit, matched)
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Index tables maintained inside the database, shared by every worker:
+    SQLite FTS5 (with an fts5vocab view for word suggestions) locally,
+    a word table with a text_pattern_ops index on Postgres.
+    """
+
+    name = "database"
+
+    # donation_postings has no INTEGER PRIMARY KEY, so its rowids can change
+    # on VACUUM; FTS rows are keyed by posting_search_ids.key instead
+    SQLITE_SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS posting_search_ids ("
+        "key INTEGER PRIMARY KEY, posting_id BLOB NOT NULL UNIQUE)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posting_search_fts USING fts5("
+        "food_name, tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posting_search_vocab "
+        "USING fts5vocab(posting_search_fts, 'row')",
+    ]
+    POSTGRES_SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS posting_search_words ("
+        "word TEXT NOT NULL, posting_id UUID NOT NULL, PRIMARY KEY (word, posting_id))",
+        "CREATE INDEX IF NOT EXISTS ix_posting_search_words_prefix "
+        "ON posting_search_words (word text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_posting_search_words_posting "
+        "ON posting_search_words (posting_id)",
+        # Earlier versions added a pg_trgm index; word LIKE 'p%' never used it
+        "DROP INDEX IF EXISTS ix_posting_search_words_trgm",
+    ]
+
+    def __init__(self, db, status):
+        super().__init__(db, status)
+        self.dialect = None
+        self.schema_ready = False
+
+    def _exec(self, sql, params=None):
+        return self.db.session.execute(text(sql), params or {})
+
+    def ensure_schema(self):
+        self.dialect = self.db.engine.dialect.name
+        if self.dialect == "sqlite":
+            for sql in self.SQLITE_SCHEMA:
+                self._exec(sql)
+        elif self.dialect == "postgresql":
+            for sql in self.POSTGRES_SCHEMA:
+                self._exec(sql)
+        else:
+            raise RuntimeError(f"database search backend does not support {self.dialect}")
+        self.db.session.commit()
+        self.schema_ready = True
+
+    def _in_sync(self):
+        if self.dialect == "sqlite":
+            indexed = self._exec(
+                "SELECT count(*) FROM posting_search_ids k "
+                "JOIN donation_postings p ON p.id = k.posting_id WHERE p.is_active"
+            ).scalar()
+            total = self._exec("SELECT count(*) FROM donation_postings WHERE is_active").scalar()
+            if indexed == total:
+                # Every key mapped to an active posting and one FTS row per key
+                keys = self._exec("SELECT count(*) FROM posting_search_ids").scalar()
+                rows = self._exec("SELECT count(*) FROM posting_search_fts").scalar()
+                indexed = indexed if keys == rows == total else -1
+        else:
+            # Compare the id sets: stale and missing rows could cancel out in a count
+            indexable = "SELECT id FROM donation_postings WHERE is_active AND food_name ~ '[[:alpha:]]'"
+            differ = self._exec(
+                f"SELECT EXISTS (SELECT posting_id FROM posting_search_words EXCEPT {indexable}) "
+                f"OR EXISTS ({indexable} EXCEPT SELECT posting_id FROM posting_search_words)"
+            ).scalar()
+            total = self._exec(f"SELECT count(*) FROM ({indexable}) s").scalar()
+            return not differ, total
+        return indexed == total, total
+
+    def rebuild(self):
+        """
+        The tables persist across restarts, so only resync when they
+        disagree with the active donation_postings.
+        """
+        self.ensure_schema()
+        in_sync, total = self._in_sync()
+        self.status.start(total)
+        if not in_sync:
+            if self.dialect == "sqlite":
+                self._exec("DELETE FROM posting_search_fts")
+                self._exec("DELETE FROM posting_search_ids")
+                self._exec(
+                    "INSERT INTO posting_search_ids (posting_id) "
+                    "SELECT id FROM donation_postings WHERE is_active"
+                )
+                self._exec(
+                    "INSERT INTO posting_search_fts (rowid, food_name) "
+                    "SELECT k.key, p.food_name FROM posting_search_ids k "
+                    "JOIN donation_postings p ON p.id = k.posting_id"
+                )
+            else:
+                self._exec("TRUNCATE posting_search_words")
+                self._exec(
+                    "INSERT INTO posting_search_words (word, posting_id) "
+                    "SELECT DISTINCT w, id FROM ("
+                    "  SELECT regexp_replace(lower(t), '[^[:alpha:]]', '', 'g') AS w, p.id"
+                    "  FROM donation_postings p, regexp_split_to_table(p.food_name, '\\s+') AS t"
+                    "  WHERE p.is_active"
+                    ") s WHERE w <> ''"
+                )
+            self.db.session.commit()
+        self.status.advance(total)
+        self.status.finish()
+        print(f"Database search index ready ({self.dialect}, {total} postings, "
+              f"{'rebuilt' if not in_sync else 'already in sync'})")
+
+    def index_posting(self, posting_id, food_name):
+        if not self.schema_ready:
+            # rebuild() has not created the tables yet; its bulk copy will include this row
+            return
+        if self.dialect == "sqlite":
+            params = {"id": UUID(str(posting_id)).bytes, "food_name": food_name}
+            added = self._exec(
+                "INSERT OR IGNORE INTO posting_search_ids (posting_id) VALUES (:id)", params,
+            ).rowcount
+            if added:
+                self._exec(
+                    "INSERT INTO posting_search_fts (rowid, food_name) "
+                    "SELECT key, :food_name FROM posting_search_ids WHERE posting_id = :id",
+                    params,
+                )
+        else:
+            for w in set(_words(food_name)):
+                self._exec(
+                    "INSERT INTO posting_search_words (word, posting_id) VALUES (:w, :id) "
+                    "ON CONFLICT DO NOTHING",
+                    {"w": w, "id": str(posting_id)},
+                )
+        self.db.session.commit()
+
+    def remove_posting(self, posting_id, food_name):
+        if not self.schema_ready:
+            return
+        if self.dialect == "sqlite":
+            params = {"id": UUID(str(posting_id)).bytes}
+            self._exec(
+                "DELETE FROM posting_search_fts WHERE rowid = "
+                "(SELECT key FROM posting_search_ids WHERE posting_id = :id)",
+                params,
+            )
+            self._exec("DELETE FROM posting_search_ids WHERE posting_id = :id", params)
+        else:
+            self._exec("DELETE FROM posting_search_words WHERE posting_id = :id", {"id": str(posting_id)})
+        self.db.session.commit()
+
+    def suggest(self, prefix, limit=10):
+        if not self.ready:
+            return self.fallback_suggest(prefix, limit)
+        terms = search_terms(prefix)
+        if len(terms) != 1:
+            return []
+        p = terms[0]
+        if self.dialect == "sqlite":
+            rows = self._exec(
+                "SELECT term FROM posting_search_vocab WHERE term >= :lo AND term < :hi "
+                "ORDER BY term LIMIT :limit",
+                {"lo": p, "hi": _prefix_upper_bound(p), "limit": limit * 2},
+            ).all()
+            # unicode61 keeps digits; the Trie only indexes letters
+            words = [t for (t,) in rows if t.isalpha()]
+            return words[:limit]
+        rows = self._exec(
+            "SELECT DISTINCT word FROM posting_search_words WHERE word LIKE :p "
+            "ORDER BY word LIMIT :limit",
+            {"p": p + "%", "limit": limit},
+        ).all()
+        return [w for (w,) in rows]
+
+    def search_ids(self, prefix, limit=20):
+        if not self.ready:
+            return self.fallback_search_ids(prefix, limit)
+        terms = search_terms(prefix)
+        if not terms:
+            return []
+        if self.dialect == "sqlite":
+            # Prefix terms ANDed: canned* be* matches "Canned Beans" and "Beans, canned"
+            rows = self._exec(
+                "SELECT k.posting_id FROM posting_search_fts f "
+                "JOIN posting_search_ids k ON k.key = f.rowid "
+                "WHERE posting_search_fts MATCH :q ORDER BY k.posting_id LIMIT :limit",
+                {"q": " ".join(f'"{t}"*' for t in terms), "limit": limit},
+            ).all()
+            return [str(UUID(bytes=bytes(r[0]))) for r in rows]
+        params = {f"p{i}": t + "%" for i, t in enumerate(terms)}
+        params["limit"] = limit
+        rows = self._exec(
+            " INTERSECT ".join(f"SELECT posting_id FROM posting_search_words WHERE word LIKE :p{i}"
+                               for i in range(len(terms)))
+            + " ORDER BY posting_id LIMIT :limit",
+            params,
+        ).all()
+        return [str(r[0]) for r in rows]
+
+
+def create_backend(name, db, status, trie=None, lock=None):
+    """
+    Build the backend selected by SEARCH_BACKEND in config.py.
+    """
+    if name == "trie":
+        return TrieSearchBackend(db, status, trie, lock)
+    if name == "database":
+        return DatabaseSearchBackend(db, status)
+    raise ValueError(f"Unknown SEARCH_BACKEND {name!r} (expected 'trie' or 'database')")
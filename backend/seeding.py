@@ -0,0 +1,324 @@
+# seeding.py
+import csv
+import json
+import re
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import Donor, FoodBank, Profile
+
+
+# Bulk creation of profiles with their donor / food bank rows from a
+# roster, with the same rules as POST /api/profiles. Records are read as
+# a stream and handled batch_size at a time: one query finds which ids
+# already exist, then each table gets one multi-row INSERT. A record
+# that fails validation is reported and the rest of its batch goes on.
+
+ROLES = ("Donor", "Food Bank")
+REQUIRED = {
+    "Donor": ("first_name", "last_name", "phone", "address", "city", "state", "postalCode"),
+    "Food Bank": ("name", "phone", "address", "city", "state", "postalCode"),
+}
+FORMATS = ("csv", "ndjson", "roster")
+MAX_REPORTED_ERRORS = 1000
+
+# Roster keys -> the POST /api/profiles field names
+KEY_ALIASES = {
+    "uid": "user_id",
+    "id": "user_id",
+    "postal_code": "postalCode",
+    "postalcode": "postalCode",
+    "zip": "postalCode",
+}
+
+
+def _field_name(key):
+    key = key.strip()
+    name = re.sub(r"\s+", "_", key.lower())
+    return KEY_ALIASES.get(name, key if key == "postalCode" else name)
+
+
+def format_for(filename=None, content_type=None):
+    """
+    Roster format from a file name or Content-Type; plain text rosters
+    (like "CS351 Users File for Seeding.txt") are the default.
+    """
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in ctype:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in ctype or "jsonl" in ctype:
+        return "ndjson"
+    return "roster"
+
+
+# --- Parsing (each yields (line number, record dict) lazily) ---
+
+def parse_csv(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {_field_name(k): (v or "").strip() for k, v in row.items() if k}
+
+
+def parse_ndjson(lines):
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, {"_error": f"Invalid JSON: {e}"}
+            continue
+        if not isinstance(record, dict):
+            yield line_no, {"_error": "Each line must be a JSON object"}
+            continue
+        yield line_no, {_field_name(k): v for k, v in record.items()}
+
+
+_SECTION = re.compile(r"^[A-Z][A-Z ]+$")
+_BLOCK = re.compile(r"^(?P<label>[^:]+?)\s*(?:\((?P<slug>[^)]*)\))?\s*:$")
+_FIELD = re.compile(r"^(?P<key>[A-Za-z_ ]+):\s*(?P<value>.*)$")
+
+
+def _role_from(text):
+    text = text.lower()
+    if "food bank" in text:
+        return "Food Bank"
+    if "donor" in text or "user" in text:
+        return "Donor"
+    return None
+
+
+def _roster_record(label, slug, section_role):
+    """
+    A new block: role from its label ("donor 3", "food bank 1 (pilsen)")
+    or else from the section heading, and names from the label so seed
+    accounts get a readable name without listing one.
+    """
+    role = _role_from(label) or section_role
+    record = {"role": role} if role else {}
+    if role == "Food Bank":
+        record["name"] = (slug.replace("_", " ") if slug else label).title()
+    elif role == "Donor":
+        first, _, last = label.title().partition(" ")
+        record["first_name"] = first
+        record["last_name"] = last or first
+    return record
+
+
+def parse_roster(lines):
+    """
+    Blocks of "key: value" lines, each started by a "label:" line and
+    grouped under UPPER CASE section headings, e.g.
+
+        REAL FOOD BANKS
+
+        food bank 2 (pilsen_food_pantry):
+        UID: 0aeed71f-27c4-4dd1-a4d7-0071f4a87393
+        email: pilsen_food_pantry@example.com
+    """
+    section_role = None
+    record = None
+    start = 0
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if _SECTION.match(line):
+            if record:
+                yield start, record
+            record = None
+            section_role = _role_from(line)
+            continue
+        block = _BLOCK.match(line)
+        if block:
+            if record:
+                yield start, record
+            record = _roster_record(block.group("label").strip(), block.group("slug"), section_role)
+            start = line_no
+            continue
+        field = _FIELD.match(line)
+        if field and record is not None:
+            record[_field_name(field.group("key"))] = field.group("value").strip()
+        # Anything else (the file's title line) is ignored
+    if record:
+        yield start, record
+
+
+PARSERS = {"csv": parse_csv, "ndjson": parse_ndjson, "roster": parse_roster}
+
+
+# --- Validation and import ---
+
+def _validate(record, defaults):
+    """
+    (row, error) where row has a UUID user_id and every field the role needs.
+    """
+    if "_error" in record:
+        return None, record["_error"]
+    row = dict(defaults)
+    row.update({k: v for k, v in record.items() if v not in (None, "")})
+    if not row.get("user_id") or not row.get("email") or not row.get("role"):
+        return None, "user_id, email, and role are required"
+    try:
+        row["user_id"] = UUID(str(row["user_id"]))
+    except (ValueError, TypeError):
+        return None, "Invalid user_id format"
+    if row["role"] not in ROLES:
+        return None, "Invalid role. Must be 'Donor' or 'Food Bank'"
+    missing = [name for name in REQUIRED[row["role"]] if not row.get(name)]
+    if missing:
+        return None, f"{', '.join(missing)} required for {row['role']}"
+    return row, None
+
+
+def _profile_values(row, now):
+    return {"id": row["user_id"], "email": row["email"], "role": row["role"],
+            "created_at": now, "updated_at": now}
+
+
+def _role_values(row, now):
+    values = {
+        "id": row["user_id"],
+        "phone": row["phone"],
+        "address": row["address"],
+        "city": row["city"],
+        "state": row["state"],
+        "postal_code": row["postalCode"],
+        "created_at": now,
+        "updated_at": now,
+    }
+    if row["role"] == "Donor":
+        values["first_name"] = row["first_name"]
+        values["last_name"] = row["last_name"]
+    else:
+        values["name"] = row["name"]
+    return values
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.profiles = 0
+        self.donors = 0
+        self.food_banks = 0
+        self.skipped = 0
+        self.errors = []
+        self.error_count = 0
+        self.new_food_banks = []  # (id, postal_code, name, city), for the caller's post-commit events
+
+    def error(self, line_no, record, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_no, "user_id": str(record.get("user_id") or "") or None,
+                                "error": message})
+
+    def to_json(self):
+        return {
+            "rows": self.rows,
+            "created": {"profiles": self.profiles, "donors": self.donors, "food_banks": self.food_banks},
+            "skipped": self.skipped,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def _existing(session, ids):
+    """
+    {id: (has donor row, has food bank row)} for the ids that already
+    have a profile, in one query.
+    """
+    rows = session.execute(
+        select(Profile.id, Donor.id.isnot(None), FoodBank.id.isnot(None))
+        .outerjoin(Donor, Donor.id == Profile.id)
+        .outerjoin(FoodBank, FoodBank.id == Profile.id)
+        .where(Profile.id.in_(ids))
+    ).all()
+    return {profile_id: (bool(donor), bool(food_bank)) for profile_id, donor, food_bank in rows}
+
+
+def _insert(session, profiles, donors, food_banks):
+    if profiles:
+        session.execute(insert(Profile), profiles)
+    if donors:
+        session.execute(insert(Donor), donors)
+    if food_banks:
+        session.execute(insert(FoodBank), food_banks)
+
+
+def _import_batch(session, batch, report, now):
+    existing = _existing(session, [row["user_id"] for _, row in batch])
+    pending = []  # (line_no, row, profile values or None, role values)
+    for line_no, row in batch:
+        found = existing.get(row["user_id"])
+        if found is not None and found[0 if row["role"] == "Donor" else 1]:
+            report.skipped += 1  # as POST /api/profiles: "... profile already exists"
+            continue
+        profile = _profile_values(row, now) if found is None else None
+        pending.append((line_no, row, profile, _role_values(row, now)))
+    if not pending:
+        return
+
+    def split(items):
+        return ([p for _, _, p, _ in items if p is not None],
+                [v for _, row, _, v in items if row["role"] == "Donor"],
+                [v for _, row, _, v in items if row["role"] == "Food Bank"])
+
+    try:
+        _insert(session, *split(pending))
+        session.commit()
+        done = pending
+    except SQLAlchemyError:
+        # Usually an id created meanwhile; retry one by one to find which
+        session.rollback()
+        done = []
+        for item in pending:
+            try:
+                with session.begin_nested():
+                    _insert(session, *split([item]))
+                done.append(item)
+            except SQLAlchemyError as e:
+                report.error(item[0], item[1], f"Database error: {getattr(e, 'orig', None) or e}")
+        session.commit()
+
+    for _, row, profile, values in done:
+        if profile is not None:
+            report.profiles += 1
+        if row["role"] == "Donor":
+            report.donors += 1
+        else:
+            report.food_banks += 1
+            report.new_food_banks.append((str(row["user_id"]), row["postalCode"], row["name"], row["city"]))
+
+
+def import_users(session, records, batch_size=500, defaults=None, now=None):
+    """
+    Import (line number, record) pairs from one of the parsers; returns an
+    ImportReport. Commits once per batch.
+    """
+    defaults = {_field_name(k): v for k, v in (defaults or {}).items()}
+    now = now or datetime.now()
+    report = ImportReport()
+    seen = set()
+    batch = []
+    for line_no, record in records:
+        report.rows += 1
+        row, error = _validate(record, defaults)
+        if error is None and row["user_id"] in seen:
+            error = "Duplicate user_id in this file"
+        if error:
+            report.error(line_no, record, error)
+            continue
+        seen.add(row["user_id"])
+        batch.append((line_no, row))
+        if len(batch) >= batch_size:
+            _import_batch(session, batch, report, now)
+            batch = []
+    if batch:
+        _import_batch(session, batch, report, now)
+    return report
@@ -0,0 +1,78 @@
+# slot_index.py
+import bisect
+
+
+def minute_of_day(t):
+    return t.hour * 60 + t.minute
+
+
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class SlotIndex:
+    """
+    Booked pickup times per (food bank, day), kept sorted so the bookings
+    inside any [start, end) window are counted with two bisects. Times are
+    minutes since midnight, so a bank can change its slot length without a
+    rebuild.
+    Not thread-safe: callers hold a lock (see app.py).
+    """
+
+    def __init__(self):
+        self.days = {}      # (food_bank_id, date) -> sorted [(minute, meetup_id)]
+        self.booking = {}   # meetup_id -> (food_bank_id, date, minute)
+
+    def __len__(self):
+        return len(self.booking)
+
+    def clear(self):
+        self.days.clear()
+        self.booking.clear()
+
+    def add(self, meetup_id, food_bank_id, day, minute):
+        """
+        Book (or move) a meetup.
+        """
+        self.remove(meetup_id)
+        bisect.insort(self.days.setdefault((food_bank_id, day), []), (minute, meetup_id))
+        self.booking[meetup_id] = (food_bank_id, day, minute)
+
+    def remove(self, meetup_id):
+        booked = self.booking.pop(meetup_id, None)
+        if booked is None:
+            return None
+        food_bank_id, day, minute = booked
+        times = self.days[(food_bank_id, day)]
+        i = bisect.bisect_left(times, (minute, meetup_id))
+        if i < len(times) and times[i] == (minute, meetup_id):
+            del times[i]
+        if not times:
+            del self.days[(food_bank_id, day)]
+        return booked
+
+    def count(self, food_bank_id, day, start, end, exclude=None):
+        """
+        Meetups booked at minutes in [start, end), not counting exclude.
+        """
+        times = self.days.get((food_bank_id, day))
+        if not times:
+            return 0
+        lo = bisect.bisect_left(times, (start,))
+        hi = bisect.bisect_left(times, (end,))
+        n = hi - lo
+        if exclude is not None:
+            booked = self.booking.get(exclude)
+            if booked is not None and booked[:2] == (food_bank_id, day) and start <= booked[2] < end:
+                n -= 1
+        return n
+
+    def slot_counts(self, food_bank_id, day, slot_minutes):
+        """
+        {slot start minute: bookings} for every occupied slot of the day.
+        """
+        counts = {}
+        for minute, _ in self.days.get((food_bank_id, day), ()):
+            start = minute - minute % slot_minutes
+            counts[start] = counts.get(start, 0) + 1
+        return counts
@@ -0,0 +1,254 @@
+# slow_query.py
+import re
+import threading
+import time
+import uuid
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+
+from flask import has_request_context, jsonify, request
+from sqlalchemy import event
+
+from admin import admin_only
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\([^)]*\)s|%s|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """
+    Normalize a statement so queries that differ only in literals or
+    IN-list length share one entry.
+    """
+    s = _STRING_LITERAL.sub("?", statement)
+    s = _NUMBER_LITERAL.sub("?", s)
+    s = _IN_LIST.sub("IN (?...)", s)
+    return _WHITESPACE.sub(" ", s).strip()
+
+
+def _redact_value(value):
+    if value is None or isinstance(value, (bool, int, float, Decimal)):
+        return value
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        raw = bytes(value)
+        # GUID columns are 16-byte blobs on SQLite; ids are safe to show
+        return str(uuid.UUID(bytes=raw)) if len(raw) == 16 else f"<{len(raw)} bytes>"
+    if isinstance(value, str):
+        return f"<str len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters, limit=20):
+    """
+    Keep ids, numbers and dates (useful to reproduce a plan), hide free text.
+    """
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        items = list(parameters.items())[:limit]
+        return {k: _redact_value(v) for k, v in items}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(v) for v in list(parameters)[:limit]]
+    return _redact_value(parameters)
+
+
+class SlowQueryLog:
+    """
+    Aggregates statements slower than the threshold by fingerprint and
+    keeps the most expensive ones (by total time) for the admin endpoint.
+    """
+
+    def __init__(self, threshold_ms=100.0, explain=True, top_n=20, max_fingerprints=500, logger=None):
+        self.threshold = threshold_ms / 1000.0
+        self.explain = explain
+        self.top_n = top_n
+        self.max_fingerprints = max_fingerprints
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def record(self, statement, parameters, seconds, route, plan=None):
+        fp = fingerprint(statement)
+        params = redact_parameters(parameters)
+        with self.lock:
+            entry = self.entries.get(fp)
+            if entry is None:
+                if len(self.entries) >= self.max_fingerprints:
+                    cheapest = min(self.entries, key=lambda k: self.entries[k]["total_ms"])
+                    del self.entries[cheapest]
+                entry = self.entries[fp] = {
+                    "fingerprint": fp,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "routes": {},
+                    "plan": None,
+                }
+            ms = seconds * 1000.0
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            if ms >= entry["max_ms"]:
+                entry["max_ms"] = ms
+                entry["slowest_parameters"] = params
+                entry["slowest_route"] = route
+            entry["last_seen"] = datetime.utcnow().isoformat()
+            if route:
+                entry["routes"][route] = entry["routes"].get(route, 0) + 1
+            if plan is not None:
+                entry["plan"] = plan
+
+        if self.logger is not None:
+            self.logger.warning(
+                "slow query %.1f ms route=%s params=%s sql=%s", ms, route, params, fp
+            )
+
+    def needs_plan(self, statement):
+        """
+        EXPLAIN each fingerprint once; re-running it on every slow hit would add load.
+        """
+        fp = fingerprint(statement)
+        with self.lock:
+            entry = self.entries.get(fp)
+            return entry is None or entry["plan"] is None
+
+    def top(self, limit=None):
+        limit = limit or self.top_n
+        with self.lock:
+            ranked = sorted(self.entries.values(), key=lambda e: e["total_ms"], reverse=True)[:limit]
+            out = []
+            for e in ranked:
+                row = dict(e)
+                row["routes"] = dict(e["routes"])
+                row["total_ms"] = round(e["total_ms"], 3)
+                row["max_ms"] = round(e["max_ms"], 3)
+                row["mean_ms"] = round(e["total_ms"] / e["count"], 3)
+                out.append(row)
+        return out
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+
+def explain_plan(conn, statement, parameters):
+    """
+    Run EXPLAIN for a SELECT on a fresh raw cursor of the same connection
+    (bypasses the engine events so it is not itself timed or logged).
+    On Postgres it runs inside a SAVEPOINT: a failed EXPLAIN would
+    otherwise abort the request's transaction.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return None
+
+    dbapi_connection = conn.connection.dbapi_connection
+    savepoint = dialect == "postgresql" and not getattr(dbapi_connection, "autocommit", False)
+    cursor = dbapi_connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(prefix + statement, parameters or ())
+            rows = cursor.fetchall()
+        except Exception as e:
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            return [f"EXPLAIN failed: {e!r}"]
+        finally:
+            if savepoint:
+                cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+    except Exception as e:
+        return [f"EXPLAIN failed: {e!r}"]
+    finally:
+        cursor.close()
+
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def _current_route():
+    if has_request_context() and request.url_rule is not None:
+        return f"{request.method} {request.url_rule.rule}"
+    return None
+
+
+def instrument_engine(engine, log):
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["_slow_query_start"] = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("_slow_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if elapsed < log.threshold:
+            return
+        plan = None
+        if (log.explain and not executemany
+                and statement.lstrip()[:6].upper() == "SELECT"
+                and log.needs_plan(statement)):
+            plan = explain_plan(conn, statement, parameters)
+        log.record(statement, None if executemany else parameters, elapsed, _current_route(), plan)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+
+
+def init_app(app, db):
+    """
+    Attach the slow-query hook when SLOW_QUERY_LOG is enabled in config.py
+    and register the admin endpoint. Returns the SlowQueryLog or None.
+    """
+    if not app.config.get("SLOW_QUERY_LOG"):
+        return None
+
+    log = SlowQueryLog(
+        threshold_ms=app.config["SLOW_QUERY_THRESHOLD_MS"],
+        explain=app.config["SLOW_QUERY_EXPLAIN"],
+        top_n=app.config["SLOW_QUERY_TOP_N"],
+        logger=app.logger,
+    )
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine, log)
+
+    @app.get("/api/_admin/slow_queries")
+    @admin_only
+    def list_slow_queries():
+        """
+        Most expensive slow statement fingerprints (by total time).
+        Optional query param: limit
+        """
+        try:
+            limit = int(request.args.get("limit") or log.top_n)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        return jsonify({
+            "threshold_ms": log.threshold * 1000.0,
+            "queries": log.top(limit),
+        })
+
+    @app.delete("/api/_admin/slow_queries")
+    @admin_only
+    def reset_slow_queries():
+        log.reset()
+        return jsonify({"message": "Slow query log cleared"})
+
+    app.extensions["slow_query_log"] = log
+    return log
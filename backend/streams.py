@@ -0,0 +1,278 @@
+# streams.py
+import json
+import threading
+from collections import deque
+from uuid import UUID, uuid4
+
+from flask import Response, jsonify, request
+
+
+class Subscriber:
+    """
+    One open /api/stream connection: a bounded queue of (seq, event, data).
+    A client that falls queue_size events behind is dropped and told to
+    resync instead of growing memory without limit.
+    A thread consumes it with wait(); an event loop sets waker (called
+    after every push, from the publishing thread) and uses take().
+    """
+
+    __slots__ = ("topics", "queue", "cond", "queue_size", "dropped", "closed", "waker")
+
+    def __init__(self, topics, queue_size):
+        self.topics = topics
+        self.queue = deque()
+        self.cond = threading.Condition(threading.Lock())
+        self.queue_size = queue_size
+        self.dropped = False
+        self.closed = False
+        self.waker = None
+
+    def push(self, item):
+        """
+        Queue an event; returns False once this subscriber has been dropped.
+        """
+        with self.cond:
+            if self.dropped:
+                return False
+            if len(self.queue) >= self.queue_size:
+                self.dropped = True
+                self.queue.clear()
+            else:
+                self.queue.append(item)
+            self.cond.notify()
+            pushed = not self.dropped
+        if self.waker is not None:
+            self.waker()
+        return pushed
+
+    def wait(self, timeout):
+        """
+        Block until events arrive (or timeout) and take them all.
+        """
+        with self.cond:
+            if not self.queue and not self.dropped:
+                self.cond.wait(timeout)
+            items = list(self.queue)
+            self.queue.clear()
+            return items
+
+    def take(self):
+        """
+        Take whatever is queued without blocking.
+        """
+        with self.cond:
+            items = list(self.queue)
+            self.queue.clear()
+            return items
+
+
+class StreamHub:
+    """
+    Fans committed changes out to subscribers by topic ("food_bank:<id>",
+    "donor:<id>") and keeps the last buffer_size events so a reconnecting
+    client (Last-Event-ID) gets what it missed.
+    """
+
+    def __init__(self, max_clients=5000, queue_size=256, buffer_size=1024):
+        self.max_clients = max_clients
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.by_topic = {}   # topic -> set(Subscriber)
+        self.clients = 0
+        self.epoch = uuid4().hex[:8]  # event ids from another process/restart can't be replayed
+        self.seq = 0
+        self.history = deque(maxlen=buffer_size)  # (seq, topics, event, data)
+        self.delivered = 0
+        self.dropped = 0
+
+    def event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def _parse_id(self, last_event_id):
+        try:
+            epoch, seq = last_event_id.rsplit("-", 1)
+            return int(seq) if epoch == self.epoch else None
+        except (AttributeError, ValueError):
+            return None
+
+    def subscribe(self, topics, last_event_id=None):
+        """
+        Returns (subscriber, replay) or (None, None) when full. replay is the
+        list of missed events, or None if they can no longer be replayed.
+        """
+        sub = Subscriber(frozenset(topics), self.queue_size)
+        with self.lock:
+            if self.clients >= self.max_clients:
+                return None, None
+            self.clients += 1
+            for topic in sub.topics:
+                self.by_topic.setdefault(topic, set()).add(sub)
+
+            replay = []
+            if last_event_id:
+                since = self._parse_id(last_event_id)
+                oldest = self.history[0][0] if self.history else self.seq + 1
+                if since is None or since + 1 < oldest:
+                    replay = None
+                else:
+                    replay = [(seq, event, data) for seq, topics, event, data in self.history
+                              if seq > since and topics & sub.topics]
+        return sub, replay
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            if sub.closed:
+                return
+            sub.closed = True
+            self.clients -= 1
+            for topic in sub.topics:
+                subs = self.by_topic.get(topic)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self.by_topic[topic]
+
+    def publish(self, topics, event, data):
+        topics = frozenset(topics)
+        with self.lock:
+            self.seq += 1
+            seq = self.seq
+            self.history.append((seq, topics, event, data))
+            targets = set()
+            for topic in topics:
+                targets.update(self.by_topic.get(topic, ()))
+        delivered = sum(1 for sub in targets if sub.push((seq, event, data)))
+        with self.lock:
+            self.delivered += delivered
+            self.dropped += len(targets) - delivered
+        return seq
+
+
+def format_event(event_id, event, data):
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+KEEP_ALIVE = ": keep-alive\n\n"  # comment line: keeps proxies from closing an idle connection
+
+
+def stream_topics(args):
+    """
+    (topics, error message or None) from the food_bank_id / donor_id params.
+    """
+    topics = []
+    for param, prefix in (("food_bank_id", "food_bank"), ("donor_id", "donor")):
+        value = args.get(param)
+        if value:
+            try:
+                topics.append(f"{prefix}:{UUID(value)}")
+            except ValueError:
+                return None, f"Invalid {param} format"
+    if not topics:
+        return None, "food_bank_id or donor_id is required"
+    return topics, None
+
+
+def opening(hub, replay):
+    """
+    First chunk of a stream: the retry hint, then the missed events or
+    a resync.
+    """
+    if replay is None:
+        return "retry: 3000\n\n" + format_event(hub.event_id(hub.seq), "resync", {})
+    return "retry: 3000\n\n" + "".join(format_event(hub.event_id(seq), event, data)
+                                       for seq, event, data in replay)
+
+
+def render(hub, items):
+    return "".join(format_event(hub.event_id(seq), event, data) for seq, event, data in items)
+
+
+# --- Bus events -> dashboard deltas ---
+
+def _subscribe_to_bus(bus, hub):
+    def both(event):
+        return (f"food_bank:{event['food_bank_id']}", f"donor:{event['donor_id']}")
+
+    @bus.handler("meetup_changed")
+    def meetup_delta(event, remote):
+        data = {k: event[k] for k in ("change", "meetup_id", "posting_id", "donor_id", "food_bank_id")}
+        for extra in ("scheduled_date", "scheduled_time", "completion_status"):
+            if extra in event:
+                data[extra] = event[extra]
+        hub.publish(both(event), "meetup", data)
+
+    def posting_delta(change):
+        def handler(event, remote):
+            data = {"change": change, "posting_id": event["posting_id"], "qty_needed": event["qty_needed"]}
+            if change == "created":
+                data["food_name"] = event["food_name"]
+            hub.publish((f"food_bank:{event['food_bank_id']}",), "posting", data)
+        return handler
+
+    bus.handler("posting_created")(posting_delta("created"))
+    bus.handler("posting_updated")(posting_delta("updated"))
+    bus.handler("posting_deleted")(posting_delta("deleted"))
+
+    @bus.handler("time_change_request")
+    def time_change_delta(event, remote):
+        data = {k: event[k] for k in ("change", "request_id", "meetup_id", "new_date", "new_time")}
+        hub.publish(both(event), "time_change_request", data)
+
+
+def init_app(app, bus, registry):
+    """
+    Register GET /api/stream and feed it from the event bus, so changes
+    committed on any worker reach the clients connected to this one.
+    """
+    hub = StreamHub(
+        max_clients=app.config["STREAM_MAX_CLIENTS"],
+        queue_size=app.config["STREAM_QUEUE_SIZE"],
+    )
+    heartbeat = app.config["STREAM_HEARTBEAT_SECONDS"]
+    _subscribe_to_bus(bus, hub)
+
+    registry.register_gauge("stream_clients", "Open /api/stream connections.",
+                            lambda: {(): hub.clients})
+    registry.register_counter(
+        "stream_events_total", "Stream events delivered to clients, and clients dropped for falling behind.",
+        lambda: {(("event", "delivered"),): hub.delivered, (("event", "dropped"),): hub.dropped},
+    )
+
+    @app.get("/api/stream")
+    def stream():
+        """
+        Server-Sent Events with dashboard deltas for a food bank and/or donor.
+        Query params: food_bank_id, donor_id (at least one)
+        Events: meetup, posting, time_change_request, resync (refetch everything)
+        """
+        topics, error = stream_topics(request.args)
+        if error:
+            return jsonify({"error": error}), 400
+
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        sub, replay = hub.subscribe(topics, last_event_id)
+        if sub is None:
+            return jsonify({"error": "Too many open streams, retry later"}), 503
+
+        def generate():
+            # Holds this server thread for as long as the client stays connected
+            yield opening(hub, replay)
+            while True:
+                items = sub.wait(heartbeat)
+                if sub.dropped:
+                    yield format_event(hub.event_id(hub.seq), "resync", {})
+                    return
+                # The keep-alive also surfaces dead clients on write
+                yield render(hub, items) if items else KEEP_ALIVE
+
+        response = Response(generate(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        # Runs when the server closes the response, even if the body never started
+        response.call_on_close(lambda: hub.unsubscribe(sub))
+        return response
+
+    app.extensions["stream_hub"] = hub
+    return hub
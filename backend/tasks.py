@@ -0,0 +1,222 @@
+# tasks.py
+import os
+import threading
+import time
+import traceback
+import zlib
+from collections import deque
+
+
+class _Shard:
+    __slots__ = ("items", "cond", "thread", "busy", "overflowed")
+
+    def __init__(self):
+        self.items = deque()   # (task name, payload, enqueued at)
+        self.cond = threading.Condition()
+        self.thread = None
+        self.busy = False
+        self.overflowed = False
+
+
+class TaskQueue:
+    """
+    In-process work queue for post-commit side effects (index and cache
+    maintenance) so they run on worker threads instead of in the request.
+
+    A task is fn(payloads) registered under a name with @task(name).
+    submit(name, key, payload) queues one payload; every key maps to one
+    shard with its own thread, so work for the same entity runs in the
+    order it was submitted. A worker takes the run of consecutive items
+    with the same task name at the head of its shard (up to batch_size)
+    and hands them to one call, so a burst of similar tasks costs one
+    lock acquisition instead of one per item.
+
+    Backpressure: a full shard blocks submit() for up to block_seconds;
+    after that the payload is dropped and the overflow handlers run once
+    (the app rebuilds its indexes, as after a missed event).
+    With workers=0 tasks run inline in submit().
+    """
+
+    def __init__(self, app, workers=2, maxsize=10000, batch_size=256, block_seconds=2.0):
+        self.app = app
+        self.workers = workers
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.block_seconds = block_seconds
+        self.tasks = {}              # name -> fn(payloads)
+        self.overflow_handlers = []  # fn() after a payload was dropped
+        self.shards = [_Shard() for _ in range(max(workers, 1))]
+        self.pid = None
+        self.start_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.counts = {"submitted": 0, "completed": 0, "failed": 0, "batches": 0, "blocked": 0, "dropped": 0}
+        self.blocked_seconds = 0.0
+        self.last_wait_seconds = 0.0
+
+    def task(self, name):
+        def decorator(fn):
+            self.tasks[name] = fn
+            return fn
+        return decorator
+
+    def on_overflow(self, fn):
+        self.overflow_handlers.append(fn)
+        return fn
+
+    def _count(self, event, n=1):
+        with self.stats_lock:
+            self.counts[event] += n
+
+    def _ensure_started(self):
+        """
+        Start the worker threads on first use in this process (threads
+        don't survive a fork, so a forked worker starts its own).
+        """
+        if self.pid == os.getpid():
+            return
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            for i, shard in enumerate(self.shards):
+                shard.items.clear()  # a forked child doesn't inherit the parent's work
+                shard.cond = threading.Condition()
+                shard.busy = False
+                shard.thread = threading.Thread(target=self._work, args=(shard,), name=f"tasks-{i}", daemon=True)
+                shard.thread.start()
+            self.pid = os.getpid()
+
+    def submit(self, name, key, payload):
+        """
+        Queue payload for task name; returns False if it was dropped.
+        """
+        if name not in self.tasks:
+            raise KeyError(f"Unknown task {name!r}")
+        self._count("submitted")
+        if self.workers <= 0:
+            self._run(name, [payload])
+            return True
+
+        self._ensure_started()
+        shard = self.shards[zlib.crc32(str(key).encode("utf-8")) % len(self.shards)]
+        overflow = False
+        with shard.cond:
+            if len(shard.items) >= self.maxsize:
+                self._count("blocked")
+                start = time.monotonic()
+                deadline = start + self.block_seconds
+                while len(shard.items) >= self.maxsize:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    shard.cond.wait(remaining)
+                with self.stats_lock:
+                    self.blocked_seconds += time.monotonic() - start
+            if len(shard.items) >= self.maxsize:
+                overflow = not shard.overflowed
+                shard.overflowed = True
+            else:
+                shard.items.append((name, payload, time.monotonic()))
+                shard.cond.notify_all()
+                payload = None
+        if payload is None:
+            return True
+
+        self._count("dropped")
+        if overflow:
+            print(f"WARNING: task queue full; dropped {name} work, resyncing")
+            for fn in self.overflow_handlers:
+                try:
+                    fn()
+                except Exception as e:
+                    print("WARNING: task queue overflow handler failed:", repr(e))
+        return False
+
+    def _work(self, shard):
+        while True:
+            with shard.cond:
+                while not shard.items:
+                    shard.cond.wait()
+                name = shard.items[0][0]
+                batch = []
+                while shard.items and shard.items[0][0] == name and len(batch) < self.batch_size:
+                    batch.append(shard.items.popleft())
+                shard.busy = True
+                shard.cond.notify_all()  # wake producers blocked on a full shard
+            try:
+                self.last_wait_seconds = time.monotonic() - batch[0][2]
+                self._run(name, [payload for _, payload, _ in batch])
+            finally:
+                with shard.cond:
+                    shard.busy = False
+                    if not shard.items:
+                        shard.overflowed = False  # drained: the next overflow is a new episode
+                    shard.cond.notify_all()
+
+    def _run(self, name, payloads):
+        try:
+            with self.app.app_context():
+                self.tasks[name](payloads)
+            self._count("completed", len(payloads))
+        except Exception as e:
+            self._count("failed", len(payloads))
+            print(f"WARNING: task {name} failed for {len(payloads)} item(s):", repr(e))
+            traceback.print_exc()
+        self._count("batches")
+
+    def flush(self, timeout=None):
+        """
+        Wait until everything submitted so far has run; False on timeout.
+        """
+        if self.workers <= 0 or self.pid != os.getpid():
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for shard in self.shards:
+            with shard.cond:
+                while shard.items or shard.busy:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    shard.cond.wait(remaining)
+        return True
+
+    def depth(self):
+        return [len(shard.items) for shard in self.shards]
+
+    def oldest_seconds(self):
+        now = time.monotonic()
+        oldest = 0.0
+        for shard in self.shards:
+            items = shard.items
+            if items:
+                try:
+                    oldest = max(oldest, now - items[0][2])
+                except IndexError:
+                    pass  # drained meanwhile
+        return oldest
+
+
+def init_app(app, registry):
+    queue = TaskQueue(
+        app,
+        workers=app.config["TASK_QUEUE_WORKERS"],
+        maxsize=app.config["TASK_QUEUE_SIZE"],
+        batch_size=app.config["TASK_QUEUE_BATCH"],
+        block_seconds=app.config["TASK_QUEUE_BLOCK_SECONDS"],
+    )
+
+    def events():
+        with queue.stats_lock:
+            return {(("event", event),): n for event, n in queue.counts.items()}
+
+    registry.register_counter("task_queue_events_total",
+                              "Background tasks submitted, run, failed, blocked and dropped.", events)
+    registry.register_gauge("task_queue_depth", "Tasks waiting per worker thread.",
+                            lambda: {(("shard", str(i)),): n for i, n in enumerate(queue.depth())})
+    registry.register_gauge("task_queue_oldest_seconds", "Age of the oldest waiting task.",
+                            lambda: {(): round(queue.oldest_seconds(), 6)})
+    registry.register_gauge("task_queue_last_wait_seconds", "Queue wait of the last batch taken by a worker.",
+                            lambda: {(): round(queue.last_wait_seconds, 6)})
+    registry.register_counter("task_queue_blocked_seconds_total", "Total time submit() spent waiting on a full queue.",
+                              lambda: {(): round(queue.blocked_seconds, 6)})
+    app.extensions["tasks"] = queue
+    return queue
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# app.py configures itself from the environment at import time
+_tmp = tempfile.mkdtemp(prefix="restockd-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["EVENT_BUS"] = "off"
+os.environ["POSTING_EXPIRY"] = "0"
+os.environ["TASK_QUEUE_WORKERS"] = "0"
+os.environ["EVENT_BUS_DIR"] = os.path.join(_tmp, "bus")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from config import app, db  # noqa: E402
+
+with app.app_context():
+    db.create_all()
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def food_bank(client):
+    food_bank_id = str(uuid.uuid4())
+    response = client.post("/api/profiles", json={
+        "user_id": food_bank_id, "email": f"{food_bank_id}@example.com", "role": "Food Bank",
+        "name": "Test Pantry", "phone": "1", "address": "1 Main St", "city": "Chicago",
+        "state": "IL", "postalCode": "60607",
+    })
+    assert response.status_code == 201
+    return food_bank_id
+
+
+@pytest.fixture
+def donor(client):
+    donor_id = str(uuid.uuid4())
+    response = client.post("/api/profiles", json={
+        "user_id": donor_id, "email": f"{donor_id}@example.com", "role": "Donor",
+        "first_name": "Test", "last_name": "Donor", "phone": "1", "address": "1 Main St",
+        "city": "Chicago", "state": "IL", "postalCode": "60607",
+    })
+    assert response.status_code == 201
+    return donor_id
+
+
+def posting_body(food_bank_id, **overrides):
+    body = {
+        "food_bank_id": food_bank_id, "food_name": "Canned Beans", "urgency": "high",
+        "quantity_needed": 50, "from_date": "2026-01-01", "to_date": "2099-12-31",
+        "from_time": "00:00", "to_time": "23:59",
+    }
+    body.update(overrides)
+    return body
+
+
+def meetup_body(posting_id, donor_id, food_bank_id, **overrides):
+    body = {
+        "posting_id": posting_id, "donor_id": donor_id, "food_bank_id": food_bank_id,
+        "scheduled_date": "2099-01-05", "scheduled_time": "10:00",
+        "donation_item": "beans", "quantity": 5,
+    }
+    body.update(overrides)
+    return body
+
+
+@pytest.fixture
+def posting(client, food_bank):
+    response = client.post("/api/donation_postings", json=posting_body(food_bank))
+    assert response.status_code == 201
+    return response.json["id"]
@@ -0,0 +1,38 @@
+import uuid
+
+import pytest
+
+from conftest import app
+
+ROSTER = "user_id,email,role,name,phone,address,city,state,postalCode\n"
+
+
+def _bulk(client, headers=None):
+    user_id = uuid.uuid4()
+    body = ROSTER + f"{user_id},{user_id}@example.com,Food Bank,Pantry,1,1 Main St,Chicago,IL,60607\n"
+    return client.post("/api/profiles/bulk?format=csv", data=body, content_type="text/csv", headers=headers or {})
+
+
+@pytest.fixture
+def admin_token():
+    saved = app.config.get("ADMIN_TOKEN"), app.debug
+    yield
+    app.config["ADMIN_TOKEN"], app.debug = saved
+
+
+def test_closed_without_a_token(client, admin_token):
+    app.config["ADMIN_TOKEN"] = None
+    assert _bulk(client).status_code == 403
+    assert _bulk(client, {"X-Admin-Token": ""}).status_code == 403
+
+    app.debug = True
+    assert _bulk(client).status_code == 200
+
+
+def test_token_must_match(client, admin_token):
+    app.config["ADMIN_TOKEN"] = "s3cret"
+    assert _bulk(client).status_code == 403
+    assert _bulk(client, {"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = _bulk(client, {"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200, response.json
@@ -0,0 +1,131 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+import read_queries
+from conftest import app, app_module, db, meetup_body, posting_body
+from models import ArchivedDonorTotal, Meetup, MeetupTimeChangeRequest
+
+
+def _completed_meetup(client, donor, food_bank, quantity, days_ago=200, time_change=False):
+    posting = client.post("/api/donation_postings", json=posting_body(food_bank)).json["id"]
+    meetup = client.post("/api/meetups", json=meetup_body(posting, donor, food_bank, quantity=quantity))
+    assert meetup.status_code == 201
+    meetup_id = meetup.json["id"]
+
+    if time_change:
+        request = client.post("/api/meetup_time_change_requests", json={
+            "meetup_id": meetup_id, "food_bank_id": food_bank, "new_date": "2099-01-06", "new_time": "11:00",
+        })
+        assert request.status_code == 201
+        answer = client.put(f"/api/meetup_time_change_requests/{request.json['id']}", json={"action": "reject"})
+        assert answer.status_code == 200
+
+    assert client.put(f"/api/meetups/{meetup_id}/complete", json={"completed": True}).status_code == 200
+
+    closed = datetime.utcnow() - timedelta(days=days_ago)
+    with app.app_context():
+        db.session.execute(update(Meetup).where(Meetup.id == uuid.UUID(meetup_id)).values(completed_at=closed))
+        db.session.execute(update(MeetupTimeChangeRequest)
+                           .where(MeetupTimeChangeRequest.meetup_id == uuid.UUID(meetup_id))
+                           .values(responded_at=closed))
+        db.session.commit()
+    return meetup_id
+
+
+def _archive(older_than_days=180):
+    return app.test_cli_runner().invoke(args=["archive", "--older-than-days", str(older_than_days)])
+
+
+def _alltime_entry(client, donor):
+    board = client.get("/api/leaderboard?timeframe=alltime").json["leaderboard"]
+    return next(({k: row[k] for k in ("total_meetups", "total_weight")}
+                 for row in board if row["donor_id"] == donor), None)
+
+
+def _meetup_ids(response):
+    assert response.status_code == 200
+    return {meetup["id"] for meetup in response.json["meetups"]}
+
+
+def test_archived_meetup_stays_readable_and_counted(client, donor, food_bank):
+    meetup_id = _completed_meetup(client, donor, food_bank, quantity=7, time_change=True)
+    recent_id = _completed_meetup(client, donor, food_bank, quantity=3, days_ago=1)
+    leaderboard_before = _alltime_entry(client, donor)
+    assert leaderboard_before == {"total_meetups": 2, "total_weight": 10.0}
+    assert meetup_id in _meetup_ids(client.get(f"/api/meetups?donor_id={donor}"))
+
+    result = _archive()
+    assert result.exit_code == 0, result.output
+
+    assert _meetup_ids(client.get(f"/api/meetups?donor_id={donor}")) == {recent_id}
+    assert _meetup_ids(client.get(f"/api/meetups?donor_id={donor}&history=true")) == {meetup_id, recent_id}
+
+    export = client.get(f"/api/food_banks/{food_bank}/meetups/export?format=ndjson")
+    assert export.status_code == 200
+    assert meetup_id in export.get_data(as_text=True)
+    hot_export = client.get(f"/api/food_banks/{food_bank}/meetups/export?format=ndjson&history=false")
+    assert meetup_id not in hot_export.get_data(as_text=True)
+
+    requests = client.get(f"/api/meetup_time_change_requests?meetup_id={meetup_id}").json["requests"]
+    assert requests == []
+    requests = client.get(f"/api/meetup_time_change_requests?meetup_id={meetup_id}&history=true").json["requests"]
+    assert [request["status"] for request in requests] == ["rejected"]
+
+    assert _alltime_entry(client, donor) == leaderboard_before
+
+
+def test_later_runs_add_to_archived_donor_totals(client, donor, food_bank):
+    _completed_meetup(client, donor, food_bank, quantity=4)
+    assert _archive().exit_code == 0
+    _completed_meetup(client, donor, food_bank, quantity=6)
+    assert _archive().exit_code == 0
+
+    with app.app_context():
+        total = db.session.get(ArchivedDonorTotal, uuid.UUID(donor))
+        assert (total.total_meetups, float(total.total_weight)) == (2, 10.0)
+    assert _alltime_entry(client, donor) == {"total_meetups": 2, "total_weight": 10.0}
+
+
+def test_recent_or_open_meetups_stay_hot(client, donor, food_bank):
+    recent_id = _completed_meetup(client, donor, food_bank, quantity=2, days_ago=10)
+    posting = client.post("/api/donation_postings", json=posting_body(food_bank)).json["id"]
+    open_id = client.post("/api/meetups", json=meetup_body(posting, donor, food_bank)).json["id"]
+
+    assert _archive().exit_code == 0
+    assert _meetup_ids(client.get(f"/api/meetups?donor_id={donor}")) == {recent_id, open_id}
+
+
+def test_archive_refuses_windows_the_month_leaderboard_reads():
+    result = _archive(older_than_days=30)
+    assert result.exit_code != 0
+    assert "at least 31" in result.output
+
+
+def test_archived_booking_still_blocks_a_second_one(client, donor, food_bank):
+    posting = client.post("/api/donation_postings", json=posting_body(food_bank)).json["id"]
+    meetup_id = client.post("/api/meetups", json=meetup_body(posting, donor, food_bank)).json["id"]
+    assert client.put(f"/api/meetups/{meetup_id}/complete", json={"completed": True}).status_code == 200
+    with app.app_context():
+        db.session.execute(update(Meetup).where(Meetup.id == uuid.UUID(meetup_id))
+                           .values(completed_at=datetime.utcnow() - timedelta(days=200)))
+        db.session.commit()
+    assert _archive().exit_code == 0
+
+    again = client.post("/api/meetups", json=meetup_body(posting, donor, food_bank))
+    assert again.status_code == 400
+
+    with app.app_context():
+        app_module._build_meetup_bloom_from_db()
+    assert f"{donor}:{posting}" in app_module.meetup_bloom
+    assert client.post("/api/meetups", json=meetup_body(posting, donor, food_bank)).status_code == 400
+
+
+def test_archived_donations_count_as_donated_before(client, donor, food_bank):
+    _completed_meetup(client, donor, food_bank, quantity=1)
+    assert _archive().exit_code == 0
+
+    with app.app_context():
+        items = {name for (name,) in db.session.execute(read_queries.donated_items_query(uuid.UUID(donor)))}
+    assert items == {"beans"}
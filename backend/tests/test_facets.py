@@ -0,0 +1,111 @@
+import random
+import string
+import uuid
+
+import pytest
+
+import facet_index
+from conftest import app, app_module, posting_body
+
+
+def _word():
+    # clean_prefix keeps letters only
+    return "".join(random.choices(string.ascii_lowercase, k=12))
+
+
+def _bank(client, name, city):
+    food_bank_id = str(uuid.uuid4())
+    response = client.post("/api/profiles", json={
+        "user_id": food_bank_id, "email": f"{food_bank_id}@example.com", "role": "Food Bank",
+        "name": name, "phone": "1", "address": "1 Main St", "city": city, "state": "IL", "postalCode": "60607",
+    })
+    assert response.status_code == 201
+    return food_bank_id
+
+
+@pytest.fixture
+def word(client):
+    """
+    A food_name word only this test's postings have, at a bank listed in
+    data/banks.json (refrigerated, tags canned and fresh) and one that isn't.
+    """
+    word = _word()
+    listed = _bank(client, "UIC Pantry", "Chicago")
+    unlisted = _bank(client, f"Pantry {word}", "Evanston")
+    for bank, food, urgency in [(listed, "beans", "high"), (listed, "rice", "low"),
+                                (unlisted, "beans", "high"), (unlisted, "soup", "medium")]:
+        response = client.post("/api/donation_postings",
+                               json=posting_body(bank, food_name=f"{word} {food}", urgency=urgency))
+        assert response.status_code == 201
+    return word
+
+
+def _search(client, query):
+    response = client.get(f"/api/search/postings?{query}")
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+@pytest.fixture
+def facets_ready():
+    with app.app_context():
+        app_module._build_facets_from_db()
+    yield
+    app_module.facets_status.state = "pending"
+
+
+def test_counts_only_when_asked(client, word, facets_ready):
+    assert "facets" not in _search(client, f"q={word}&urgency=high")
+
+    counts = _search(client, f"q={word}&urgency=high&facets=true")["facets"]
+    assert set(counts) == set(facet_index.DEFAULT_COUNTED)
+    assert counts["urgency"] == {"high": 2, "low": 1, "medium": 1}
+    assert counts["city"] == {"chicago": 1, "evanston": 1}
+    assert counts["refrigerated"] == {"1": 1}
+
+    counts = _search(client, f"q={word}&facets=food_bank_id")["facets"]
+    assert set(counts) == {"food_bank_id"}
+    assert sorted(counts["food_bank_id"].values()) == [2, 2]
+
+    assert client.get(f"/api/search/postings?q={word}&facets=color").status_code == 400
+
+
+def test_degraded_answers_match_the_index(client, word, facets_ready):
+    queries = [f"q={word}&refrigerated=1", f"q={word}&urgency=high,low", f"q={word}&city=chicago",
+               f"q={word}&tag=canned", f"q={word}&refrigerated=0", f"q={word} be&city=Evanston",
+               f"q={word}&urgency=high&limit=1&offset=1", f"q={word}&tag=nothing"]
+    built = [_search(client, query) for query in queries]
+
+    app_module.facets_status.state = "pending"
+    for query, expected in zip(queries, built):
+        answer = _search(client, f"{query}&facets=true")
+        assert answer["degraded"] is True
+        assert answer["facets"] is None
+        assert answer["total"] == expected["total"], query
+        if "limit" not in query:  # the fallback may order ties differently
+            assert {p["id"] for p in answer["postings"]} == {p["id"] for p in expected["postings"]}, query
+        assert len(answer["postings"]) == len(expected["postings"]), query
+
+
+def test_bank_counts_are_capped():
+    index = facet_index.FacetIndex()
+    banks = [(f"bank-{n}", "Chicago", (), None) for n in range(facet_index.MAX_BANK_COUNTS + 10)]
+    postings = [(f"posting-{n}-{i}", "rice", "high", f"bank-{n}")
+                for n in range(len(banks)) for i in range(n + 1)]
+    index.load(banks, postings)
+
+    ids, total, pending = index.search({}, counted=("food_bank_id", "city"))
+    counts = pending.counts()
+    assert total == len(postings)
+    assert counts["city"] == {"chicago": len(postings)}
+    assert len(counts["food_bank_id"]) == facet_index.MAX_BANK_COUNTS
+    assert min(counts["food_bank_id"].values()) == 11  # the ten smallest banks are left out
+    assert index.search({}, counted=())[2] is None
+
+
+def test_parse_counted():
+    assert facet_index.parse_counted("true") == (facet_index.DEFAULT_COUNTED, None)
+    assert facet_index.parse_counted("false") == ((), None)
+    assert facet_index.parse_counted(None) == ((), None)
+    assert facet_index.parse_counted("city, tag,city") == (("city", "tag"), None)
+    assert facet_index.parse_counted("city,color")[0] is None
@@ -0,0 +1,151 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask import jsonify
+
+from conftest import app, app_module, db, meetup_body, posting_body
+from models import DonationPosting, IdempotencyKey, Meetup
+
+keys = app_module.idempotency_keys
+
+# Views whose timing and failures the tests control
+slow_started = threading.Event()
+slow_release = threading.Event()
+calls = {"slow": 0, "flaky": 0}
+
+
+@app.post("/_test/idempotency/slow")
+@keys.idempotent
+def slow_view():
+    calls["slow"] += 1
+    slow_started.set()
+    slow_release.wait(10)
+    return jsonify({"calls": calls["slow"]}), 201
+
+
+@app.post("/_test/idempotency/flaky/<mode>")
+@keys.idempotent
+def flaky_view(mode):
+    calls["flaky"] += 1
+    if calls["flaky"] == 1:
+        if mode == "raise":
+            raise RuntimeError("handler failed")
+        return jsonify({"error": "unavailable"}), 503
+    return jsonify({"calls": calls["flaky"]}), 201
+
+
+def _key():
+    return {"Idempotency-Key": str(uuid.uuid4())}
+
+
+def test_replay_returns_stored_response_without_rerunning(client, food_bank):
+    headers = _key()
+    body = posting_body(food_bank, food_name=f"Rice {uuid.uuid4()}")
+    first = client.post("/api/donation_postings", json=body, headers=headers)
+    second = client.post("/api/donation_postings", json=body, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json == first.json
+    with app.app_context():
+        assert DonationPosting.query.filter_by(food_name=body["food_name"]).count() == 1
+
+
+def test_meetup_quantity_is_deducted_once(client, posting, donor, food_bank):
+    headers = _key()
+    body = meetup_body(posting, donor, food_bank, quantity=5)
+    first = client.post("/api/meetups", json=body, headers=headers)
+    second = client.post("/api/meetups", json=body, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json["id"] == first.json["id"]
+    assert client.get(f"/api/donation_postings/{posting}").json["qty_needed"] == 45
+    with app.app_context():
+        assert Meetup.query.filter_by(posting_id=uuid.UUID(posting)).count() == 1
+
+
+def test_replay_from_database_when_not_cached(client, food_bank):
+    headers = _key()
+    body = posting_body(food_bank)
+    first = client.post("/api/donation_postings", json=body, headers=headers)
+    keys.cache.clear()  # as if the retry landed on another worker
+    second = client.post("/api/donation_postings", json=body, headers=headers)
+
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json == first.json
+
+
+def test_same_key_with_different_body_is_rejected(client, food_bank):
+    headers = _key()
+    assert client.post("/api/donation_postings", json=posting_body(food_bank),
+                       headers=headers).status_code == 201
+
+    changed = posting_body(food_bank, quantity_needed=99)
+    assert client.post("/api/donation_postings", json=changed, headers=headers).status_code == 422
+    keys.cache.clear()
+    assert client.post("/api/donation_postings", json=changed, headers=headers).status_code == 422
+
+
+def test_concurrent_duplicate_gets_409_until_the_first_finishes(client):
+    headers = _key()
+    slow_started.clear()
+    slow_release.clear()
+    calls["slow"] = 0
+    results = []
+    first = threading.Thread(target=lambda: results.append(
+        app.test_client().post("/_test/idempotency/slow", json={}, headers=headers)))
+    first.start()
+    try:
+        assert slow_started.wait(10)
+        duplicate = client.post("/_test/idempotency/slow", json={}, headers=headers)
+        assert duplicate.status_code == 409
+    finally:
+        slow_release.set()
+        first.join(10)
+
+    assert results[0].status_code == 201
+    replay = client.post("/_test/idempotency/slow", json={}, headers=headers)
+    assert replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert calls["slow"] == 1
+
+
+def test_server_error_releases_the_key(client):
+    headers = _key()
+    calls["flaky"] = 0
+    assert client.post("/_test/idempotency/flaky/status", json={}, headers=headers).status_code == 503
+    retry = client.post("/_test/idempotency/flaky/status", json={}, headers=headers)
+
+    assert retry.status_code == 201
+    assert "Idempotent-Replayed" not in retry.headers
+    assert calls["flaky"] == 2
+
+
+def test_exception_releases_the_key(client):
+    headers = _key()
+    calls["flaky"] = 0
+    testing, app.testing = app.testing, False  # turn the exception into a 500
+    try:
+        assert client.post("/_test/idempotency/flaky/raise", json={}, headers=headers).status_code == 500
+    finally:
+        app.testing = testing
+    retry = client.post("/_test/idempotency/flaky/raise", json={}, headers=headers)
+
+    assert retry.status_code == 201
+    assert calls["flaky"] == 2
+
+
+def test_expired_keys_are_pruned(client, food_bank):
+    with app.app_context():
+        db.session.add(IdempotencyKey(
+            key_hash="expired" + uuid.uuid4().hex[:57], fingerprint="x", status_code=201, body="{}",
+            created_at=datetime.utcnow() - timedelta(seconds=keys.ttl + 60)))
+        db.session.commit()
+
+    keys.last_prune = 0.0
+    client.post("/api/donation_postings", json=posting_body(food_bank), headers=_key())
+
+    with app.app_context():
+        assert IdempotencyKey.query.filter(IdempotencyKey.key_hash.like("expired%")).count() == 0
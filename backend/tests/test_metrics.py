@@ -0,0 +1,19 @@
+from metrics import MetricsRegistry
+
+
+def test_counters_and_gauges_render_with_their_type():
+    registry = MetricsRegistry(prefix="t")
+    registry.register_counter("jobs_total", "Jobs run.", lambda: {(("state", "done"),): 3})
+    registry.register_gauge("queue_depth", "Jobs waiting.", lambda: {(): 2})
+    text = registry.render()
+
+    assert "# TYPE t_jobs_total counter\n" in text
+    assert 't_jobs_total{state="done"} 3\n' in text
+    assert "# TYPE t_queue_depth gauge\nt_queue_depth 2\n" in text
+
+
+def test_app_exports_monotonic_series_as_counters(client):
+    text = client.get("/api/_metrics").get_data(as_text=True)
+    for name in ("prefix_cache_events_total", "task_queue_events_total", "idempotency_events_total"):
+        assert f"# TYPE restockd_{name} counter" in text
+    assert "# TYPE restockd_task_queue_depth gauge" in text
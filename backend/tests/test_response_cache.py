@@ -0,0 +1,16 @@
+from werkzeug.datastructures import MultiDict
+
+from response_cache import ResponseCache
+
+
+def test_keys_encode_query_values():
+    smuggled = ResponseCache.key_for("postings", MultiDict([("q", "rice&food_bank_id=1")]), False)
+    split = ResponseCache.key_for("postings", MultiDict([("q", "rice"), ("food_bank_id", "1")]), False)
+    assert smuggled != split
+    assert smuggled == "postings?q=rice%26food_bank_id%3D1#primary"
+
+
+def test_keys_ignore_argument_order_but_not_repeats():
+    key = ResponseCache.key_for("meetups", MultiDict([("b", "2"), ("a", "1")]), True)
+    assert key == ResponseCache.key_for("meetups", MultiDict([("a", "1"), ("b", "2")]), True) == "meetups?a=1&b=2#replica"
+    assert key != ResponseCache.key_for("meetups", MultiDict([("a", "1"), ("a", "1"), ("b", "2")]), True)
@@ -0,0 +1,84 @@
+import random
+import string
+import uuid
+from threading import Lock
+
+import pytest
+
+import search_backend
+import warmup
+from conftest import app, db, posting_body
+from trie import Trie
+
+
+def _word(start):
+    # clean_prefix keeps letters only
+    return start + "".join(random.choices(string.ascii_lowercase, k=10))
+
+
+@pytest.fixture(scope="module")
+def food_bank_for_module():
+    food_bank_id = str(uuid.uuid4())
+    response = app.test_client().post("/api/profiles", json={
+        "user_id": food_bank_id, "email": f"{food_bank_id}@example.com", "role": "Food Bank",
+        "name": "Search Pantry", "phone": "1", "address": "1 Main St", "city": "Chicago",
+        "state": "IL", "postalCode": "60607",
+    })
+    assert response.status_code == 201
+    return food_bank_id
+
+
+@pytest.fixture(scope="module")
+def words(food_bank_for_module):
+    """
+    Postings whose food names share unusual words, so only this
+    module's postings match the queries below.
+    """
+    canned, beans, corn, cane = _word("ca"), _word("be"), _word("co"), _word("ca")
+    client = app.test_client()
+    names = [f"{canned} {beans}", f"{beans} {canned}", f"{canned} {corn}", f"{cane} {beans}",
+             f"{corn}", f"{canned.upper()} {beans}s"]
+    for name in names:
+        assert client.post("/api/donation_postings",
+                           json=posting_body(food_bank_for_module, food_name=name)).status_code == 201
+    return canned, beans, corn, cane
+
+
+def _backends():
+    """
+    name -> built backend; "fallback" is one whose index is not ready.
+    """
+    trie = search_backend.TrieSearchBackend(db, warmup.IndexStatus("trie"), Trie(), Lock())
+    database = search_backend.DatabaseSearchBackend(db, warmup.IndexStatus("database"))
+    trie.rebuild()
+    database.rebuild()
+    fallback = search_backend.TrieSearchBackend(db, warmup.IndexStatus("fallback"), Trie(), Lock())
+    return {"trie": trie, "database": database, "fallback": fallback}
+
+
+def test_backends_agree(words):
+    canned, beans, corn, cane = words
+    queries = [canned, canned[:4], "ca" + canned[2:6], f"{canned} {beans[:4]}", f"{beans[:4]} {canned[:5]}",
+               f"{canned}  {beans[:3]} ", f"{canned[:4]} {corn[:4]}", f"{cane} {corn}", beans.upper(),
+               f"{corn[:5]}-", "   ", "", f"{canned[:3]} zzzzzz"]
+    with app.app_context():
+        backends = _backends()
+        for query in queries:
+            for limit in (2, 20):
+                answers = {name: backend.search_ids(query, limit) for name, backend in backends.items()}
+                assert len(set(map(tuple, answers.values()))) == 1, (query, limit, answers)
+                assert answers["trie"] == sorted(answers["trie"])
+            suggestions = {name: backend.suggest(query, 10) for name, backend in backends.items()}
+            assert len(set(map(tuple, suggestions.values()))) == 1, (query, suggestions)
+
+
+def test_words_are_anded(words):
+    canned, beans, corn, cane = words
+    with app.app_context():
+        backends = _backends()
+        for backend in backends.values():
+            assert len(backend.search_ids(f"{canned[:6]} {beans[:6]}", 20)) == 3
+            assert len(backend.search_ids(f"{beans[:6]} {canned[:6]}", 20)) == 3
+            assert len(backend.search_ids(f"{canned[:6]} {corn[:6]}", 20)) == 1
+            assert backend.suggest(f"{canned} {beans[:3]}") == []
+            assert backend.suggest(canned[:8]) == [canned]
@@ -0,0 +1,105 @@
+import uuid
+from datetime import date, datetime, time
+
+import pytest
+
+from conftest import app, app_module, db, meetup_body, posting_body
+from models import Meetup
+
+
+def _donor(client):
+    donor_id = str(uuid.uuid4())
+    response = client.post("/api/profiles", json={
+        "user_id": donor_id, "email": f"{donor_id}@example.com", "role": "Donor",
+        "first_name": "Slot", "last_name": "Donor", "phone": "1", "address": "1 Main St",
+        "city": "Chicago", "state": "IL", "postalCode": "60607",
+    })
+    assert response.status_code == 201
+    return donor_id
+
+
+def _book(client, posting, food_bank, at="10:00"):
+    return client.post("/api/meetups", json=meetup_body(posting, _donor(client), food_bank, scheduled_time=at))
+
+
+@pytest.fixture(params=["index", "database"])
+def slots(request, client, food_bank, posting):
+    """
+    A bank with two places per 30 minute slot, counted from the index or,
+    while that is still building, from the database.
+    """
+    response = client.put(f"/api/food_banks/{food_bank}/slots/settings", json={"slot_minutes": 30, "capacity": 2})
+    assert response.status_code == 200
+    state = app_module.slots_status.state
+    if request.param == "index":
+        with app.app_context():
+            app_module._build_slot_index_from_db()
+    else:
+        app_module.slots_status.state = "pending"
+    yield food_bank, posting
+    app_module.slots_status.state = state
+
+
+def test_full_slot_is_refused(client, slots):
+    food_bank, posting = slots
+    assert _book(client, posting, food_bank, "10:00").status_code == 201
+    assert _book(client, posting, food_bank, "10:29").status_code == 201
+
+    full = _book(client, posting, food_bank, "10:15")
+    assert full.status_code == 409
+    assert full.json["slot"] == {"start": "10:00", "end": "10:30", "booked": 2, "capacity": 2}
+    assert _book(client, posting, food_bank, "10:30").status_code == 201
+
+
+def test_database_count_catches_other_workers_bookings(client, food_bank, posting):
+    """
+    A booking this worker's index never saw still fills the slot.
+    """
+    assert client.put(f"/api/food_banks/{food_bank}/slots/settings",
+                      json={"slot_minutes": 30, "capacity": 1}).status_code == 200
+    with app.app_context():
+        app_module._build_slot_index_from_db()
+        now = datetime.utcnow()
+        db.session.add(Meetup(
+            id=uuid.uuid4(), posting_id=uuid.UUID(posting), donor_id=uuid.UUID(_donor(client)),
+            food_bank_id=uuid.UUID(food_bank), donation_item="beans", quantity=1,
+            scheduled_date=date(2099, 1, 5), scheduled_time=time(10, 10), completed=False,
+            created_at=now, updated_at=now,
+        ))
+        db.session.commit()
+
+    refused = _book(client, posting, food_bank, "10:00")
+    assert refused.status_code == 409
+    assert refused.json["slot"]["booked"] == 1
+    with app.app_context():
+        assert app_module.booked_slots.count(food_bank, date(2099, 1, 5), 600, 630) == 0
+
+
+def test_meetup_must_fall_in_the_pickup_window(client, food_bank, donor):
+    posting = client.post("/api/donation_postings", json=posting_body(
+        food_bank, from_date="2099-01-01", to_date="2099-01-10", from_time="09:00", to_time="12:00")).json["id"]
+
+    late = client.post("/api/meetups", json=meetup_body(posting, donor, food_bank, scheduled_time="12:30"))
+    assert late.status_code == 400
+    assert "09:00 and 12:00" in late.json["error"]
+    early = client.post("/api/meetups", json=meetup_body(posting, donor, food_bank, scheduled_date="2098-12-31"))
+    assert early.status_code == 400
+    assert client.post("/api/meetups", json=meetup_body(posting, donor, food_bank)).status_code == 201
+
+
+def test_slots_listing(client, slots):
+    food_bank, posting = slots
+    client.post("/api/donation_postings", json=posting_body(food_bank, from_time="09:00", to_time="11:00"))
+    assert _book(client, posting, food_bank, "09:10").status_code == 201
+
+    response = client.get(f"/api/food_banks/{food_bank}/slots?date=2099-01-05&posting_id={posting}")
+    assert response.status_code == 200
+    listing = response.json
+    assert (listing["slot_minutes"], listing["capacity"]) == (30, 2)
+    assert len(listing["slots"]) == 48
+    assert listing["slots"][18] == {"start": "09:00", "end": "09:30", "booked": 1, "available": 1}
+    assert listing["slots"][-1]["end"] == "24:00"
+    assert listing.get("degraded", False) is not app_module.slots_status.ready
+
+    assert client.get(f"/api/food_banks/{food_bank}/slots").status_code == 400
+    assert client.get(f"/api/food_banks/{uuid.uuid4()}/slots?date=2099-01-05").status_code == 404
@@ -0,0 +1,61 @@
+import sqlite3
+from types import SimpleNamespace
+
+from slow_query import explain_plan, fingerprint
+
+
+class _Cursor:
+    def __init__(self, executed, fail_on):
+        self.executed = executed
+        self.fail_on = fail_on
+
+    def execute(self, statement, parameters=()):
+        self.executed.append(statement)
+        if statement.startswith(self.fail_on):
+            raise RuntimeError("syntax error")
+
+    def fetchall(self):
+        return [("Seq Scan on donation_postings",)]
+
+    def close(self):
+        pass
+
+
+def _postgres(fail_on="never"):
+    executed = []
+    dbapi_connection = SimpleNamespace(autocommit=False, cursor=lambda: _Cursor(executed, fail_on))
+    conn = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"),
+                           connection=SimpleNamespace(dbapi_connection=dbapi_connection))
+    return conn, executed
+
+
+def test_postgres_explain_runs_in_a_savepoint():
+    conn, executed = _postgres()
+    assert explain_plan(conn, "SELECT 1", None) == ["Seq Scan on donation_postings"]
+    assert executed == ["SAVEPOINT slow_query_explain", "EXPLAIN SELECT 1", "RELEASE SAVEPOINT slow_query_explain"]
+
+
+def test_failed_postgres_explain_rolls_back_to_the_savepoint():
+    conn, executed = _postgres(fail_on="EXPLAIN")
+    plan = explain_plan(conn, "SELECT bad", None)
+
+    assert plan[0].startswith("EXPLAIN failed")
+    assert executed == ["SAVEPOINT slow_query_explain", "EXPLAIN SELECT bad",
+                        "ROLLBACK TO SAVEPOINT slow_query_explain", "RELEASE SAVEPOINT slow_query_explain"]
+
+
+def test_failed_sqlite_explain_leaves_the_transaction_usable():
+    raw = sqlite3.connect(":memory:")
+    raw.execute("CREATE TABLE t (x)")
+    raw.execute("INSERT INTO t VALUES (1)")
+    conn = SimpleNamespace(dialect=SimpleNamespace(name="sqlite"),
+                           connection=SimpleNamespace(dbapi_connection=raw))
+
+    assert explain_plan(conn, "SELECT * FROM missing", None)[0].startswith("EXPLAIN failed")
+    assert explain_plan(conn, "SELECT x FROM t WHERE x = ?", (1,))
+    assert raw.execute("SELECT count(*) FROM t").fetchone() == (1,)
+
+
+def test_fingerprint_ignores_literals_and_in_list_length():
+    assert (fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?) AND n = 5")
+            == fingerprint("SELECT * FROM t WHERE id IN (?)  AND n = 12"))
@@ -0,0 +1,173 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from tasks import TaskQueue
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(**kwargs):
+        queue = TaskQueue(Flask(__name__), **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.flush(5)
+
+
+def _gate(queue):
+    """
+    (started, release): a "gate" task blocks its worker until release is set.
+    """
+    started, release = threading.Event(), threading.Event()
+
+    @queue.task("gate")
+    def gate(payloads):
+        started.set()
+        release.wait(10)
+
+    return started, release
+
+
+def test_same_key_runs_in_submit_order(make_queue):
+    queue = make_queue(workers=4, batch_size=7)
+    seen = {}
+
+    @queue.task("record")
+    def record(payloads):
+        for key, i in payloads:
+            seen.setdefault(key, []).append(i)
+
+    def produce(key):
+        for i in range(300):
+            queue.submit("record", key, (key, i))
+
+    producers = [threading.Thread(target=produce, args=(f"posting-{n}",)) for n in range(8)]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+
+    assert queue.flush(10)
+    assert seen == {f"posting-{n}": list(range(300)) for n in range(8)}
+
+
+def test_consecutive_items_of_one_task_are_batched(make_queue):
+    queue = make_queue(workers=1, batch_size=2)
+    started, release = _gate(queue)
+    calls = []
+    queue.task("a")(lambda payloads: calls.append(("a", payloads)))
+    queue.task("b")(lambda payloads: calls.append(("b", payloads)))
+
+    queue.submit("gate", "k", None)
+    assert started.wait(5)
+    for name, payload in [("a", 1), ("a", 2), ("a", 3), ("b", 4), ("a", 5)]:
+        queue.submit(name, "k", payload)
+    release.set()
+
+    assert queue.flush(5)
+    assert calls == [("a", [1, 2]), ("a", [3]), ("b", [4]), ("a", [5])]
+    assert queue.counts["completed"] == 6
+
+
+def test_overflow_handlers_run_once_per_episode(make_queue):
+    queue = make_queue(workers=1, maxsize=2, block_seconds=0.01)
+    started, release = _gate(queue)
+    queue.task("work")(lambda payloads: None)
+    overflows = []
+    queue.on_overflow(lambda: overflows.append(1))
+
+    for episode in (1, 2):
+        started.clear()
+        release.clear()
+        queue.submit("gate", "k", None)
+        assert started.wait(5)
+        assert queue.submit("work", "k", 1)
+        assert queue.submit("work", "k", 2)
+        assert not queue.submit("work", "k", 3)
+        assert not queue.submit("work", "k", 4)
+        assert len(overflows) == episode
+        release.set()
+        assert queue.flush(5)
+
+    assert queue.counts["dropped"] == 4
+    assert queue.counts["blocked"] == 4
+
+
+def test_full_queue_waits_for_room_before_dropping(make_queue):
+    queue = make_queue(workers=1, maxsize=1, block_seconds=5)
+    started, release = _gate(queue)
+    queue.task("work")(lambda payloads: None)
+
+    queue.submit("gate", "k", None)
+    assert started.wait(5)
+    queue.submit("work", "k", 1)
+    threading.Timer(0.05, release.set).start()
+
+    assert queue.submit("work", "k", 2)
+    assert queue.flush(5)
+    assert queue.counts["dropped"] == 0
+
+
+def test_flush_times_out_while_work_is_pending(make_queue):
+    queue = make_queue(workers=1)
+    started, release = _gate(queue)
+
+    queue.submit("gate", "k", None)
+    assert started.wait(5)
+    assert not queue.flush(0.05)
+    release.set()
+    assert queue.flush(5)
+
+
+def test_no_workers_runs_inline(make_queue):
+    queue = make_queue(workers=0)
+    calls = []
+    queue.task("work")(lambda payloads: calls.append((threading.current_thread(), payloads)))
+
+    assert queue.submit("work", "k", 1)
+    assert calls == [(threading.current_thread(), [1])]
+
+
+def test_failed_task_is_counted_and_the_worker_keeps_going(make_queue):
+    queue = make_queue(workers=1)
+    calls = []
+
+    @queue.task("work")
+    def work(payloads):
+        calls.append(payloads)
+        if payloads == ["bad"]:
+            raise RuntimeError("task failed")
+
+    queue.submit("work", "k", "bad")
+    assert queue.flush(5)
+    queue.submit("work", "k", "good")
+    assert queue.flush(5)
+
+    assert calls == [["bad"], ["good"]]
+    assert queue.counts["failed"] == 1
+    assert queue.counts["completed"] == 1
+
+
+def test_forked_process_starts_its_own_workers(make_queue):
+    queue = make_queue(workers=1)
+    calls = []
+    queue.task("work")(lambda payloads: calls.append(payloads))
+    queue.submit("work", "k", "parent")
+    assert queue.flush(5)
+    parent_thread = queue.shards[0].thread
+
+    # What a forked child sees: threads gone, the parent's pid and queued items
+    queue.pid = -1
+    queue.shards[0].items.append(("work", "inherited", 0.0))
+    assert queue.flush(5)  # nothing of this process's to wait for yet
+
+    queue.submit("work", "k", "child")
+    assert queue.flush(5)
+    assert queue.shards[0].thread is not parent_thread
+    assert calls == [["parent"], ["child"]]
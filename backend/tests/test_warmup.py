@@ -0,0 +1,95 @@
+import threading
+import time
+
+from flask import Flask
+
+import warmup
+from conftest import app_module
+
+STATUSES = ("search_status", "meetup_bloom_status", "bank_geo_status", "ranker_status", "expiry_status",
+            "slots_status", "facets_status")
+
+
+def _statuses():
+    return [getattr(app_module, name) for name in STATUSES]
+
+
+def _saved():
+    return [(s, s.state, s.built) for s in _statuses()]
+
+
+def _restore(saved):
+    for status, state, built in saved:
+        status.state, status.built = state, built
+
+
+def test_ready_once_every_index_was_built(client):
+    saved = _saved()
+    try:
+        for status in _statuses():
+            status.start()
+            status.finish()
+        assert client.get("/api/_ready").status_code == 200
+
+        # A rebuild after an event gap keeps the worker in the pool
+        app_module.search_status.start()
+        response = client.get("/api/_ready")
+        assert response.status_code == 200
+        assert response.json["degraded"] == [app_module.search_status.name]
+
+        app_module.facets_status.fail(RuntimeError("boom"))
+        response = client.get("/api/_ready")
+        assert response.status_code == 200
+        assert app_module.facets_status.name in response.json["degraded"]
+    finally:
+        _restore(saved)
+
+
+def test_not_ready_during_the_first_build(client):
+    saved = _saved()
+    try:
+        for status in _statuses():
+            status.built = False
+            status.start()
+        assert client.get("/api/_ready").status_code == 503
+    finally:
+        _restore(saved)
+
+
+def test_failed_first_build_still_serves():
+    status = warmup.IndexStatus("x")
+    assert not status.serving
+    status.start()
+    assert not status.serving
+    status.fail(RuntimeError("boom"))
+    assert status.serving
+
+
+def test_rebuild_requests_coalesce_into_one_more_run():
+    started, release = threading.Event(), threading.Event()
+    runs = []
+    active = []
+
+    def build():
+        active.append(1)
+        runs.append(len(active))  # how many builds were running at once
+        started.set()
+        release.wait(5)
+        active.pop()
+
+    rebuilder = warmup.Rebuilder(Flask(__name__), [build])
+    assert rebuilder.request()
+    assert started.wait(5)
+    for _ in range(5):
+        assert not rebuilder.request()
+    release.set()
+
+    for _ in range(500):
+        with rebuilder.lock:
+            if not rebuilder.running:
+                break
+        time.sleep(0.01)
+    assert runs == [1, 1]
+    assert rebuilder.runs == 2
+
+    assert rebuilder.request()  # idle again: a new gap starts a new run
@@ -133,6 +133,21 @@ class Trie:
         dfs(curr, p)
         return res
 
+    def prefix_id_set(self, prefix):
+        p = self.clean(prefix)
+        curr = self.root
+        for ch in p:
+            if ch not in curr.children:
+                return set()
+            curr = curr.children[ch]
+        out = set()
+        stack = [curr]
+        while stack:
+            node = stack.pop()
+            out.update(node.ids)
+            stack.extend(node.children.values())
+        return out
+
     def prefix_ids(self, prefix, limit=20):
         p = self.clean(prefix)
         curr = self.root
@@ -0,0 +1,149 @@
+# warmup.py
+import os
+import threading
+import time
+import traceback
+
+
+class IndexStatus:
+    """
+    Build progress for one in-memory index, reported on /api/_ready.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.state = "pending"  # pending -> building -> ready | failed
+        self.total = None
+        self.done = 0
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.built = False      # finished at least once
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @property
+    def serving(self):
+        """
+        Whether the worker can take traffic as far as this index goes:
+        built, rebuilding after it was built once, or failed (requests
+        use the DB fallbacks either way). Only the first build holds
+        the worker back.
+        """
+        return self.state in ("ready", "failed") or self.built
+
+    def start(self, total=None):
+        with self.lock:
+            self.state = "building"
+            self.total = total
+            self.done = 0
+            self.started_at = time.time()
+            self.finished_at = None
+            self.error = None
+
+    def advance(self, n):
+        with self.lock:
+            self.done += n
+
+    def finish(self):
+        with self.lock:
+            self.state = "ready"
+            self.built = True
+            self.finished_at = time.time()
+
+    def fail(self, exc):
+        with self.lock:
+            self.state = "failed"
+            self.error = repr(exc)
+            self.finished_at = time.time()
+
+    def to_json(self):
+        with self.lock:
+            progress = None
+            if self.total:
+                progress = round(min(1.0, self.done / self.total), 4)
+            elif self.state == "ready":
+                progress = 1.0
+            end = self.finished_at or time.time()
+            return {
+                "state": self.state,
+                "done": self.done,
+                "total": self.total,
+                "progress": progress,
+                "seconds": round(end - self.started_at, 3) if self.started_at else None,
+                "error": self.error,
+            }
+
+
+def run_in_background(app, builders, name="index-warmup"):
+    """
+    Run each builder inside an app context on a daemon thread so the
+    worker can serve (degraded) requests while the indexes fill up.
+    """
+    def target():
+        with app.app_context():
+            for build in builders:
+                try:
+                    build()
+                except Exception as e:
+                    print(f"WARNING: background index build {build.__name__} failed:", repr(e))
+                    traceback.print_exc()
+
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+class Rebuilder:
+    """
+    Runs builders on one background thread at a time. request() while a
+    run is in progress schedules one more run after it (whatever that
+    run read may already be stale) instead of a second thread clearing
+    and refilling the same structures.
+    """
+
+    def __init__(self, app, builders, name="index-resync"):
+        self.app = app
+        self.builders = builders
+        self.name = name
+        self.lock = threading.Lock()
+        self.pid = None
+        self.running = False
+        self.again = False
+        self.runs = 0
+
+    def request(self):
+        """
+        Start a run, or queue one behind the current run; returns True
+        if a thread was started.
+        """
+        with self.lock:
+            if self.pid != os.getpid():
+                # A forked child doesn't have the parent's thread
+                self.pid = os.getpid()
+                self.running = self.again = False
+            if self.running:
+                self.again = True
+                return False
+            self.running = True
+        threading.Thread(target=self._loop, name=self.name, daemon=True).start()
+        return True
+
+    def _loop(self):
+        while True:
+            with self.app.app_context():
+                for build in self.builders:
+                    try:
+                        build()
+                    except Exception as e:
+                        print(f"WARNING: background index build {build.__name__} failed:", repr(e))
+                        traceback.print_exc()
+            with self.lock:
+                self.runs += 1
+                if not self.again:
+                    self.running = False
+                    return
+                self.again = False
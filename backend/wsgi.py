@@ -0,0 +1,8 @@
+# wsgi.py
+# Entry point for WSGI servers, e.g.
+#   gunicorn -w 4 -b 0.0.0.0:5000 wsgi:app
+# Each worker builds its search Trie and Bloom filter in a background
+# thread; point the load balancer's health check at /api/_ready.
+from app import create_app
+
+app = create_app()